@@ -0,0 +1,8 @@
+from . import batch_pb2
+from . import batch_pb2_grpc
+
+
+__all__ = [
+    "batch_pb2_grpc",
+    "batch_pb2",
+]
@@ -0,0 +1,34 @@
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: a3m/api/tasks/v1beta1/batch.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
+    b'\n!a3m/api/tasks/v1beta1/batch.proto\x12\x15\x61\x33m.api.tasks.v1beta1"\xa5\x02\n\tTaskBatch\x12\x18\n\x07\x65xecute\x18\x01 \x01(\tR\x07\x65xecute\x12\x19\n\x08task_ids\x18\x02 \x01(\x0cR\x07taskIds\x12#\n\rcreated_times\x18\x03 \x03(\x03R\x0c\x63reatedTimes\x12!\n\x0cwants_output\x18\x04 \x03(\x08R\x0bwantsOutput\x12=\n\targuments\x18\x05 \x03(\x0b\x32\x1f.a3m.api.tasks.v1beta1.ArgumentR\targuments\x12\x37\n\x07\x63olumns\x18\x06 \x03(\x0b\x32\x1d.a3m.api.tasks.v1beta1.ColumnR\x07\x63olumns\x12#\n\rcommand_lines\x18\x07 \x03(\tR\x0c\x63ommandLines"e\n\x08\x41rgument\x12\x1a\n\x08literals\x18\x01 \x03(\tR\x08literals\x12=\n\tvariables\x18\x02 \x03(\x0b\x32\x1f.a3m.api.tasks.v1beta1.VariableR\tvariables"C\n\x08Variable\x12\x18\n\x06\x63olumn\x18\x01 \x01(\x05H\x00R\x06\x63olumn\x12\x14\n\x04name\x18\x02 \x01(\tH\x00R\x04nameB\x07\n\x05value" \n\x06\x43olumn\x12\x16\n\x06values\x18\x01 \x03(\tR\x06valuesB\xe1\x01\n\x19\x63om.a3m.api.tasks.v1beta1B\nBatchProtoP\x01ZAgithub.com/artefactual-labs/a3m/proto/a3m/api/tasks/v1beta1;tasks\xa2\x02\x03\x41\x41T\xaa\x02\x15\x41\x33m.Api.Tasks.V1beta1\xca\x02\x15\x41\x33m\\Api\\Tasks\\V1beta1\xe2\x02!A3m\\Api\\Tasks\\V1beta1\\GPBMetadata\xea\x02\x18\x41\x33m::Api::Tasks::V1beta1b\x06proto3'
+)
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(
+    DESCRIPTOR, "a3m.api.tasks.v1beta1.batch_pb2", globals()
+)
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+    DESCRIPTOR._options = None
+    DESCRIPTOR._serialized_options = b"\n\031com.a3m.api.tasks.v1beta1B\nBatchProtoP\001ZAgithub.com/artefactual-labs/a3m/proto/a3m/api/tasks/v1beta1;tasks\242\002\003AAT\252\002\025A3m.Api.Tasks.V1beta1\312\002\025A3m\\Api\\Tasks\\V1beta1\342\002!A3m\\Api\\Tasks\\V1beta1\\GPBMetadata\352\002\030A3m::Api::Tasks::V1beta1"
+    _TASKBATCH._serialized_start = 61
+    _TASKBATCH._serialized_end = 354
+    _ARGUMENT._serialized_start = 356
+    _ARGUMENT._serialized_end = 457
+    _VARIABLE._serialized_start = 459
+    _VARIABLE._serialized_end = 526
+    _COLUMN._serialized_start = 528
+    _COLUMN._serialized_end = 560
+# @@protoc_insertion_point(module_scope)
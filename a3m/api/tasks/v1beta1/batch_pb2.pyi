@@ -0,0 +1,193 @@
+"""
+@generated by mypy-protobuf.  Do not edit manually!
+isort:skip_file
+"""
+import builtins
+import google.protobuf.descriptor
+import google.protobuf.internal.containers
+import google.protobuf.message
+import typing
+import typing_extensions
+
+DESCRIPTOR: google.protobuf.descriptor.FileDescriptor
+
+class TaskBatch(google.protobuf.message.Message):
+    """Batch of tasks of a job, sent by the workflow engine to the client scripts.
+
+    Tasks are stored in columns: the nth item of the fields that describe tasks
+    belongs to the nth task.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    EXECUTE_FIELD_NUMBER: builtins.int
+    TASK_IDS_FIELD_NUMBER: builtins.int
+    CREATED_TIMES_FIELD_NUMBER: builtins.int
+    WANTS_OUTPUT_FIELD_NUMBER: builtins.int
+    ARGUMENTS_FIELD_NUMBER: builtins.int
+    COLUMNS_FIELD_NUMBER: builtins.int
+    COMMAND_LINES_FIELD_NUMBER: builtins.int
+    execute: typing.Text
+    """Module of the client script."""
+
+    task_ids: builtins.bytes
+    """UUIDs of the tasks, 16 bytes each."""
+
+    @property
+    def created_times(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.int]:
+        """Creation time of the tasks, in microseconds since the epoch."""
+        pass
+    @property
+    def wants_output(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[
+        builtins.bool
+    ]: ...
+    @property
+    def arguments(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___Argument
+    ]:
+        """Arguments shared by the tasks, set when the command line of the link
+        could be split ahead of time.
+        """
+        pass
+    @property
+    def columns(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___Column
+    ]:
+        """Values of the variables that differ per task."""
+        pass
+    @property
+    def command_lines(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[typing.Text]:
+        """Command lines of the tasks, set when arguments couldn't be split ahead
+        of time.
+        """
+        pass
+    def __init__(
+        self,
+        *,
+        execute: typing.Text = ...,
+        task_ids: builtins.bytes = ...,
+        created_times: typing.Optional[typing.Iterable[builtins.int]] = ...,
+        wants_output: typing.Optional[typing.Iterable[builtins.bool]] = ...,
+        arguments: typing.Optional[typing.Iterable[global___Argument]] = ...,
+        columns: typing.Optional[typing.Iterable[global___Column]] = ...,
+        command_lines: typing.Optional[typing.Iterable[typing.Text]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions.Literal[
+            "arguments",
+            b"arguments",
+            "columns",
+            b"columns",
+            "command_lines",
+            b"command_lines",
+            "created_times",
+            b"created_times",
+            "execute",
+            b"execute",
+            "task_ids",
+            b"task_ids",
+            "wants_output",
+            b"wants_output",
+        ],
+    ) -> None: ...
+
+global___TaskBatch = TaskBatch
+
+class Argument(google.protobuf.message.Message):
+    """Argument made of literal text and variables, in this order: literals[0],
+    variables[0], literals[1], ..., variables[n-1], literals[n].
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    LITERALS_FIELD_NUMBER: builtins.int
+    VARIABLES_FIELD_NUMBER: builtins.int
+    @property
+    def literals(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[
+        typing.Text
+    ]: ...
+    @property
+    def variables(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___Variable
+    ]: ...
+    def __init__(
+        self,
+        *,
+        literals: typing.Optional[typing.Iterable[typing.Text]] = ...,
+        variables: typing.Optional[typing.Iterable[global___Variable]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions.Literal[
+            "literals", b"literals", "variables", b"variables"
+        ],
+    ) -> None: ...
+
+global___Argument = Argument
+
+class Variable(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    COLUMN_FIELD_NUMBER: builtins.int
+    NAME_FIELD_NUMBER: builtins.int
+    column: builtins.int
+    """Index of the column with the values of the variable."""
+
+    name: typing.Text
+    """Name of a variable replaced by the client, e.g. "%taskUUID%"."""
+
+    def __init__(
+        self,
+        *,
+        column: builtins.int = ...,
+        name: typing.Text = ...,
+    ) -> None: ...
+    def HasField(
+        self,
+        field_name: typing_extensions.Literal[
+            "column", b"column", "name", b"name", "value", b"value"
+        ],
+    ) -> builtins.bool: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions.Literal[
+            "column", b"column", "name", b"name", "value", b"value"
+        ],
+    ) -> None: ...
+    def WhichOneof(
+        self, oneof_group: typing_extensions.Literal["value", b"value"]
+    ) -> typing.Optional[typing_extensions.Literal["column", "name"]]: ...
+
+global___Variable = Variable
+
+class Column(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    VALUES_FIELD_NUMBER: builtins.int
+    @property
+    def values(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[
+        typing.Text
+    ]: ...
+    def __init__(
+        self,
+        *,
+        values: typing.Optional[typing.Iterable[typing.Text]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions.Literal["values", b"values"]
+    ) -> None: ...
+
+global___Column = Column
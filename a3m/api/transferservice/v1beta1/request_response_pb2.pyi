@@ -4,6 +4,7 @@ isort:skip_file
 """
 import builtins
 import google.protobuf.descriptor
+import google.protobuf.field_mask_pb2
 import google.protobuf.internal.containers
 import google.protobuf.internal.enum_type_wrapper
 import google.protobuf.message
@@ -40,21 +41,62 @@ PACKAGE_STATUS_COMPLETE: PackageStatus.ValueType  # 3
 PACKAGE_STATUS_PROCESSING: PackageStatus.ValueType  # 4
 global___PackageStatus = PackageStatus
 
+class _PackagePriority:
+    ValueType = typing.NewType("ValueType", builtins.int)
+    V: typing_extensions.TypeAlias = ValueType
+
+class _PackagePriorityEnumTypeWrapper(
+    google.protobuf.internal.enum_type_wrapper._EnumTypeWrapper[
+        _PackagePriority.ValueType
+    ],
+    builtins.type,
+):
+    DESCRIPTOR: google.protobuf.descriptor.EnumDescriptor
+    PACKAGE_PRIORITY_UNSPECIFIED: _PackagePriority.ValueType  # 0
+    """Same as PACKAGE_PRIORITY_NORMAL."""
+
+    PACKAGE_PRIORITY_LOW: _PackagePriority.ValueType  # 1
+    PACKAGE_PRIORITY_NORMAL: _PackagePriority.ValueType  # 2
+    PACKAGE_PRIORITY_HIGH: _PackagePriority.ValueType  # 3
+
+class PackagePriority(_PackagePriority, metaclass=_PackagePriorityEnumTypeWrapper):
+    pass
+
+PACKAGE_PRIORITY_UNSPECIFIED: PackagePriority.ValueType  # 0
+"""Same as PACKAGE_PRIORITY_NORMAL."""
+
+PACKAGE_PRIORITY_LOW: PackagePriority.ValueType  # 1
+PACKAGE_PRIORITY_NORMAL: PackagePriority.ValueType  # 2
+PACKAGE_PRIORITY_HIGH: PackagePriority.ValueType  # 3
+global___PackagePriority = PackagePriority
+
 class SubmitRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
     NAME_FIELD_NUMBER: builtins.int
     URL_FIELD_NUMBER: builtins.int
     CONFIG_FIELD_NUMBER: builtins.int
+    PRIORITY_FIELD_NUMBER: builtins.int
+    SUBMITTER_FIELD_NUMBER: builtins.int
     name: typing.Text
     url: typing.Text
     @property
     def config(self) -> global___ProcessingConfig: ...
+    priority: global___PackagePriority.ValueType
+    """Packages with higher priority are admitted for processing first."""
+
+    submitter: typing.Text
+    """Identifier of the submitter, used to share processing capacity between
+    submitters when fair-share admission is enabled.
+    """
+
     def __init__(
         self,
         *,
         name: typing.Text = ...,
         url: typing.Text = ...,
         config: typing.Optional[global___ProcessingConfig] = ...,
+        priority: global___PackagePriority.ValueType = ...,
+        submitter: typing.Text = ...,
     ) -> None: ...
     def HasField(
         self, field_name: typing_extensions.Literal["config", b"config"]
@@ -62,7 +104,16 @@ class SubmitRequest(google.protobuf.message.Message):
     def ClearField(
         self,
         field_name: typing_extensions.Literal[
-            "config", b"config", "name", b"name", "url", b"url"
+            "config",
+            b"config",
+            "name",
+            b"name",
+            "priority",
+            b"priority",
+            "submitter",
+            b"submitter",
+            "url",
+            b"url",
         ],
     ) -> None: ...
 
@@ -130,14 +181,47 @@ global___ReadResponse = ReadResponse
 class ListTasksRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
     JOB_ID_FIELD_NUMBER: builtins.int
+    PAGE_SIZE_FIELD_NUMBER: builtins.int
+    PAGE_TOKEN_FIELD_NUMBER: builtins.int
+    READ_MASK_FIELD_NUMBER: builtins.int
     job_id: typing.Text
+    page_size: builtins.int
+    """Maximum number of tasks returned in a page. The server chooses a
+    default when unset and caps larger values.
+    """
+
+    page_token: typing.Text
+    """Token returned in a previous response to retrieve the following page."""
+
+    @property
+    def read_mask(self) -> google.protobuf.field_mask_pb2.FieldMask:
+        """Fields of the tasks to include, e.g. leave out `stdout` and `stderr`
+        to inspect large jobs cheaply. All fields are included when unset.
+        """
+        pass
     def __init__(
         self,
         *,
         job_id: typing.Text = ...,
+        page_size: builtins.int = ...,
+        page_token: typing.Text = ...,
+        read_mask: typing.Optional[google.protobuf.field_mask_pb2.FieldMask] = ...,
     ) -> None: ...
+    def HasField(
+        self, field_name: typing_extensions.Literal["read_mask", b"read_mask"]
+    ) -> builtins.bool: ...
     def ClearField(
-        self, field_name: typing_extensions.Literal["job_id", b"job_id"]
+        self,
+        field_name: typing_extensions.Literal[
+            "job_id",
+            b"job_id",
+            "page_size",
+            b"page_size",
+            "page_token",
+            b"page_token",
+            "read_mask",
+            b"read_mask",
+        ],
     ) -> None: ...
 
 global___ListTasksRequest = ListTasksRequest
@@ -145,23 +229,203 @@ global___ListTasksRequest = ListTasksRequest
 class ListTasksResponse(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
     TASKS_FIELD_NUMBER: builtins.int
+    NEXT_PAGE_TOKEN_FIELD_NUMBER: builtins.int
     @property
     def tasks(
         self,
     ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
         global___Task
     ]: ...
+    next_page_token: typing.Text
+    """Token to retrieve the next page, empty if there are no more tasks."""
+
     def __init__(
         self,
         *,
         tasks: typing.Optional[typing.Iterable[global___Task]] = ...,
+        next_page_token: typing.Text = ...,
     ) -> None: ...
     def ClearField(
-        self, field_name: typing_extensions.Literal["tasks", b"tasks"]
+        self,
+        field_name: typing_extensions.Literal[
+            "next_page_token", b"next_page_token", "tasks", b"tasks"
+        ],
     ) -> None: ...
 
 global___ListTasksResponse = ListTasksResponse
 
+class WatchRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    ID_FIELD_NUMBER: builtins.int
+    id: typing.Text
+    def __init__(
+        self,
+        *,
+        id: typing.Text = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions.Literal["id", b"id"]
+    ) -> None: ...
+
+global___WatchRequest = WatchRequest
+
+class WatchResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    STATUS_FIELD_NUMBER: builtins.int
+    JOB_FIELD_NUMBER: builtins.int
+    JOBS_FIELD_NUMBER: builtins.int
+    status: global___PackageStatus.ValueType
+    """Status of the package, PACKAGE_STATUS_PROCESSING until the last event."""
+    @property
+    def job(self) -> global___Job:
+        """Job that started or finished. Unset in the last event."""
+        pass
+    @property
+    def jobs(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___Job
+    ]:
+        """All the jobs of the package. Only set in the last event."""
+        pass
+    def __init__(
+        self,
+        *,
+        status: global___PackageStatus.ValueType = ...,
+        job: typing.Optional[global___Job] = ...,
+        jobs: typing.Optional[typing.Iterable[global___Job]] = ...,
+    ) -> None: ...
+    def HasField(
+        self, field_name: typing_extensions.Literal["job", b"job"]
+    ) -> builtins.bool: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions.Literal[
+            "job", b"job", "jobs", b"jobs", "status", b"status"
+        ],
+    ) -> None: ...
+
+global___WatchResponse = WatchResponse
+
+class BatchSubmitRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    PACKAGES_FIELD_NUMBER: builtins.int
+    @property
+    def packages(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___SubmitRequest
+    ]:
+        """Packages to submit. Either all of them are accepted or none is."""
+        pass
+    def __init__(
+        self,
+        *,
+        packages: typing.Optional[typing.Iterable[global___SubmitRequest]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions.Literal["packages", b"packages"]
+    ) -> None: ...
+
+global___BatchSubmitRequest = BatchSubmitRequest
+
+class BatchSubmitResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    IDS_FIELD_NUMBER: builtins.int
+    @property
+    def ids(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[typing.Text]:
+        """Identifiers of the packages, in the order they were submitted."""
+        pass
+    def __init__(
+        self,
+        *,
+        ids: typing.Optional[typing.Iterable[typing.Text]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions.Literal["ids", b"ids"]
+    ) -> None: ...
+
+global___BatchSubmitResponse = BatchSubmitResponse
+
+class BatchReadRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    IDS_FIELD_NUMBER: builtins.int
+    @property
+    def ids(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[
+        typing.Text
+    ]: ...
+    def __init__(
+        self,
+        *,
+        ids: typing.Optional[typing.Iterable[typing.Text]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self, field_name: typing_extensions.Literal["ids", b"ids"]
+    ) -> None: ...
+
+global___BatchReadRequest = BatchReadRequest
+
+class BatchReadResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    PACKAGES_FIELD_NUMBER: builtins.int
+    NOT_FOUND_FIELD_NUMBER: builtins.int
+    @property
+    def packages(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[
+        global___PackageSummary
+    ]:
+        """Packages found, in the order they were requested."""
+        pass
+    @property
+    def not_found(
+        self,
+    ) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[typing.Text]:
+        """Identifiers that don't match any package."""
+        pass
+    def __init__(
+        self,
+        *,
+        packages: typing.Optional[typing.Iterable[global___PackageSummary]] = ...,
+        not_found: typing.Optional[typing.Iterable[typing.Text]] = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions.Literal[
+            "not_found", b"not_found", "packages", b"packages"
+        ],
+    ) -> None: ...
+
+global___BatchReadResponse = BatchReadResponse
+
+class PackageSummary(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+    ID_FIELD_NUMBER: builtins.int
+    STATUS_FIELD_NUMBER: builtins.int
+    JOB_FIELD_NUMBER: builtins.int
+    id: typing.Text
+    status: global___PackageStatus.ValueType
+    job: typing.Text
+    def __init__(
+        self,
+        *,
+        id: typing.Text = ...,
+        status: global___PackageStatus.ValueType = ...,
+        job: typing.Text = ...,
+    ) -> None: ...
+    def ClearField(
+        self,
+        field_name: typing_extensions.Literal[
+            "id", b"id", "job", b"job", "status", b"status"
+        ],
+    ) -> None: ...
+
+global___PackageSummary = PackageSummary
+
 class Job(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
 
@@ -31,6 +31,26 @@ class TransferServiceStub:
             request_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksRequest.SerializeToString,
             response_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksResponse.FromString,
         )
+        self.Watch = channel.unary_stream(
+            "/a3m.api.transferservice.v1beta1.TransferService/Watch",
+            request_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.WatchRequest.SerializeToString,
+            response_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.WatchResponse.FromString,
+        )
+        self.BatchSubmit = channel.unary_unary(
+            "/a3m.api.transferservice.v1beta1.TransferService/BatchSubmit",
+            request_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchSubmitRequest.SerializeToString,
+            response_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchSubmitResponse.FromString,
+        )
+        self.BatchRead = channel.unary_unary(
+            "/a3m.api.transferservice.v1beta1.TransferService/BatchRead",
+            request_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchReadRequest.SerializeToString,
+            response_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchReadResponse.FromString,
+        )
+        self.StreamTasks = channel.unary_stream(
+            "/a3m.api.transferservice.v1beta1.TransferService/StreamTasks",
+            request_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksRequest.SerializeToString,
+            response_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksResponse.FromString,
+        )
 
 
 class TransferServiceServicer:
@@ -54,6 +74,30 @@ class TransferServiceServicer:
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def Watch(self, request, context):
+        """Streams the processing events of a given transfer until it's done."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def BatchSubmit(self, request, context):
+        """Submits many transfers at once."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def BatchRead(self, request, context):
+        """Reads the status of many transfers at once."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def StreamTasks(self, request, context):
+        """Streams all tasks in a given transfer, one page per message."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_TransferServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -72,6 +116,26 @@ def add_TransferServiceServicer_to_server(servicer, server):
             request_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksRequest.FromString,
             response_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksResponse.SerializeToString,
         ),
+        "Watch": grpc.unary_stream_rpc_method_handler(
+            servicer.Watch,
+            request_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.WatchRequest.FromString,
+            response_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.WatchResponse.SerializeToString,
+        ),
+        "BatchSubmit": grpc.unary_unary_rpc_method_handler(
+            servicer.BatchSubmit,
+            request_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchSubmitRequest.FromString,
+            response_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchSubmitResponse.SerializeToString,
+        ),
+        "BatchRead": grpc.unary_unary_rpc_method_handler(
+            servicer.BatchRead,
+            request_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchReadRequest.FromString,
+            response_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchReadResponse.SerializeToString,
+        ),
+        "StreamTasks": grpc.unary_stream_rpc_method_handler(
+            servicer.StreamTasks,
+            request_deserializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksRequest.FromString,
+            response_serializer=a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksResponse.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "a3m.api.transferservice.v1beta1.TransferService", rpc_method_handlers
@@ -169,3 +233,119 @@ class TransferService:
             timeout,
             metadata,
         )
+
+    @staticmethod
+    def Watch(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/a3m.api.transferservice.v1beta1.TransferService/Watch",
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.WatchRequest.SerializeToString,
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.WatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def BatchSubmit(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/a3m.api.transferservice.v1beta1.TransferService/BatchSubmit",
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchSubmitRequest.SerializeToString,
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchSubmitResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def BatchRead(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/a3m.api.transferservice.v1beta1.TransferService/BatchRead",
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchReadRequest.SerializeToString,
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.BatchReadResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
+
+    @staticmethod
+    def StreamTasks(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/a3m.api.transferservice.v1beta1.TransferService/StreamTasks",
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksRequest.SerializeToString,
+            a3m_dot_api_dot_transferservice_dot_v1beta1_dot_request__response__pb2.ListTasksResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+        )
@@ -94,22 +94,50 @@ def normalizeNonDcElementName(string):
     return normalized_string
 
 
+# Size of the reads made to hash files, a multiple of the page size.
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
 def get_file_checksum(filename, algorithm="sha256"):
     """
     Perform a checksum on the specified file.
 
     This function reads in files incrementally to avoid memory exhaustion.
-    See: https://stackoverflow.com/a/4213255
 
     :param filename: The path to the file we want to check
     :param algorithm: Which algorithm to use for hashing, e.g. 'md5'
     :return: Returns a checksum string for the specified file.
     """
-    hash_ = hashlib.new(algorithm)
-    with open(filename, "rb") as file_:
-        for chunk in iter(lambda: file_.read(1024 * hash_.block_size), b""):
-            hash_.update(chunk)
-    return hash_.hexdigest()
+    _, checksums = get_file_checksums(filename, [algorithm])
+    return checksums[algorithm]
+
+
+def get_file_checksums(filename, algorithms):
+    """
+    Perform a checksum on the specified file with several algorithms in one
+    read.
+
+    Chunks are read into the same buffer without going through the buffering
+    of the file object, and hashlib releases the GIL while hashing them so
+    several files can be hashed concurrently by threads.
+
+    :param filename: The path to the file we want to check
+    :param algorithms: Which algorithms to use for hashing, e.g. ['md5']
+    :return: Returns the stat result of the file when it was opened and a
+        dict of the checksum strings keyed by algorithm.
+    """
+    hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    buffer = bytearray(CHECKSUM_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(filename, "rb", buffering=0) as file_:
+        stat = os.fstat(file_.fileno())
+        while True:
+            size = file_.readinto(buffer)
+            if not size:
+                break
+            for hash_ in hashes.values():
+                hash_.update(view[:size])
+    return stat, {algorithm: hash_.hexdigest() for algorithm, hash_ in hashes.items()}
 
 
 def find_metadata_files(sip_path, filename, only_transfers=False):
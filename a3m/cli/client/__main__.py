@@ -71,7 +71,7 @@ def main(ctx, uri, name, address, processing_config, wait_for_ready, no_input):
         resp = cw.client.submit(uri, name, processing_config)
         click.secho(f"AIP {resp.id} is being generated...")
 
-        resp = cw.client.wait_until_complete(resp.id)
+        resp = cw.client.watch_until_complete(resp.id)
 
         if (status := resp.status) in (
             transfer_service_api.request_response_pb2.PACKAGE_STATUS_FAILED,
@@ -173,13 +173,13 @@ def _print_failed_jobs(client: Client, jobs):
             item.link_id,
         )
         console.print(table)
+        task: transfer_service_api.request_response_pb2.Task
         try:
-            resp = client.list_tasks(item.id)
+            tasks = list(client.stream_tasks(item.id))
         except Exception:
             console.print("Tasks could not be loaded.")
             continue
-        task: transfer_service_api.request_response_pb2.Task
-        for task in resp.tasks:
+        for task in tasks:
             content = f"""[bold]Task {task.id}[/]
 
 Module [bold]{task.execution}[/] (with arguments: [dim]{task.arguments}[/])
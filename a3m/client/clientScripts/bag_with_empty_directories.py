@@ -15,18 +15,27 @@
 # You should have received a copy of the GNU General Public License
 # along with Archivematica.  If not, see <http://www.gnu.org/licenses/>.
 import argparse
-import multiprocessing
+import datetime
+import logging
 import os
+import re
 import shutil
 
-from bagit import make_bag
+import bagit
 from django.conf import settings as mcpclient_settings
 
+from a3m import fs
+from a3m import hashing
+from a3m.main.models import File
+
+
+logger = logging.getLogger(__name__)
+
 
 def get_sip_directories(job, sip_dir):
     """Get a list of directories in the SIP, to be created after bagged."""
     directory_list = []
-    for directory, subdirs, _ in os.walk(sip_dir):
+    for directory, subdirs, _ in fs.scan(sip_dir).walk():
         for subdir in subdirs:
             path = os.path.join(directory, subdir).replace(sip_dir + "/", "", 1)
             directory_list.append(path)
@@ -52,29 +61,137 @@ def create_directories(base_dir, dir_list):
 _PAYLOAD_ENTRIES = ("logs/", "objects/", "README.html", "metadata/")
 
 
+def link_file(src, dst):
+    """Hard link a file into the bag, or copy it when it can't be linked,
+    e.g. across filesystems.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def link_payload(sip_directory, items, data_dir):
+    """Link the payload items of the SIP into the data directory of the bag.
+
+    Returns the paths of the payload files relative to the bag, mapped to the
+    paths of the files of the SIP they were linked from.
+    """
+    payload = {}  # path relative to the bag: path in the SIP
+    for item in items:
+        src = os.path.join(sip_directory, item)
+        # Omit payload items that don't exist
+        if not os.path.exists(src):
+            continue
+        name = os.path.basename(os.path.normpath(src))
+        if os.path.isfile(src):
+            dst = os.path.join(data_dir, name)
+            link_file(src, dst)
+            payload[os.path.join("data", name)] = src
+            continue
+        for dirpath, _, filenames in fs.scan(src).walk():
+            dst_dir = os.path.join(data_dir, name, os.path.relpath(dirpath, src))
+            os.makedirs(dst_dir, exist_ok=True)
+            shutil.copystat(dirpath, dst_dir)
+            for filename in filenames:
+                file_src = os.path.join(dirpath, filename)
+                file_dst = os.path.join(dst_dir, filename)
+                link_file(file_src, file_dst)
+                path = os.path.relpath(file_dst, os.path.dirname(data_dir))
+                payload[path] = file_src
+    return payload
+
+
+def get_payload_digests(payload, sip_directory, sip_uuid, algorithm):
+    """Return the digests of the payload files, keyed by their path relative
+    to the bag.
+
+    The digests of the files of the SIP are reused when they're stored and
+    the files are unchanged, see `a3m.hashing.digest_files`. Other files,
+    e.g. the METS file or the logs, are hashed.
+    """
+    tracked = {}  # path in the SIP: file UUID
+    files = File.objects.filter(sip_id=sip_uuid, removedtime__isnull=True)
+    for file_uuid, location in files.values_list("uuid", "currentlocation"):
+        location = re.sub(r"^%[^%]+%", "", location or "")
+        tracked[os.path.normpath(os.path.join(sip_directory, location))] = str(
+            file_uuid
+        )
+
+    file_paths = {}  # file UUID: path in the SIP
+    untracked = {}  # path relative to the bag: (path in the SIP, algorithms)
+    for path, src in payload.items():
+        file_uuid = tracked.get(os.path.normpath(src))
+        if file_uuid is None:
+            untracked[path] = (src, [algorithm])
+        else:
+            file_paths[file_uuid] = src
+    results = hashing.digest_files(file_paths, [algorithm])
+    results = {
+        path: results[tracked[os.path.normpath(src)]]
+        for path, src in payload.items()
+        if os.path.normpath(src) in tracked
+    }
+    results.update(hashing.hash_files(untracked))
+
+    for result in results.values():
+        if isinstance(result, OSError):
+            raise result
+    return results
+
+
+def write_bag(destination, digests, algorithm, bag_info):
+    """Write the tag files of a bag whose payload is in place, with the
+    manifest computed from ``digests`` instead of hashing the payload.
+    """
+    with open(
+        os.path.join(destination, f"manifest-{algorithm}.txt"), "w", encoding="utf-8"
+    ) as manifest:
+        for path in sorted(digests):
+            # Paths are encoded like bagit.make_bag does.
+            path_encoded = path.replace("\r", "%0D").replace("\n", "%0A")
+            manifest.write(
+                "{}  {}\n".format(digests[path].digests[algorithm], path_encoded)
+            )
+    with open(os.path.join(destination, "bagit.txt"), "w", encoding="utf-8") as f:
+        f.write("BagIt-Version: 0.97\nTag-File-Character-Encoding: UTF-8\n")
+
+    bag = bagit.Bag(destination)
+    bag.info.update(
+        {
+            "Bagging-Date": datetime.date.today().strftime("%Y-%m-%d"),
+            "Bag-Software-Agent": "bagit.py v{} <{}>".format(
+                bagit.VERSION, bagit.PROJECT_URL
+            ),
+            "Payload-Oxum": "{}.{}".format(
+                sum(result.size for result in digests.values()), len(digests)
+            ),
+        }
+    )
+    bag.info.update(bag_info)
+    # Writes bag-info.txt and the tag manifest, the payload isn't hashed.
+    bag.save()
+
+
 def bag_with_empty_directories(job, destination, sip_directory, sip_uuid, algorithm):
-    """Create BagIt and include any empty directories from the SIP."""
+    """Create BagIt and include any empty directories from the SIP.
+
+    The payload is hard linked into the bag rather than copied, and the
+    manifest is written with the digests stored for the files of the SIP.
+    """
     # Get list of directories in SIP
     dir_list = get_sip_directories(job, sip_directory)
     payload_entries = _PAYLOAD_ENTRIES + ("METS.%s.xml" % sip_uuid,)
     os.mkdir(destination)
-    for item in payload_entries:
-        item = os.path.join(sip_directory, item)
-        # Omit payload items that don't exist
-        if not os.path.exists(item):
-            continue
-        if os.path.isfile(item):
-            shutil.copy(item, destination)
-        else:
-            dst = os.path.join(destination, os.path.basename(os.path.dirname(item)))
-            shutil.copytree(item, dst)
-    make_bag(
-        destination,
-        processes=multiprocessing.cpu_count(),
-        bag_info={"External-Identifier": sip_uuid},
-        checksums=[algorithm],
-    )
-    create_directories(os.path.join(destination, "data"), dir_list)
+    data_dir = os.path.join(destination, "data")
+    os.mkdir(data_dir)
+    # permissions for the payload directory should match those of the
+    # bag directory, like bagit.make_bag does.
+    os.chmod(data_dir, os.stat(destination).st_mode)
+    payload = link_payload(sip_directory, payload_entries, data_dir)
+    digests = get_payload_digests(payload, sip_directory, sip_uuid, algorithm)
+    write_bag(destination, digests, algorithm, {"External-Identifier": sip_uuid})
+    create_directories(data_dir, dir_list)
 
 
 def call(jobs):
@@ -8,12 +8,16 @@
 from django.db import transaction
 from lxml import etree
 
+from a3m.client.fpr_index import get_fpr_index
+from a3m.client.result_cache import file_digest
+from a3m.client.result_cache import get_result_cache
+from a3m.client.result_cache import rule_cache_key
 from a3m.dicts import replace_string_values
 from a3m.dicts import ReplacementDict
 from a3m.dicts import setup_dicts
 from a3m.executeOrRunSubProcess import executeOrRun
 from a3m.fpr.models import FormatVersion
-from a3m.fpr.models import FPRule
+from a3m.main.models import File
 from a3m.main.models import FPCommandOutput
 
 
@@ -23,6 +27,33 @@ def _insert_command_output(file_uuid, rule_uuid, content):
     )
 
 
+def _run_rule(job, rule, file_uuid, sip_uuid):
+    if (
+        rule.command.script_type == "bashScript"
+        or rule.command.script_type == "command"
+    ):
+        args = []
+        command_to_execute = replace_string_values(
+            rule.command.command, file_=file_uuid, sip=sip_uuid, type_="file"
+        )
+    else:
+        rd = ReplacementDict.frommodel(file_=file_uuid, sip=sip_uuid, type_="file")
+        args = rd.to_gnu_options()
+        command_to_execute = rule.command.command
+
+    exitstatus, stdout, stderr = executeOrRun(
+        rule.command.script_type,
+        command_to_execute,
+        arguments=args,
+        capture_output=True,
+    )
+
+    job.write_output(stdout)
+    job.write_error(stderr)
+
+    return exitstatus, stdout
+
+
 def main(job, file_path, file_uuid, sip_uuid):
     setup_dicts()
 
@@ -39,7 +70,7 @@ def main(job, file_path, file_uuid, sip_uuid):
         rules = format = None
 
     if format:
-        rules = FPRule.active.filter(format=format.uuid, purpose="characterization")
+        rules = get_fpr_index().get_rules("characterization", format)
 
     # Characterization always occurs - if nothing is specified, get one or more
     # defaults specified in the FPR.
@@ -48,29 +79,20 @@ def main(job, file_path, file_uuid, sip_uuid):
         # rules = FPRule.active.filter(purpose="default_characterization")
         return 0
 
+    cache = get_result_cache()
+    digest = file_digest(File.objects.filter(uuid=file_uuid).first(), file_path)
+    cache.load(rule_cache_key(digest, "characterize_file", rule) for rule in rules)
+
     for rule in rules:
-        if (
-            rule.command.script_type == "bashScript"
-            or rule.command.script_type == "command"
-        ):
-            args = []
-            command_to_execute = replace_string_values(
-                rule.command.command, file_=file_uuid, sip=sip_uuid, type_="file"
-            )
+        key = rule_cache_key(digest, "characterize_file", rule)
+        stdout = cache.get(key)
+        if stdout is not None:
+            job.write_output(stdout)
+            exitstatus = 0
         else:
-            rd = ReplacementDict.frommodel(file_=file_uuid, sip=sip_uuid, type_="file")
-            args = rd.to_gnu_options()
-            command_to_execute = rule.command.command
-
-        exitstatus, stdout, stderr = executeOrRun(
-            rule.command.script_type,
-            command_to_execute,
-            arguments=args,
-            capture_output=True,
-        )
-
-        job.write_output(stdout)
-        job.write_error(stderr)
+            exitstatus, stdout = _run_rule(job, rule, file_uuid, sip_uuid)
+            if exitstatus == 0:
+                cache.put(key, stdout)
 
         if exitstatus != 0:
             job.write_error(
@@ -114,6 +136,8 @@ def main(job, file_path, file_uuid, sip_uuid):
                 )
             )
 
+    cache.flush()
+
     if failed:
         return 255
     else:
@@ -36,6 +36,7 @@ from django.utils import timezone
 from .archivematicaCreateMETSMetadataCSV import parseMetadata
 from .archivematicaCreateMETSRights import archivematicaGetRights
 from .sanitize_names import sanitize_name
+from a3m import fs
 from a3m import namespaces as ns
 from a3m.archivematicaFunctions import escape
 from a3m.archivematicaFunctions import normalizeNonDcElementName
@@ -1247,16 +1248,19 @@ def write_mets(tree, filename):
         f.write(fileContents)
 
 
-def get_paths_as_fsitems(baseDirectoryPath, objectsDirectoryPath):
+def get_paths_as_fsitems(baseDirectoryPath, objectsDirectoryPath, snapshot=None):
     """Get all paths in the SIP as ``FSItem`` instances before deleting any
     empty directories. These filesystem items are crucially ordered so that
     directories always precede the paths of the items they contain.
     :param string baseDirectoryPath: path to the AIP with a trailing slash
     :param string objectsDirectoryPath: path to the AIP's object directory
+    :param snapshot: ``fs.Snapshot`` of the AIP, scanned if not given
     :returns: list of ``FSItem`` instances representing paths
     """
+    if snapshot is None:
+        snapshot = fs.scan(objectsDirectoryPath)
     all_fsitems = []
-    for root, dirs, files in os.walk(objectsDirectoryPath):
+    for root, dirs, files in snapshot.walk(objectsDirectoryPath):
         root = root.replace(baseDirectoryPath, "", 1)
         if files or dirs:
             all_fsitems.append(FSItem("dir", root, is_empty=False))
@@ -1270,12 +1274,13 @@ def get_paths_as_fsitems(baseDirectoryPath, objectsDirectoryPath):
 
 
 def get_normative_structmap(
-    baseDirectoryPath, objectsDirectoryPath, directories, state
+    baseDirectoryPath, objectsDirectoryPath, directories, state, snapshot=None
 ):
     """Get a normative structMap representing the paths within a SIP.
     :param string baseDirectoryPath: path to the AIP with a trailing slash
     :param string objectsDirectoryPath: path to the AIP's object directory
     :param dict directories: maps directory model instance ``currentlocation``
+    :param snapshot: ``fs.Snapshot`` of the AIP, scanned if not given
     :returns: etree Element representing structMap XML
     """
     normativeStructMap = etree.Element(
@@ -1290,7 +1295,9 @@ def get_normative_structmap(
         TYPE="Directory",
         LABEL=os.path.basename(baseDirectoryPath.rstrip("/")),
     )
-    all_fsitems = get_paths_as_fsitems(baseDirectoryPath, objectsDirectoryPath)
+    all_fsitems = get_paths_as_fsitems(
+        baseDirectoryPath, objectsDirectoryPath, snapshot
+    )
     add_normative_structmap_div(all_fsitems, normativeStructMapDiv, directories, state)
     return normativeStructMap
 
@@ -1432,18 +1439,26 @@ def call(jobs):
                     structMap, ns.metsBNS + "div", TYPE="Directory", LABEL=sip_dir_name
                 )
 
+                # The same snapshot is used to build the normative structmap
+                # and to find the empty directories.
+                snapshot = fs.scan(baseDirectoryPath)
+
                 if createNormativeStructmap:
                     # Create the normative structmap.
                     state.globalStructMapCounter += 1
                     normativeStructMap = get_normative_structmap(
-                        baseDirectoryPath, objectsDirectoryPath, directories, state
+                        baseDirectoryPath,
+                        objectsDirectoryPath,
+                        directories,
+                        state,
+                        snapshot,
                     )
                 else:
                     job.pyprint("Skipping creation of normative structmap")
                     normativeStructMap = None
 
                 # Delete empty directories, see #8427
-                for root, _, _ in os.walk(baseDirectoryPath, topdown=False):
+                for root, _, _ in snapshot.walk(topdown=False):
                     try:
                         os.rmdir(root)
                         job.pyprint("Deleted empty directory", root)
@@ -6,13 +6,16 @@ import uuid
 from django.db import transaction
 
 from .has_packages import already_extracted
+from a3m import fs
 from a3m.archivematicaFunctions import format_subdir_path
 from a3m.archivematicaFunctions import get_dir_uuids
+from a3m.client.fpr_index import get_fpr_index
 from a3m.databaseFunctions import fileWasRemoved
 from a3m.executeOrRunSubProcess import executeOrRun
 from a3m.fileOperations import addFileToTransfer
 from a3m.fileOperations import updateSizeAndChecksum
 from a3m.fpr.models import FPCommand
+from a3m.fpr.models import FPRule
 from a3m.main.models import Directory
 from a3m.main.models import File
 from a3m.main.models import FileFormatVersion
@@ -32,10 +35,8 @@ def temporary_directory(file_path, date, file_path_cache):
         return path, file_path_cache
 
 
-def tree(root):
-    for dirpath, __, files in os.walk(root):
-        for file in files:
-            yield os.path.join(dirpath, file)
+def tree(snapshot):
+    yield from snapshot.files()
 
 
 def assign_uuid(
@@ -75,8 +76,9 @@ def assign_uuid(
     job.pyprint("Assigning new file UUID:", file_uuid, "to file", filename)
 
 
-def _get_subdir_paths(job, root_path, path_prefix_to_repl, original_location):
-    """Return a generator of subdirectory paths in ``root_path`` with
+def _get_subdir_paths(job, snapshot, root_path, path_prefix_to_repl, original_location):
+    """Return a generator of subdirectory paths in ``root_path``, walked in
+    ``snapshot``, with
     the ancestor path ``path_prefix_to_repl`` replaced by a placeholder
     string. ``original_location`` should be the zip container that the content
     was extracted from as it was transferred. Between then and now the path
@@ -94,7 +96,7 @@ def _get_subdir_paths(job, root_path, path_prefix_to_repl, original_location):
 
     # Return a generator here that contains information about the current path
     # and the original path for the PREMIS information in the METS file.
-    for dir_path, __, ___ in os.walk(root_path):
+    for dir_path in snapshot.dirs(root_path):
         formatted_path = format_subdir_path(dir_path, path_prefix_to_repl)
         for dir_uuid in get_dir_uuids([formatted_path], logger, printfn=job.pyprint):
             dir_uuid["originalLocation"] = formatted_path.replace(
@@ -136,7 +138,7 @@ def main(job, transfer_uuid, sip_directory, date, task_uuid, delete=False):
                 file=sys.stderr,
             )
             continue
-        if format_id.format_version is None:
+        if format_id.format_version_id is None:
             job.pyprint(
                 "Not extracting contents from",
                 os.path.basename(file_.currentlocation),
@@ -146,13 +148,18 @@ def main(job, transfer_uuid, sip_directory, date, task_uuid, delete=False):
             continue
         # Extraction commands are defined in the FPR just like normalization
         # commands
-        try:
-            command = FPCommand.active.get(
-                fprule__format=format_id.format_version,
-                fprule__purpose="extract",
-                fprule__enabled=True,
+        commands = [
+            rule.command
+            for rule in get_fpr_index().get_rules(
+                FPRule.EXTRACTION, format_id.format_version_id
+            )
+            if rule.command.enabled
+        ]
+        if len(commands) > 1:
+            raise FPCommand.MultipleObjectsReturned(
+                f"{len(commands)} extraction commands found"
             )
-        except FPCommand.DoesNotExist:
+        if not commands:
             job.pyprint(
                 "Not extracting contents from",
                 os.path.basename(file_.currentlocation),
@@ -160,6 +167,7 @@ def main(job, transfer_uuid, sip_directory, date, task_uuid, delete=False):
                 file=sys.stderr,
             )
             continue
+        command = commands[0]
 
         # Check if file has already been extracted
         if already_extracted(file_):
@@ -210,7 +218,8 @@ def main(job, transfer_uuid, sip_directory, date, task_uuid, delete=False):
 
             # Assign UUIDs and insert them into the database, so the newly
             # extracted files are properly tracked by Archivematica
-            for extracted_file in tree(extraction_target):
+            snapshot = fs.scan(extraction_target)
+            for extracted_file in tree(snapshot):
                 extracted_file_original_location = extracted_file.replace(
                     extraction_target, file_.originallocation, 1
                 )
@@ -228,7 +237,7 @@ def main(job, transfer_uuid, sip_directory, date, task_uuid, delete=False):
 
             if transfer_mdl.diruuids:
                 create_extracted_dir_uuids(
-                    job, transfer_mdl, extraction_target, sip_directory, file_
+                    job, transfer_mdl, snapshot, extraction_target, sip_directory, file_
                 )
 
             # We may want to remove the original package file after extracting
@@ -245,12 +254,13 @@ def main(job, transfer_uuid, sip_directory, date, task_uuid, delete=False):
 
 
 def create_extracted_dir_uuids(
-    job, transfer_mdl, extraction_target, sip_directory, file_
+    job, transfer_mdl, snapshot, extraction_target, sip_directory, file_
 ):
     """Assign UUIDs to directories via ``Directory`` objects in the database."""
     Directory.create_many(
         dir_paths_uuids=_get_subdir_paths(
             job=job,
+            snapshot=snapshot,
             root_path=extraction_target,
             path_prefix_to_repl=sip_directory,
             original_location=file_.originallocation,
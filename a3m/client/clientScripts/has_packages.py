@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+from a3m.client.fpr_index import get_fpr_index
 from a3m.fpr.models import FPRule
 from a3m.main.models import Event
 from a3m.main.models import File
@@ -12,11 +13,11 @@ def is_extractable(f):
     """
     # Check if an extract FPRule exists
     try:
-        format = f.fileformatversion_set.get().format_version
+        format = f.fileformatversion_set.get().format_version_id
     except FileFormatVersion.DoesNotExist:
         return False
 
-    extract_rules = FPRule.active.filter(purpose="extract", format=format)
+    extract_rules = get_fpr_index().get_rules(FPRule.EXTRACTION, format)
     if extract_rules:
         return True
     else:
@@ -5,9 +5,14 @@ import uuid
 import pygfried
 from django.db import transaction
 
+from a3m.client.fpr_index import get_fpr_index
+from a3m.client.result_cache import cache_key
+from a3m.client.result_cache import file_digests
+from a3m.client.result_cache import get_result_cache
+from a3m.databaseFunctions import EventWriter
 from a3m.databaseFunctions import getUTCDate
 from a3m.databaseFunctions import insertIntoEvents
-from a3m.fpr.models import FormatVersion
+from a3m.main.models import Event
 from a3m.main.models import File
 from a3m.main.models import FileFormatVersion
 from a3m.main.models import FileID
@@ -19,16 +24,80 @@ TOOL_DESCRIPTION = "pygfried/siegfried"
 TOOL_VERSION = pygfried.version()
 
 
-def write_file_format_version(file_obj, format_version_obj):
-    (ffv, created) = FileFormatVersion.objects.get_or_create(
-        file_uuid=file_obj, defaults={"format_version": format_version_obj}
-    )
-    if not created:  # Update the version if it wasn't created new
-        ffv.format_version = format_version_obj
-        ffv.save()
+class Batch:
+    """Rows read and written while identifying a batch of files.
+
+    The files, their previous identification events and the results cached
+    for their digests are fetched in one query each, format versions are
+    looked up in the FPR index and the rows written for every file are
+    inserted in bulk by `save`.
+    """
+
+    def __init__(self, file_paths, disable_reidentify=False):
+        file_paths = {str(file_id): path for file_id, path in file_paths.items()}
+        file_ids = set(file_paths)
+        self.files = File.objects.in_bulk(file_ids)
+        self.digests = file_digests(
+            {file_obj: file_paths[file_id] for file_id, file_obj in self.files.items()}
+        )
+        self.results = get_result_cache()
+        self.results.load(self.cache_key(digest) for digest in self.digests.values())
+        self.identified = set()
+        if disable_reidentify:
+            self.identified.update(
+                Event.objects.filter(
+                    file_uuid_id__in=file_ids, event_type="format identification"
+                ).values_list("file_uuid_id", flat=True)
+            )
+        self.file_format_versions = {}  # File UUID: FormatVersion
+        self.file_ids = []
+        self.events = EventWriter()
+
+    @staticmethod
+    def cache_key(digest):
+        return cache_key(digest, "identify_file_format", tool_version=TOOL_VERSION)
+
+    def add_file_format_version(self, file_id, format_version_obj):
+        self.file_format_versions[str(file_id)] = format_version_obj
+
+    def add_file_id(self, file_id, format_version_obj):
+        """
+        Write the identified format to the DB.
+        """
+        self.file_ids.append(
+            FileID(
+                file_id=file_id,
+                format_name=format_version_obj.format.description,
+                format_version=format_version_obj.version or "",
+                format_registry_name="PRONOM",
+                format_registry_key=format_version_obj.pronom_id,
+            )
+        )
 
+    def save(self):
+        # Files identified before have their format version updated.
+        existing = list(
+            FileFormatVersion.objects.filter(file_uuid_id__in=self.file_format_versions)
+        )
+        for ffv in existing:
+            ffv.format_version = self.file_format_versions[ffv.file_uuid_id]
+        FileFormatVersion.objects.bulk_update(existing, ["format_version"])
+        updated = {ffv.file_uuid_id for ffv in existing}
+        FileFormatVersion.objects.bulk_create(
+            [
+                FileFormatVersion(file_uuid_id=file_id, format_version=fv)
+                for file_id, fv in self.file_format_versions.items()
+                if file_id not in updated
+            ]
+        )
+        FileID.objects.bulk_create(self.file_ids)
+        self.events.flush()
+        self.results.flush()
+        self.file_format_versions = {}
+        self.file_ids = []
 
-def write_identification_event(file_uuid, puid=None, success=True):
+
+def write_identification_event(file_uuid, puid=None, success=True, events=None):
     event_detail_text = 'program="{}"; version="{}"'.format(
         TOOL_DESCRIPTION, TOOL_VERSION
     )
@@ -42,7 +111,8 @@ def write_identification_event(file_uuid, puid=None, success=True):
 
     date = getUTCDate()
 
-    insertIntoEvents(
+    insert_event = insertIntoEvents if events is None else events.add
+    insert_event(
         fileUUID=file_uuid,
         eventIdentifierUUID=str(uuid.uuid4()),
         eventType="format identification",
@@ -53,50 +123,47 @@ def write_identification_event(file_uuid, puid=None, success=True):
     )
 
 
-def write_file_id(file_id, format_version_obj):
-    """
-    Write the identified format to the DB.
-    """
-    FileID.objects.create(
-        file_id=file_id,
-        format_name=format_version_obj.format.description,
-        format_version=format_version_obj.version or "",
-        format_registry_name="PRONOM",
-        format_registry_key=format_version_obj.pronom_id,
-    )
+def identify_file_format(file_path, file_id, disable_reidentify, batch=None):
+    if batch is None:
+        batch = Batch({file_id: file_path}, disable_reidentify)
+        try:
+            return identify_file_format(file_path, file_id, disable_reidentify, batch)
+        finally:
+            batch.save()
 
-
-def identify_file_format(file_path, file_id, disable_reidentify):
     # If reidentification is disabled and a format identification event exists for this file, exit
-    file_obj = File.objects.get(uuid=file_id)
-    if (
-        disable_reidentify
-        and file_obj.event_set.filter(event_type="format identification").exists()
-    ):
+    file_id = str(file_id)
+    file_obj = batch.files.get(file_id)
+    if file_obj is None:
+        raise File.DoesNotExist(f"File with UUID {file_id} does not exist")
+    if disable_reidentify and file_id in batch.identified:
         logger.debug(
             "This file has already been identified, and re-identification is disabled. Skipping."
         )
         return 0
 
-    try:
-        puid = pygfried.identify(file_path)
-    except Exception as err:
-        logger.error("Error running pygfried: %s", err)
-        return 255
+    key = batch.cache_key(batch.digests.get(file_id))
+    puid = batch.results.get(key)
+    if puid is None:
+        try:
+            puid = pygfried.identify(file_path)
+        except Exception as err:
+            logger.error("Error running pygfried: %s", err)
+            return 255
+        batch.results.put(key, puid)
 
     if not puid or puid == "UNKNOWN":
-        write_identification_event(file_id, success=False)
+        write_identification_event(file_id, success=False, events=batch.events)
         return 255
 
-    try:
-        format_version_obj = FormatVersion.active.get(pronom_id=puid)
-    except FormatVersion.DoesNotExist:
-        write_identification_event(file_id, success=False)
+    format_version_obj = get_fpr_index().get_format_version(puid)
+    if format_version_obj is None:
+        write_identification_event(file_id, success=False, events=batch.events)
         return 255
 
-    write_file_format_version(file_obj, format_version_obj)
-    write_identification_event(file_id, puid=puid)
-    write_file_id(file_id, format_version_obj)
+    batch.add_file_format_version(file_id, format_version_obj)
+    write_identification_event(file_id, puid=puid, events=batch.events)
+    batch.add_file_id(file_id, format_version_obj)
 
     return 0
 
@@ -111,14 +178,20 @@ def call(jobs):
         help="Disable identification if it has already happened for this file.",
     )
 
+    job_args = [parser.parse_args(job.args[1:]) for job in jobs]
     with transaction.atomic():
-        for job in jobs:
+        batch = Batch(
+            {args.file_uuid: args.file_path for args in job_args},
+            any(args.disable_reidentify for args in job_args),
+        )
+        for job, args in zip(jobs, job_args):
             with job.JobContext():
-                args = parser.parse_args(job.args[1:])
                 job.set_status(
                     identify_file_format(
                         args.file_path,
                         args.file_uuid,
                         args.disable_reidentify,
+                        batch,
                     )
                 )
+        batch.save()
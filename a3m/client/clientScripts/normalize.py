@@ -9,6 +9,8 @@ from django.utils import timezone
 
 from a3m import databaseFunctions
 from a3m import fileOperations
+from a3m import fs
+from a3m.client.fpr_index import get_fpr_index
 from a3m.dicts import ReplacementDict
 from a3m.dicts import setup_dicts
 from a3m.executeOrRunSubProcess import executeOrRun
@@ -267,12 +269,10 @@ def once_normalized(job, command, opts, replacement_dict):
     if os.path.isfile(command.output_location):
         transcoded_files.append(command.output_location)
     elif os.path.isdir(command.output_location):
-        for w in os.walk(command.output_location):
-            path, _, files = w
-            for p in files:
-                p = os.path.join(path, p)
-                if os.path.isfile(p):
-                    transcoded_files.append(p)
+        snapshot = fs.scan(command.output_location)
+        for p in snapshot.files():
+            if snapshot.entry(p).is_file():
+                transcoded_files.append(p)
     elif command.output_location:
         job.print_error(
             "Error - output file does not exist [", command.output_location, "]"
@@ -374,7 +374,7 @@ def insert_derivation_event(
 
 
 def get_default_preservation_rule():
-    return FPRule.active.get(purpose="default_preservation")
+    return get_fpr_index().get_rule("default_preservation")
 
 
 def main(job, opts):
@@ -444,8 +444,8 @@ def main(job, opts):
     if format_id:
         job.print_output("File format:", format_id.format_version)
         try:
-            rule = FPRule.active.get(
-                format=format_id.format_version, purpose=FPRule.PRESERVATION
+            rule = get_fpr_index().get_rule(
+                FPRule.PRESERVATION, format_id.format_version_id
             )
         except FPRule.DoesNotExist:
             do_fallback = True
@@ -16,11 +16,11 @@ import os
 from django.db import transaction
 
 from a3m import databaseFunctions
+from a3m.client.fpr_index import get_fpr_index
 from a3m.dicts import replace_string_values
 from a3m.dicts import setup_dicts
 from a3m.executeOrRunSubProcess import executeOrRun
 from a3m.fpr.models import FormatVersion
-from a3m.fpr.models import FPRule
 from a3m.main.models import Derivation
 from a3m.main.models import File
 from a3m.main.models import SIP
@@ -33,12 +33,12 @@ NOT_APPLICABLE_CODE = 0
 FAIL_CODE = 1
 
 
-def main(job, file_path, file_uuid, sip_uuid, shared_path, file_type):
+def main(job, file_path, file_uuid, sip_uuid, shared_path, file_type, events=None):
     """Entry point for policy checker."""
     setup_dicts()
 
     policy_checker = PolicyChecker(
-        job, file_path, file_uuid, sip_uuid, shared_path, file_type
+        job, file_path, file_uuid, sip_uuid, shared_path, file_type, events
     )
     return policy_checker.check()
 
@@ -55,7 +55,9 @@ class PolicyChecker:
     ``check`` method.
     """
 
-    def __init__(self, job, file_path, file_uuid, sip_uuid, shared_path, file_type):
+    def __init__(
+        self, job, file_path, file_uuid, sip_uuid, shared_path, file_type, events=None
+    ):
         """Initiate a new policy check."""
         self.job = job
         self.file_path = file_path
@@ -63,6 +65,7 @@ class PolicyChecker:
         self.sip_uuid = sip_uuid
         self.shared_path = shared_path
         self.file_type = file_type
+        self.events = events
         self.policies_dir = self._get_policies_dir()
         self.is_manually_normalized_access_derivative = (
             self._get_is_manually_normalized_access_derivative()
@@ -204,6 +207,13 @@ class PolicyChecker:
         except (File.DoesNotExist, File.MultipleObjectsReturned):
             return None
 
+    @property
+    def insert_event(self):
+        """Buffer events in ``self.events`` if given, insert them otherwise."""
+        if self.events is None:
+            return databaseFunctions.insertIntoEvents
+        return self.events.add
+
     def _get_rules(self):
         """Return the FPR rules with purpose ``self.purpose`` and that apply to
         the type/format of file given as input.
@@ -215,11 +225,12 @@ class PolicyChecker:
             fmt = FormatVersion.active.get(fileformatversion__file_uuid=file_uuid)
         except FormatVersion.DoesNotExist:
             rules = fmt = None
+        fpr_index = get_fpr_index()
         if fmt:
-            rules = FPRule.active.filter(format=fmt.uuid, purpose=self.purpose)
+            rules = fpr_index.get_rules(self.purpose, fmt)
         # Check for default rules.
         if not rules:
-            rules = FPRule.active.filter(purpose=f"default_{self.purpose}")
+            rules = fpr_index.get_rules(f"default_{self.purpose}")
         return rules
 
     def _execute_rule_command(self, rule):
@@ -288,7 +299,7 @@ class PolicyChecker:
         # transfer, i.e., the one that we retrieve in
         # ``_get_manually_normalized_access_derivative_file_uuid`` above?
         if not self.is_manually_normalized_access_derivative:
-            databaseFunctions.insertIntoEvents(
+            self.insert_event(
                 fileUUID=self.file_uuid,
                 eventType="validation",  # From PREMIS controlled vocab.
                 eventDetail=event_detail,
@@ -461,7 +472,7 @@ def _get_file_type(argv):
 
 
 def call(jobs):
-    with transaction.atomic():
+    with transaction.atomic(), databaseFunctions.EventWriter() as events:
         for job in jobs:
             with job.JobContext(logger=logger):
                 file_path = job.args[1]
@@ -473,7 +484,13 @@ def call(jobs):
                 try:
                     job.set_status(
                         main(
-                            job, file_path, file_uuid, sip_uuid, shared_path, file_type
+                            job,
+                            file_path,
+                            file_uuid,
+                            sip_uuid,
+                            shared_path,
+                            file_type,
+                            events,
                         )
                     )
                 except ValueError:
@@ -6,6 +6,7 @@ from django.utils import timezone
 
 from a3m import databaseFunctions
 from a3m import fileOperations
+from a3m.client.fpr_index import get_fpr_index
 from a3m.dicts import ReplacementDict
 from a3m.dicts import setup_dicts
 from a3m.executeOrRunSubProcess import executeOrRun
@@ -66,9 +67,7 @@ def insert_file_into_database(
 def fetch_rules_for(file_):
     try:
         format = FileFormatVersion.objects.get(file_uuid=file_)
-        return FPRule.objects.filter(
-            format=format.format_version, purpose="transcription"
-        )
+        return get_fpr_index().get_rules(FPRule.TRANSCRIPTION, format.format_version_id)
     except FileFormatVersion.DoesNotExist:
         return []
 
@@ -16,27 +16,51 @@
 # along with Archivematica.  If not, see <http://www.gnu.org/licenses/>.
 import argparse
 import logging
+import re
 import uuid
 
+from django.conf import settings
 from django.db import transaction
 
-from a3m.fileOperations import updateSizeAndChecksum
+from a3m import hashing
+from a3m.databaseFunctions import EventWriter
+from a3m.fileOperations import addChecksumEvent
 from a3m.main.models import File
 
 
 logger = logging.getLogger(__name__)
 
 
-def main(job, file_uuid, file_path, date, event_uuid):
-    try:
-        File.objects.get(uuid=file_uuid)
-    except File.DoesNotExist:
-        logger.exception("File with UUID %s cannot be found.", file_uuid)
-        return 1
+def unit_path(file_obj, file_path):
+    """Return the path of the unit of a file, found by removing its location
+    relative to the unit (e.g. ``%transferDirectory%objects/a.txt``) from its
+    path, or ``None``.
+    """
+    relative_location = re.sub(r"^%[^%]+%", "", file_obj.currentlocation or "")
+    if not relative_location or not file_path.endswith(relative_location):
+        return None
+    return file_path[: -len(relative_location)]
 
-    updateSizeAndChecksum(file_uuid, file_path, date, event_uuid)
 
-    return 0
+def get_algorithms(files, job_args):
+    """Return the algorithms to hash the file of each job with.
+
+    The checksum files provided with a transfer are hashed with the default
+    algorithm and the algorithms of the checksum files of its unit, so
+    verifying them doesn't read the files again.
+    """
+    unit_algorithms = {}  # unit path: algorithms
+    algorithms = []
+    for args in job_args:
+        file_algorithms = {settings.DEFAULT_CHECKSUM_ALGORITHM}
+        file_obj = files.get(args.file_uuid)
+        path = unit_path(file_obj, args.file_path) if file_obj else None
+        if path is not None:
+            if path not in unit_algorithms:
+                unit_algorithms[path] = hashing.checksum_file_algorithms(path)
+            file_algorithms.update(unit_algorithms[path])
+        algorithms.append(frozenset(file_algorithms))
+    return algorithms
 
 
 def call(jobs):
@@ -55,17 +79,38 @@ def call(jobs):
         dest="event_uuid",
     )
 
-    with transaction.atomic():
-        for job in jobs:
-            with job.JobContext(logger=logger):
-                args = parser.parse_args(job.args[1:])
+    job_args = [parser.parse_args(job.args[1:]) for job in jobs]
+    files = File.objects.in_bulk([args.file_uuid for args in job_args])
+    algorithm = settings.DEFAULT_CHECKSUM_ALGORITHM
+
+    # Files are hashed in one call per set of algorithms, usually just one.
+    results = {}
+    pending = {}  # algorithms: {file UUID: path}
+    for args, algorithms in zip(job_args, get_algorithms(files, job_args)):
+        if args.file_uuid in files:
+            pending.setdefault(algorithms, {})[args.file_uuid] = args.file_path
+    for algorithms, paths in pending.items():
+        results.update(hashing.digest_files(paths, algorithms))
 
-                job.set_status(
-                    main(
-                        job,
-                        args.file_uuid,
-                        args.file_path,
-                        args.date,
-                        args.event_uuid,
-                    )
+    updated = []
+    with transaction.atomic(), EventWriter() as events:
+        for job, args in zip(jobs, job_args):
+            with job.JobContext(logger=logger):
+                if args.file_uuid not in files:
+                    logger.error("File with UUID %s cannot be found.", args.file_uuid)
+                    job.set_status(1)
+                    continue
+                result = results[args.file_uuid]
+                if isinstance(result, OSError):
+                    raise result
+                file_obj = files[args.file_uuid]
+                file_obj.size = result.size
+                file_obj.checksum = result.digests[algorithm]
+                file_obj.checksumtype = algorithm
+                updated.append(file_obj)
+                addChecksumEvent(
+                    args.file_uuid, args.date, file_obj.checksum, algorithm, events
                 )
+                job.set_status(0)
+
+        File.objects.bulk_update(updated, ["size", "checksum", "checksumtype"])
@@ -9,6 +9,7 @@ Arguments:
 
 """
 import ast
+import functools
 import logging
 import os
 import sys
@@ -17,11 +18,14 @@ from pprint import pformat
 from django.db import transaction
 
 from a3m import databaseFunctions
+from a3m.client.fpr_index import get_fpr_index
+from a3m.client.result_cache import file_digest
+from a3m.client.result_cache import get_result_cache
+from a3m.client.result_cache import rule_cache_key
 from a3m.dicts import replace_string_values
 from a3m.dicts import setup_dicts
 from a3m.executeOrRunSubProcess import executeOrRun
 from a3m.fpr.models import FormatVersion
-from a3m.fpr.models import FPRule
 from a3m.main.models import Derivation
 from a3m.main.models import File
 from a3m.main.models import SIP
@@ -34,10 +38,12 @@ NO_RULES_CODE = 0
 DERIVATIVE_TYPES = ("preservation", "access")
 
 
-def main(job, file_path, file_uuid, sip_uuid, shared_path, file_type):
+def main(job, file_path, file_uuid, sip_uuid, shared_path, file_type, events=None):
     setup_dicts()
 
-    validator = Validator(job, file_path, file_uuid, sip_uuid, shared_path, file_type)
+    validator = Validator(
+        job, file_path, file_uuid, sip_uuid, shared_path, file_type, events
+    )
     return validator.validate()
 
 
@@ -57,13 +63,16 @@ class Validator:
     determine whether a given file conforms to a given specification.
     """
 
-    def __init__(self, job, file_path, file_uuid, sip_uuid, shared_path, file_type):
+    def __init__(
+        self, job, file_path, file_uuid, sip_uuid, shared_path, file_type, events=None
+    ):
         self.job = job
         self.file_path = file_path
         self.file_uuid = file_uuid
         self.sip_uuid = sip_uuid
         self.shared_path = shared_path
         self.file_type = file_type
+        self.events = events
         self.purpose = "validation"
         self._sip_logs_dir = None
         self._sip_pres_val_dir = None
@@ -93,17 +102,25 @@ class Validator:
             return FAIL_CODE
         return SUCCESS_CODE
 
+    @property
+    def insert_event(self):
+        """Buffer events in ``self.events`` if given, insert them otherwise."""
+        if self.events is None:
+            return databaseFunctions.insertIntoEvents
+        return self.events.add
+
     def _get_rules(self):
         """Return all FPR rules that apply to files of this type."""
         try:
             fmt = FormatVersion.active.get(fileformatversion__file_uuid=self.file_uuid)
         except FormatVersion.DoesNotExist:
             rules = fmt = None
+        fpr_index = get_fpr_index()
         if fmt:
-            rules = FPRule.active.filter(format=fmt.uuid, purpose=self.purpose)
+            rules = fpr_index.get_rules(self.purpose, fmt)
         # Check default rules.
         if not rules:
-            rules = FPRule.active.filter(purpose=f"default_{self.purpose}")
+            rules = fpr_index.get_rules(f"default_{self.purpose}")
         return rules
 
     def _execute_rule_command(self, rule):
@@ -125,13 +142,23 @@ class Validator:
         else:
             command_to_execute = rule.command.command
             args = [self.file_path]
-        self.job.print_output("Running", rule.command.description)
-        exitstatus, stdout, stderr = executeOrRun(
-            type=rule.command.script_type,
-            text=command_to_execute,
-            printing=False,
-            arguments=args,
-        )
+        cache = get_result_cache()
+        key = rule_cache_key(self.digest, "validate_file", rule)
+        stdout = cache.get(key)
+        if stdout is not None:
+            self.job.print_output("Reusing output of", rule.command.description)
+            exitstatus = 0
+        else:
+            self.job.print_output("Running", rule.command.description)
+            exitstatus, stdout, stderr = executeOrRun(
+                type=rule.command.script_type,
+                text=command_to_execute,
+                printing=False,
+                arguments=args,
+            )
+            if exitstatus == 0:
+                cache.put(key, stdout)
+        cache.flush()
         if exitstatus != 0:
             self.job.print_error(
                 "Command {description} failed with exit status {status};"
@@ -179,7 +206,7 @@ class Validator:
                 purpose=self.purpose, file_path=self.file_path, file_uuid=self.file_uuid
             )
         )
-        databaseFunctions.insertIntoEvents(
+        self.insert_event(
             fileUUID=self.file_uuid,
             eventType="validation",  # From PREMIS controlled vocab.
             eventDetail=event_detail,
@@ -188,6 +215,13 @@ class Validator:
         )
         return result
 
+    @functools.cached_property
+    def digest(self):
+        """Digest of the file, used to look up the output of the rules."""
+        return file_digest(
+            File.objects.filter(uuid=self.file_uuid).first(), self.file_path
+        )
+
     def _save_stdout_to_logs_dir(self, output):
         """Save the validation command's output from validating the file to a
         file at logs/implementationChecks/<input_filename>.xml in the SIP.
@@ -316,7 +350,7 @@ def _get_file_type(argv):
 
 
 def call(jobs):
-    with transaction.atomic():
+    with transaction.atomic(), databaseFunctions.EventWriter() as events:
         for job in jobs:
             with job.JobContext(logger=logger):
                 file_path = job.args[1]
@@ -325,5 +359,13 @@ def call(jobs):
                 shared_path = _get_shared_path(job.args)
                 file_type = _get_file_type(job.args)
                 job.set_status(
-                    main(job, file_path, file_uuid, sip_uuid, shared_path, file_type)
+                    main(
+                        job,
+                        file_path,
+                        file_uuid,
+                        sip_uuid,
+                        shared_path,
+                        file_type,
+                        events,
+                    )
                 )
@@ -16,28 +16,34 @@
 # along with Archivematica.  If not, see <http://www.gnu.org/licenses/>.
 """Verify Checksum Job
 
-Archivematica wraps the hashsum utility to verify checksums provided to the
-system as part of a transfer, e.g. checksum.md5 in the transfer metadata
-folder. We wrap this coreutils utility by using a Hashsum class which enables
-us to easily call each of the tools packaged against its different algorithms:
+Verify the checksums provided to the system as part of a transfer, e.g.
+checksum.md5 in the transfer metadata folder, in the format written by the
+coreutils hashsum utilities (``md5sum``, ``sha1sum``...). The algorithms
+supported are:
 
     * MD5
     * SHA1
     * SHA256
     * SHA512
+
+The checksum files are parsed and compared with the digests of the objects of
+the transfer, computed by `a3m.hashing` with every algorithm in a single read
+of each file. The digests are usually computed and stored by
+``update_size_and_checksum`` already, so the files aren't read again.
 """
-import datetime
+import hashlib
 import logging
 import os
-import shlex
-import subprocess  # nosec B404
+import re
 import sys
-import uuid
+from typing import NamedTuple
+from typing import Optional
 
 from django.db import transaction
 
+from a3m import hashing
 from a3m.archivematicaFunctions import strToUnicode
-from a3m.main.models import Event
+from a3m.databaseFunctions import EventWriter
 from a3m.main.models import File
 from a3m.main.models import Transfer
 
@@ -45,9 +51,9 @@ from a3m.main.models import Transfer
 logger = logging.getLogger(__name__)
 
 
-class NoHashCommandAvailable(Exception):
-    """Provide feedback to the user if the checksum command cannot be found
-    for the provided checksum file.
+class UnsupportedChecksumFile(Exception):
+    """Provide feedback to the user if the algorithm of the provided checksum
+    file is not supported.
     """
 
 
@@ -57,149 +63,112 @@ class PREMISFailure(Exception):
     """
 
 
-class Hashsum:
-    """Class to capture various functions around calling Hashsum as a mechanism
-    for comparing user-supplied checksums in Archivematica.
-    """
+class Mismatch(NamedTuple):
+    """A file of the transfer that doesn't match a checksum file."""
 
-    # Key-values consisting of a "hash file" specific to a checksum algorithm,
-    # and the hashsum command that we want to call against the file.
-    HASHFILES_COMMANDS = {
-        "checksum.md5": "md5sum",
-        "checksum.sha1": "sha1sum",
-        "checksum.sha256": "sha256sum",
-        "checksum.sha512": "sha512sum",
-    }
-
-    OKAY_STRING = ": OK"
-    FAIL_STRING = ": FAILED"
-    ZERO_STRING = "no properly formatted"
-    IMPROPER_STRING = "improperly formatted"
-    FAILED_OPEN = ": FAILED open or read"
-    EXIT_NON_ZERO = "returned non-zero exit status 1"
-
-    def __init__(self, path, job=print):
-        """Initialize an object prepared to invoke a hashsum command on a given
-        hash file at a given path and return properties related to that
-        invocation to the caller, e.g. to add provenance information to PREMIS
-        output.
-        """
-        try:
-            self.job = job
-            self.command_called = None
-            self.hashfile = path
-            self.COMMAND = self.HASHFILES_COMMANDS[os.path.basename(path)]
-        except KeyError:
-            raise NoHashCommandAvailable()
+    path: str  # Relative to the objects directory.
+    expected: Optional[str]  # None if the file isn't listed.
+    actual: Optional[str]  # None if the file can't be found or read.
 
-    def _call(self, *args, **kwargs):
-        """Make the call to Python subprocess and record the command being
-        called.
-        """
-        self.command_called = shlex.split(" ".join((self.COMMAND,) + args))
-        return self._decode(
-            subprocess.check_output(  # nosec B603
-                self.command_called, cwd=kwargs.get("transfer_dir")
-            )
+    def __str__(self):
+        if self.expected is None:
+            return f"objects/{self.path}: not listed in the checksum file"
+        if self.actual is None:
+            return f"objects/{self.path}: FAILED open or read"
+        return "objects/{}: FAILED (expected {}, computed {})".format(
+            self.path, self.expected, self.actual
         )
 
-    def count_and_compare_lines(self, objects_dir):
-        """Count the number of lines in a checksum file and compare with the
-        number of objects being transferred. The requirement of hashsum as
-        this microservice job is written is that the mapping is 1:1. There
-        isn't space for an empty line at the end of the file.
-        """
-        lines = self._count_lines(self.hashfile)
-        objects = self._count_files(objects_dir)
-        if lines == objects:
-            return True
-        self.job.pyprint(
-            "{}: Comparison failed with {} checksum lines and {} "
-            "transfer files".format(self.get_ext(self.hashfile), lines, objects),
-            file=sys.stderr,
-        )
-        return False
 
-    def compare_hashes(self, transfer_dir):
-        """Compare transfer files with the checksum file provided."""
-        objects_dir = os.path.join(transfer_dir, "objects")
-        if not self.count_and_compare_lines(objects_dir):
-            return 1
+class ChecksumFile:
+    """A checksum file provided with a transfer.
+
+    Lines are formatted like the output of the hashsum utilities, i.e.
+    ``<digest>  <path>`` (``<digest> *<path>`` in binary mode) or
+    ``<ALGORITHM> (<path>) = <digest>`` with ``--tag``, with paths relative to
+    the objects directory. Backslashes and newlines in paths are escaped and
+    the line prefixed with a backslash. Every line must be properly formatted,
+    like ``--strict`` requires.
+    """
+
+    LINE = re.compile(r"(?P<digest>[0-9a-fA-F]+) [ *](?P<path>.+)")
+    TAGGED_LINE = re.compile(
+        r"(?P<tag>[A-Z0-9]+) \((?P<path>.+)\) = (?P<digest>[0-9a-fA-F]+)"
+    )
+    ESCAPES = {"\\": "\\", "n": "\n"}
+
+    def __init__(self, path):
         try:
-            self._call("-c", "--strict", self.hashfile, transfer_dir=objects_dir)
-            return 0
-        except subprocess.CalledProcessError as err:
-            if self.EXIT_NON_ZERO in str(err):
-                warn = "{}: comparison exited with status: {}. Please check the formatting of the checksums or integrity of the files.".format(
-                    self.get_ext(self.hashfile), err.returncode
-                )
-                self.job.pyprint(warn, file=sys.stderr)
-            for line in self._decode(err.output):
-                if not line:
-                    continue
-                if line.endswith(self.OKAY_STRING):
+            self.algorithm = hashing.CHECKSUM_FILES[os.path.basename(path)]
+        except KeyError:
+            raise UnsupportedChecksumFile(path)
+        self.path = path
+        self.digest_length = len(hashlib.new(self.algorithm).hexdigest())
+        self.checksums = {}  # path relative to the objects directory: digest
+        self.improper_lines = []  # line numbers
+
+        with open(path, encoding="utf-8", errors="surrogateescape") as hashfile:
+            for number, line in enumerate(hashfile, 1):
+                parsed = self._parse(line.rstrip("\r\n"))
+                if parsed is None:
+                    self.improper_lines.append(number)
                     continue
-                if (
-                    line.endswith(self.FAIL_STRING)
-                    or self.ZERO_STRING in line
-                    or self.IMPROPER_STRING in line
-                ):
-                    self.job.pyprint(
-                        f"{self.get_ext(self.hashfile)}: {line}",
-                        file=sys.stderr,
-                    )
-                if line.endswith(self.FAILED_OPEN):
-                    self.job.pyprint(
-                        f"{self.get_ext(self.hashfile)}: {line}",
-                        file=sys.stderr,
-                    )
-            return err.returncode
-
-    def version(self):
-        """Return version information for the command being called."""
-        try:
-            return self._call("--version")[0]
-        except subprocess.CalledProcessError:
-            return self.COMMAND
-
-    def get_command_detail(self):
-        """Provide some way for the user to get information out of the class to
-        write METS/PREMIS provenance information.
+                object_path, digest = parsed
+                self.checksums[object_path] = digest
+
+    def _parse(self, line):
+        """Return the path and the digest of a line, or ``None``."""
+        escaped = line.startswith("\\")
+        if escaped:
+            line = line[1:]
+        match = self.LINE.fullmatch(line)
+        if match is None:
+            match = self.TAGGED_LINE.fullmatch(line)
+            if match is None or match.group("tag") != self.algorithm.upper():
+                return None
+        digest, path = match.group("digest"), match.group("path")
+        if len(digest) != self.digest_length:
+            return None
+        if escaped:
+            try:
+                path = re.sub(r"\\(.)", lambda m: self.ESCAPES[m.group(1)], path)
+            except KeyError:
+                return None
+        return os.path.normpath(path), digest.lower()
+
+    @property
+    def ext(self):
+        """Return the extension of the checksum file, e.g. ``md5``."""
+        return os.path.splitext(self.path)[1].replace(".", "")
+
+    def get_event_detail(self):
+        """Return the detail of the PREMIS events of the verification."""
+        return f'program="python"; module="hashlib.{self.algorithm}()"'
+
+    def verify(self, digests):
+        """Compare the checksums with the digests of the objects of the
+        transfer and return a `Mismatch` per file that doesn't match.
+
+        ``digests`` maps the paths of the objects, relative to the objects
+        directory, to their `a3m.hashing.Digests` or to the ``OSError`` raised
+        when reading them. Every object must be listed in the checksum file.
         """
-        if not self.command_called:
-            err_str = "Unable to retrieve information about the hashsum command called by the script"
-            raise PREMISFailure(err_str)
-        return 'program="{}"; version="{}"'.format(
-            " ".join(self.command_called), self.version()
-        )
-
-    @staticmethod
-    def _decode(out):
-        """Decode binary string and return a list of lines."""
-        return str(out, "utf8").split("\n")
-
-    @staticmethod
-    def get_ext(path):
-        """Return the extension of the checksum file provided"""
-        ext = os.path.splitext(path)[1]
-        if not ext:
-            return path
-        return ext.replace(".", "")
-
-    @staticmethod
-    def _count_lines(path):
-        """Count the number of lines in a checksum file."""
-        count = 0
-        with open(path) as hashfile:
-            for count, _ in enumerate(hashfile):
-                pass
-        # Negate zero-based count.
-        return count + 1
-
-    @staticmethod
-    def _count_files(path):
-        """Walk the directories on a given path and count the number of files."""
-        return sum(len(files) for _, _, files in os.walk(path))
+        mismatches = []
+        for path, expected in self.checksums.items():
+            result = digests.get(path)
+            if result is None or isinstance(result, OSError):
+                mismatches.append(Mismatch(path, expected, None))
+            elif result.digests[self.algorithm] != expected:
+                mismatches.append(
+                    Mismatch(path, expected, result.digests[self.algorithm])
+                )
+        for path, result in digests.items():
+            if path not in self.checksums:
+                actual = None
+                if not isinstance(result, OSError):
+                    actual = result.digests[self.algorithm]
+                mismatches.append(Mismatch(path, None, actual))
+        return sorted(mismatches, key=lambda mismatch: mismatch.path)
 
 
 def get_file_queryset(transfer_uuid):
@@ -217,36 +186,45 @@ def get_file_queryset(transfer_uuid):
     return file_objs_queryset
 
 
+def get_object_digests(file_queryset, transfer_dir, algorithms):
+    """Return the digests of the objects of the transfer, keyed by their path
+    relative to the objects directory.
+    """
+    objects = {}  # path relative to the objects directory: file UUID
+    for file_uuid, location in file_queryset.values_list("uuid", "currentlocation"):
+        location = re.sub(r"^%[^%]+%", "", location or "")
+        if location.startswith("objects/"):
+            objects[os.path.normpath(location[len("objects/") :])] = str(file_uuid)
+    results = hashing.digest_files(
+        {
+            file_uuid: os.path.join(transfer_dir, "objects", path)
+            for path, file_uuid in objects.items()
+        },
+        algorithms,
+    )
+    return {path: results[file_uuid] for path, file_uuid in objects.items()}
+
+
 def write_premis_event_per_file(file_uuids, transfer_uuid, event_detail):
     """Generate PREMIS events per File object verified in this transfer."""
-    event_type = "fixity check"
-    event_outcome = "pass"
-    events = []
-    agents = Transfer.objects.get(uuid=transfer_uuid).agents
-    with transaction.atomic():
+    agents = list(
+        Transfer.objects.get(uuid=transfer_uuid).agents.values_list("pk", flat=True)
+    )
+    with transaction.atomic(), EventWriter() as events:
         for file_obj in file_uuids:
-            checksum_event = Event(
-                file_uuid=file_obj,
-                event_type=event_type,
-                event_datetime=datetime.datetime.now(),
-                event_outcome=event_outcome,
-                event_detail=event_detail,
-                event_id=uuid.uuid4(),
+            events.add(
+                fileUUID=file_obj.uuid,
+                eventType="fixity check",
+                eventDetail=event_detail,
+                eventOutcome="pass",
+                agents=agents,
             )
-            events.append(checksum_event)
-        # All the events sit in memory at this point and are then written.
-        # We could write this in batches if we need to optimize further.
-        Event.objects.bulk_create(events)
-        # Adding many-to-many fields with bulk create is awkward, we have to
-        # loop through again.
-        for event in Event.objects.filter(
-            file_uuid__in=[event.file_uuid for event in events]
-        ):
-            event.agents.add(*agents)
-
-
-def run_hashsum_commands(job):
-    """Run hashsum commands and generate a cumulative return code."""
+
+
+def verify_checksum_files(job):
+    """Verify the checksum files of a transfer and generate a cumulative
+    return code.
+    """
     transfer_dir = None
     transfer_uuid = None
     try:
@@ -255,41 +233,61 @@ def run_hashsum_commands(job):
     except IndexError:
         logger.error("Cannot access expected module arguments: %s", job.args)
         return 1
-    ret = 0
     # Create a query-set once so we don't need to generate per each checksum
     # file type.
     file_queryset = get_file_queryset(transfer_uuid)
-    for hashfile in Hashsum.HASHFILES_COMMANDS:
-        hashsum = None
-        hashfilepath = os.path.join(transfer_dir, "metadata", hashfile)
-        if os.path.exists(hashfilepath):
-            try:
-                hashsum = Hashsum(hashfilepath, job)
-            except NoHashCommandAvailable:
+    checksum_files = [
+        ChecksumFile(os.path.join(transfer_dir, "metadata", name))
+        for name in hashing.CHECKSUM_FILES
+        if os.path.exists(os.path.join(transfer_dir, "metadata", name))
+    ]
+    if not checksum_files:
+        return 0
+
+    # Objects are hashed once with the algorithms of all the checksum files.
+    digests = get_object_digests(
+        file_queryset,
+        transfer_dir,
+        {checksum_file.algorithm for checksum_file in checksum_files},
+    )
+    ret = 0
+    for checksum_file in checksum_files:
+        job.pyprint(
+            "Comparing transfer checksums with the supplied {} file".format(
+                checksum_file.ext
+            ),
+            file=sys.stderr,
+        )
+        if checksum_file.improper_lines or not checksum_file.checksums:
+            for number in checksum_file.improper_lines:
                 job.pyprint(
-                    "Nothing to do for {}. No command available.".format(
-                        Hashsum.get_ext(hashfilepath)
-                    )
+                    "{}: line {} is improperly formatted".format(
+                        checksum_file.ext, number
+                    ),
+                    file=sys.stderr,
                 )
-                continue
-        if hashsum:
-            job.pyprint(
-                "Comparing transfer checksums with the supplied {} file".format(
-                    Hashsum.get_ext(hashfilepath)
-                ),
-                file=sys.stderr,
-            )
-            result = hashsum.compare_hashes(transfer_dir=transfer_dir)
-            # Add to PREMIS on success only.
-            if result == 0:
-                job.pyprint(f"{Hashsum.get_ext(hashfile)}: Comparison was OK")
-                write_premis_event_per_file(
-                    file_uuids=file_queryset,
-                    transfer_uuid=transfer_uuid,
-                    event_detail=hashsum.get_command_detail(),
+            if not checksum_file.checksums:
+                job.pyprint(
+                    "{}: no properly formatted checksum lines found".format(
+                        checksum_file.ext
+                    ),
+                    file=sys.stderr,
                 )
-                continue
-            ret += result
+            ret += 1
+            continue
+        mismatches = checksum_file.verify(digests)
+        if mismatches:
+            for mismatch in mismatches:
+                job.pyprint(f"{checksum_file.ext}: {mismatch}", file=sys.stderr)
+            ret += 1
+            continue
+        # Add to PREMIS on success only.
+        job.pyprint(f"{checksum_file.ext}: Comparison was OK")
+        write_premis_event_per_file(
+            file_uuids=file_queryset,
+            transfer_uuid=transfer_uuid,
+            event_detail=checksum_file.get_event_detail(),
+        )
     return ret
 
 
@@ -297,4 +295,4 @@ def call(jobs):
     """Primary entry point for MCP Client script."""
     for job in jobs:
         with job.JobContext(logger=logger):
-            job.set_status(run_hashsum_commands(job))
+            job.set_status(verify_checksum_files(job))
@@ -31,7 +31,7 @@ from clamd import ConnectionError
 from django.conf import settings as mcpclient_settings
 from django.db import transaction
 
-from a3m.databaseFunctions import insertIntoEvents
+from a3m.databaseFunctions import EventWriter
 from a3m.main.models import Event
 from a3m.main.models import File
 
@@ -367,6 +367,6 @@ def call(jobs):
                 continue
             job.set_status(scan_file(event_queue, *job.args[1:]))
 
-    with transaction.atomic():
+    with transaction.atomic(), EventWriter() as events:
         for e in event_queue:
-            insertIntoEvents(**e)
+            events.add(**e)
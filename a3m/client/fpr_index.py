@@ -0,0 +1,113 @@
+"""
+In-memory index of the FPR.
+
+Client scripts that run once per file (normalization, characterization,
+validation, policy checks, transcription, extraction...) used to query the
+rules of the FPR for every file, joining rules, format versions and commands,
+even though the FPR barely changes while a3m is running.
+
+`FPRIndex` loads the enabled format versions and rules, with their commands,
+once and keeps them in dicts, so looking up the rules that apply to a file
+costs no queries. The index is stamped with the FPR `Revision` it was loaded
+at. `refresh` is called before every batch of jobs and drops the index when
+the FPR has changed since, it's loaded again by the next lookup.
+
+The model instances of the index are shared by all the jobs run by the
+process and must not be modified.
+"""
+import collections
+import threading
+import uuid
+from typing import Optional
+
+from a3m.fpr.models import FormatVersion
+from a3m.fpr.models import FPRule
+from a3m.fpr.models import Revision
+
+
+def _uuid(value):
+    """Return the UUID of a format version given as an instance or a UUID."""
+    value = getattr(value, "uuid", value)
+    if isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+class FPRIndex:
+    """Enabled format versions and rules of the FPR, see module docstring."""
+
+    def __init__(self, revision=None):
+        self.revision = revision
+        self.format_versions = {}  # PRONOM ID: FormatVersion
+        # (format version UUID, purpose): [FPRule]
+        self.rules = collections.defaultdict(list)
+        self.rules_by_purpose = collections.defaultdict(list)  # purpose: [FPRule]
+
+        for format_version in FormatVersion.active.select_related("format"):
+            if format_version.pronom_id:
+                self.format_versions.setdefault(
+                    format_version.pronom_id, format_version
+                )
+
+        rules = FPRule.active.select_related(
+            "format",
+            "command",
+            "command__tool",
+            "command__output_format",
+            "command__verification_command",
+            "command__event_detail_command",
+        ).order_by("pk")
+        for rule in rules:
+            self.rules[(rule.format_id, rule.purpose)].append(rule)
+            self.rules_by_purpose[rule.purpose].append(rule)
+
+    def get_format_version(self, pronom_id) -> Optional[FormatVersion]:
+        """Return the enabled format version with a PRONOM ID, if any."""
+        return self.format_versions.get(pronom_id)
+
+    def get_rules(self, purpose, format_version=None) -> list:
+        """Return the enabled rules for ``purpose``.
+
+        Only the rules of ``format_version``, given as an instance or a UUID,
+        are returned unless it's ``None``.
+        """
+        if format_version is None:
+            return list(self.rules_by_purpose.get(purpose, ()))
+        return list(self.rules.get((_uuid(format_version), purpose), ()))
+
+    def get_rule(self, purpose, format_version=None) -> FPRule:
+        """Return the only rule `get_rules` would return.
+
+        Raises ``FPRule.DoesNotExist`` or ``FPRule.MultipleObjectsReturned``
+        like ``FPRule.active.get`` would.
+        """
+        rules = self.get_rules(purpose, format_version)
+        if not rules:
+            raise FPRule.DoesNotExist(f"No {purpose} rule found")
+        if len(rules) > 1:
+            raise FPRule.MultipleObjectsReturned(f"{len(rules)} {purpose} rules found")
+        return rules[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fpr_index() -> FPRIndex:
+    """Return the FPR index of this process."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            # The revision is read first, if the FPR changes while it's being
+            # loaded the index is loaded again after the next refresh.
+            _index = FPRIndex(Revision.current())
+        return _index
+
+
+def refresh():
+    """Drop the index if the FPR has changed since it was loaded."""
+    global _index
+    revision = Revision.current()
+    with _index_lock:
+        if _index is not None and _index.revision != revision:
+            _index = None
@@ -32,11 +32,12 @@ class CallbackHandler(logging.Handler):
 
 
 class Job:
-    def __init__(self, name, uuid, args, caller_wants_output=False):
+    def __init__(self, name, uuid, args, caller_wants_output=False, done_callback=None):
         self.name = name
         self.UUID = uuid
         self.args = [name] + args
         self.caller_wants_output = caller_wants_output
+        self.done_callback = done_callback
         self.int_code = 0
         self.status_code = "success"
         self.output = ""
@@ -110,8 +111,19 @@ class Job:
     def get_stderr(self):
         return self.error
 
+    def done(self):
+        """Report that the job has finished so its result can be sent back
+        before the rest of the batch completes.
+        """
+        if self.done_callback is not None:
+            self.done_callback(self)
+
     @contextmanager
     def JobContext(self, logger=None):
+        """Run the job, capturing errors and log messages.
+
+        The job is reported as done when the context is exited.
+        """
         handler = CallbackHandler(self.print_error, self.name)
 
         if logger:
@@ -126,3 +138,4 @@ class Job:
         finally:
             if logger:
                 logger.removeHandler(handler)
+            self.done()
@@ -48,14 +48,19 @@ task to run next).
 #
 # You should have received a copy of the GNU General Public License
 # along with Archivematica.  If not, see <http://www.gnu.org/licenses/>.
+import datetime
+import functools
 import importlib
 import logging
 import shlex
+import uuid
 
 from django.conf import settings as django_settings
 from django.db import transaction
 
+from a3m.api.tasks.v1beta1.batch_pb2 import TaskBatch
 from a3m.client import ASSETS_DIR
+from a3m.client import fpr_index
 from a3m.client import metrics
 from a3m.client.job import Job
 from a3m.databaseFunctions import auto_close_db
@@ -71,33 +76,86 @@ replacement_dict = {
     r"%clientAssetsDirectory%": ASSETS_DIR,
 }
 
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _task_ids(batch):
+    """Return the UUIDs of the tasks of a `TaskBatch` as strings."""
+    return [
+        str(uuid.UUID(bytes=batch.task_ids[offset : offset + 16]))
+        for offset in range(0, len(batch.task_ids), 16)
+    ]
+
+
+def _compile_arguments(batch):
+    """Return the arguments of a `TaskBatch` as a list of ``(literals,
+    variables)`` tuples, where variables are lists of column values or names.
+    """
+    columns = [list(column.values) for column in batch.columns]
+    return [
+        (
+            list(argument.literals),
+            [
+                columns[variable.column]
+                if variable.WhichOneof("value") == "column"
+                else variable.name
+                for variable in argument.variables
+            ],
+        )
+        for argument in batch.arguments
+    ]
+
+
+def _replace_variables(s, replacements):
+    for var, val in replacements.items():
+        s = s.replace(var, val)
+    return s
+
+
+def _render_arguments(arguments, index, replacements):
+    rendered = []
+    for literals, variables in arguments:
+        parts = [literals[0]]
+        for variable, literal in zip(variables, literals[1:]):
+            parts.append(variable if isinstance(variable, str) else variable[index])
+            parts.append(literal)
+        # Values substituted by the server can contain variables too, e.g.
+        # package paths stored with ``%sharedPath%``.
+        rendered.append(_replace_variables("".join(parts), replacements))
+    return rendered
+
 
 @auto_close_db
-def handle_batch_task(task_name, batch_payload):
-    tasks = batch_payload["tasks"]
+def handle_batch_task(task_name, batch_payload, done_callback=None):
+    batch = TaskBatch.FromString(batch_payload)
+    arguments = None if batch.command_lines else _compile_arguments(batch)
 
     utc_date = getUTCDate()
+    replacements = dict(replacement_dict)
+    replacements[r"%date%"] = utc_date.isoformat()
+
     jobs = []
-    for task_uuid in tasks:
-        task_data = tasks[task_uuid]
-        arguments = task_data["arguments"]
-
-        replacements = list(replacement_dict.items()) + list(
-            {
-                r"%date%": utc_date.isoformat(),
-                r"%taskUUID%": task_uuid,
-                r"%jobCreatedDate%": task_data["createdDate"],
-            }.items()
+    for index, task_uuid in enumerate(_task_ids(batch)):
+        created_date = EPOCH + datetime.timedelta(
+            microseconds=batch.created_times[index]
         )
+        replacements[r"%taskUUID%"] = task_uuid
+        replacements[r"%jobCreatedDate%"] = created_date.isoformat(" ")
 
-        for var, val in replacements:
-            arguments = arguments.replace(var, val)
+        if arguments is None:
+            command_line = batch.command_lines[index]
+            task_arguments = _parse_command_line(
+                _replace_variables(command_line, replacements)
+            )
+        else:
+            task_arguments = _render_arguments(arguments, index, replacements)
 
         job = Job(
             task_name,
-            task_data["uuid"],
-            _parse_command_line(arguments),
-            caller_wants_output=task_data["wants_output"],
+            task_uuid,
+            task_arguments,
+            caller_wants_output=batch.wants_output[index],
+            done_callback=done_callback,
         )
         jobs.append(job)
 
@@ -110,7 +168,9 @@ def handle_batch_task(task_name, batch_payload):
 
     retryOnFailure("Set task start times", set_start_times)
 
-    module = importlib.import_module("a3m.client.clientScripts." + task_data["execute"])
+    fpr_index.refresh()
+
+    module = importlib.import_module("a3m.client.clientScripts." + batch.execute)
     module.call(jobs)
 
     return jobs
@@ -128,7 +188,7 @@ def _shlex_unescape(s):
 
 
 def fail_all_tasks(batch_payload, reason):
-    tasks = batch_payload["tasks"]
+    tasks = _task_ids(TaskBatch.FromString(batch_payload))
 
     # Give it a best effort to write out an error for each task.  Obviously if
     # we got to this point because the DB is unavailable this isn't going to
@@ -149,60 +209,94 @@ def fail_all_tasks(batch_payload, reason):
     return {"task_results": {task_id: {"exitCode": 1} for task_id in tasks}}
 
 
+def _write_task_result(task_name, job):
+    """Update the ``Task`` row of a completed job and return its result."""
+    exit_code = job.get_exit_code()
+    end_time = getUTCDate()
+
+    kwargs = {"exitcode": exit_code, "endtime": end_time}
+    if django_settings.CAPTURE_CLIENT_SCRIPT_OUTPUT or kwargs["exitcode"] > 0:
+        kwargs.update({"stdout": job.get_stdout(), "stderror": job.get_stderr()})
+    Task.objects.filter(taskuuid=job.UUID).update(**kwargs)
+
+    result = {"exitCode": exit_code, "finishedTimestamp": end_time}
+
+    if job.caller_wants_output:
+        # Send back stdout/stderr so it can be written to files.
+        # Most cases don't require this (logging to the database is
+        # enough), but the ones that do are coordinated through the
+        # MCP Server so that multiple MCP Client instances don't try
+        # to write the same file at the same time.
+        result["stdout"] = job.get_stdout()
+        result["stderror"] = job.get_stderr()
+
+    return result
+
+
 @auto_close_db
-def execute_command(task_name: str, batch_payload):
+def execute_command(task_name: str, batch_payload, on_task_result=None):
     """Execute the command encoded in ``batch_payload`` and return its exit
     code, standard output and standard error as a dictionary.
+
+    Results of jobs that finish while the rest of the batch is still being
+    processed are recorded and passed to ``on_task_result`` (if given) as soon
+    as they're done, see ``Job.done``. The returned dictionary contains the
+    results of all the jobs in the batch.
     """
     logger.debug("\n\n*** RUNNING TASK: %s", task_name)
 
+    results = {}  # Task UUID: result committed to the database
+    uncommitted_results = {}  # Task UUID: result written in a transaction
+
+    def result_committed(task_uuid):
+        result = uncommitted_results.pop(task_uuid)
+        results[task_uuid] = result
+        if on_task_result is not None:
+            on_task_result(task_uuid, result)
+
+    def job_done_callback(job):
+        previous_result = uncommitted_results.get(job.UUID, results.get(job.UUID))
+        if (
+            previous_result is not None
+            and previous_result["exitCode"] == job.get_exit_code()
+        ):
+            return
+        # Jobs are usually done within the transaction of the client script,
+        # the result is only recorded and sent to the server once the script
+        # commits. If the script rolls back, the row is written again with the
+        # rest of the batch.
+        waiting_for_commit = job.UUID in uncommitted_results
+        uncommitted_results[job.UUID] = _write_task_result(task_name, job)
+        if not waiting_for_commit:
+            transaction.on_commit(functools.partial(result_committed, job.UUID))
+
     with metrics.task_execution_time_histogram.labels(script_name=task_name).time():
         try:
-            jobs = handle_batch_task(task_name, batch_payload)
-            results = {}
+            jobs = handle_batch_task(task_name, batch_payload, job_done_callback)
 
+            # Write the results of the jobs that weren't reported as done or
+            # whose exit code changed after they were reported.
             def write_task_results_callback():
+                pending_results = {}
                 with transaction.atomic():
                     for job in jobs:
                         logger.debug("Completed job: %s\n", job.dump())
-
-                        exit_code = job.get_exit_code()
-                        end_time = getUTCDate()
-
-                        kwargs = {"exitcode": exit_code, "endtime": end_time}
-                        if (
-                            django_settings.CAPTURE_CLIENT_SCRIPT_OUTPUT
-                            or kwargs["exitcode"] > 0
-                        ):
-                            kwargs.update(
-                                {
-                                    "stdout": job.get_stdout(),
-                                    "stderror": job.get_stderr(),
-                                }
-                            )
-                        Task.objects.filter(taskuuid=job.UUID).update(**kwargs)
-
-                        results[job.UUID] = {
-                            "exitCode": exit_code,
-                            "finishedTimestamp": end_time,
-                        }
-
-                        if job.caller_wants_output:
-                            # Send back stdout/stderr so it can be written to files.
-                            # Most cases don't require this (logging to the database is
-                            # enough), but the ones that do are coordinated through the
-                            # MCP Server so that multiple MCP Client instances don't try
-                            # to write the same file at the same time.
-                            results[job.UUID]["stdout"] = job.get_stdout()
-                            results[job.UUID]["stderror"] = job.get_stderr()
-
-                        if exit_code == 0:
-                            metrics.job_completed(task_name)
-                        else:
-                            metrics.job_failed(task_name)
+                        result = results.get(job.UUID)
+                        if result and result["exitCode"] == job.get_exit_code():
+                            continue
+                        pending_results[job.UUID] = _write_task_result(task_name, job)
+                results.update(pending_results)
 
             retryOnFailure("Write task results", write_task_results_callback)
 
+            # Jobs are counted once their final exit code is known, even if
+            # an earlier result was sent to the server.
+            for job in jobs:
+                if results[job.UUID]["exitCode"] == 0:
+                    metrics.job_completed(task_name)
+                else:
+                    metrics.job_failed(task_name)
+
             return {"task_results": results}
         except SystemExit:
             logger.error(
@@ -53,6 +53,17 @@ task_execution_time_histogram = Histogram(
     buckets=TASK_DURATION_BUCKETS,
 )
 
+result_cache_hit_counter = Counter(
+    "mcpclient_result_cache_hit_total",
+    "Number of tool results reused from the result cache, labeled by script",
+    ["script_name"],
+)
+result_cache_miss_counter = Counter(
+    "mcpclient_result_cache_miss_total",
+    "Number of tool results not found in the result cache, labeled by script",
+    ["script_name"],
+)
+
 transfer_started_counter = Counter(
     "mcpclient_transfer_started_total", "Number of Transfers started"
 )
@@ -171,6 +182,8 @@ def init_counter_labels():
         job_error_counter.labels(script_name=modname)
         job_error_timestamp.labels(script_name=modname)
         task_execution_time_histogram.labels(script_name=modname)
+        result_cache_hit_counter.labels(script_name=modname)
+        result_cache_miss_counter.labels(script_name=modname)
 
     for failure_type in PACKAGE_FAILURE_TYPES:
         transfer_error_counter.labels(failure_type=failure_type)
@@ -200,6 +213,16 @@ def job_failed(script_name):
     job_error_timestamp.labels(script_name=script_name).set_to_current_time()
 
 
+@skip_if_prometheus_disabled
+def result_cache_hit(script_name):
+    result_cache_hit_counter.labels(script_name=script_name).inc()
+
+
+@skip_if_prometheus_disabled
+def result_cache_miss(script_name):
+    result_cache_miss_counter.labels(script_name=script_name).inc()
+
+
 def _get_file_group(raw_file_group_use):
     """Convert one of the file group use values we know about into
     the smaller subset that we track:
@@ -0,0 +1,224 @@
+"""
+Content-addressed cache of the results of per-file client scripts.
+
+Identification, characterization and validation only depend on the contents
+of the file and on the tool that processes it, but they used to be computed
+from scratch every time the same content was processed again, e.g. when a
+package is retried or a fixed transfer is submitted again.
+
+Results are stored as `ToolResult` rows keyed by the SHA-256 digest of the
+file, the name of the script, the FPR rule that was applied (if any) and the
+version of the tool, so they're shared by all the workers and outlive them.
+Client scripts look up their results before running a tool and only run it
+on a miss. The side effects of the script (``FileFormatVersion``,
+``FPCommandOutput``, events...) are still recorded for the file being
+processed, only the tool output is reused.
+
+Files are never hashed to look up their results: the digest is the checksum
+recorded for the file or the digest stored by :mod:`a3m.hashing` while the
+file is unchanged. Files without either are always processed. The cache is
+enabled by the ``result_cache`` setting and bounded by the
+``result_cache_size`` setting (bytes of output), the least recently used
+results are evicted first.
+"""
+import logging
+import os
+from typing import NamedTuple
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from a3m.client import metrics
+from a3m.main.models import FileDigest
+from a3m.main.models import ToolResult
+
+
+logger = logging.getLogger(__name__)
+
+
+DIGEST_ALGORITHM = "sha256"
+
+
+class CacheKey(NamedTuple):
+    digest: str
+    script_name: str
+    rule_id: str
+    tool_version: str
+
+
+class ResultCache:
+    """Tool results looked up and recorded by a client script.
+
+    Results of a batch of files can be fetched in one query with `load`,
+    `get` fetches the results that weren't loaded. New results are kept by
+    `put` until `flush` inserts them in bulk, records when the results that
+    were hit were last used and evicts results over the size budget.
+    """
+
+    # Rows deleted per query when evicting results.
+    EVICTION_BATCH_SIZE = 500
+
+    def __init__(self, enabled=None, max_size=None):
+        self.enabled = settings.RESULT_CACHE if enabled is None else enabled
+        self.max_size = settings.RESULT_CACHE_SIZE if max_size is None else max_size
+        self.entries = {}  # CacheKey: output, or None if there's none
+        self.ids = {}  # CacheKey: ToolResult id
+        self.used = set()  # ToolResult ids
+        self.pending = {}  # CacheKey: output
+
+    def load(self, keys):
+        """Fetch the results stored under ``keys``."""
+        keys = {key for key in keys if key is not None and key not in self.entries}
+        if not self.enabled or not keys:
+            return
+        self.entries.update(dict.fromkeys(keys))
+        for result in ToolResult.objects.filter(
+            digest__in={key.digest for key in keys},
+            script_name__in={key.script_name for key in keys},
+        ):
+            key = CacheKey(
+                result.digest, result.script_name, result.rule_id, result.tool_version
+            )
+            if key in keys:
+                self.entries[key] = result.output
+                self.ids[key] = result.id
+
+    def get(self, key: Optional[CacheKey]) -> Optional[str]:
+        """Return the output recorded under ``key``, or ``None``."""
+        if not self.enabled or key is None:
+            return None
+        self.load([key])
+        output = self.entries[key]
+        if output is None:
+            metrics.result_cache_miss(key.script_name)
+        else:
+            metrics.result_cache_hit(key.script_name)
+            if key in self.ids:
+                self.used.add(self.ids[key])
+        return output
+
+    def put(self, key: Optional[CacheKey], output: Optional[str]):
+        """Record ``output`` under ``key`` when the cache is flushed."""
+        if not self.enabled or key is None or output is None:
+            return
+        self.entries[key] = output
+        self.pending[key] = output
+
+    def flush(self):
+        """Insert the recorded results and update the last use of the results
+        that were hit. Results recorded concurrently by another worker for the
+        same key are kept.
+        """
+        now = timezone.now()
+        if self.used:
+            ToolResult.objects.filter(id__in=self.used).update(lastusedtime=now)
+            self.used = set()
+        if not self.pending:
+            return
+        ToolResult.objects.bulk_create(
+            [
+                ToolResult(
+                    digest=key.digest,
+                    script_name=key.script_name,
+                    rule_id=key.rule_id,
+                    tool_version=key.tool_version,
+                    output=output,
+                    size=len(output.encode("utf-8")),
+                    lastusedtime=now,
+                )
+                for key, output in self.pending.items()
+            ],
+            ignore_conflicts=True,
+        )
+        self.pending = {}
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used results until their size fits in
+        ``max_size``. A size of zero keeps every result.
+        """
+        if not self.max_size:
+            return
+        size = ToolResult.objects.aggregate(size=Sum("size"))["size"] or 0
+        if size <= self.max_size:
+            return
+        evicted = []
+        for result_id, result_size in (
+            ToolResult.objects.order_by("lastusedtime", "id")
+            .values_list("id", "size")
+            .iterator()
+        ):
+            if size <= self.max_size:
+                break
+            evicted.append(result_id)
+            size -= result_size
+        for start in range(0, len(evicted), self.EVICTION_BATCH_SIZE):
+            ToolResult.objects.filter(
+                id__in=evicted[start : start + self.EVICTION_BATCH_SIZE]
+            ).delete()
+        logger.debug("Evicted %d results from the result cache", len(evicted))
+
+
+def get_result_cache() -> ResultCache:
+    """Return a result cache for a client script."""
+    return ResultCache()
+
+
+def file_digests(files) -> dict:
+    """Return the SHA-256 digests recorded for files.
+
+    ``files`` maps File rows to the paths of the files. The checksum of the
+    file is used when it was computed with SHA-256, otherwise the digest
+    stored for the file if the file is unchanged since it was hashed. Files
+    without a digest, or all of them if the cache is disabled, are left out.
+    """
+    if not settings.RESULT_CACHE:
+        return {}
+    digests = {}  # file UUID: digest
+    paths = {}  # file UUID: path
+    for file_obj, path in files.items():
+        if file_obj.checksumtype == DIGEST_ALGORITHM and file_obj.checksum:
+            digests[str(file_obj.uuid)] = file_obj.checksum
+        else:
+            paths[str(file_obj.uuid)] = path
+    if not paths:
+        return digests
+    for file_digest in FileDigest.objects.filter(
+        file_id__in=paths, algorithm=DIGEST_ALGORITHM
+    ):
+        try:
+            stat = os.stat(paths[file_digest.file_id])
+        except OSError as err:
+            logger.debug("Unable to stat %s: %s", paths[file_digest.file_id], err)
+            continue
+        if (file_digest.size, file_digest.mtime_ns) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            digests[file_digest.file_id] = file_digest.digest
+    return digests
+
+
+def file_digest(file_obj, file_path) -> Optional[str]:
+    """Return the SHA-256 digest recorded for a file, see `file_digests`."""
+    if file_obj is None:
+        return None
+    return file_digests({file_obj: file_path}).get(str(file_obj.uuid))
+
+
+def cache_key(digest, script_name, rule_id="", tool_version="") -> Optional[CacheKey]:
+    """Return the key of the results of a script for a file with the given
+    digest, or ``None`` if the digest is unknown.
+    """
+    if digest is None:
+        return None
+    return CacheKey(digest, script_name, str(rule_id or ""), tool_version or "")
+
+
+def rule_cache_key(digest, script_name, rule) -> Optional[CacheKey]:
+    """Return the key of the output of the command of an FPR rule."""
+    command = rule.command
+    tool_version = command.tool.version if command.tool is not None else ""
+    return cache_key(digest, script_name, f"{rule.uuid}:{command.uuid}", tool_version)
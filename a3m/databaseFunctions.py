@@ -22,6 +22,7 @@ import uuid
 from functools import wraps
 
 from django.db import close_old_connections
+from django.db import transaction
 from django.utils import timezone
 
 from a3m.common_metrics import db_retry_timer
@@ -29,6 +30,8 @@ from a3m.main.models import Agent
 from a3m.main.models import Derivation
 from a3m.main.models import Event
 from a3m.main.models import File
+from a3m.main.models import SIP
+from a3m.main.models import Transfer
 
 logger = logging.getLogger(__name__)
 
@@ -186,6 +189,135 @@ def insertIntoEvents(
     event.agents.add(*agents)
 
 
+class EventWriter:
+    """Buffers events and inserts them in bulk.
+
+    `insertIntoEvents` needs four queries or more per event. The writer takes
+    the same arguments in `add` but keeps the events in memory until `flush`
+    is called, or until ``max_events`` events are buffered. A flush looks up
+    the units of the files of the buffered events in one query, resolves the
+    agents once per SIP or transfer and inserts the events and their agents
+    with `bulk_create`.
+
+    Used as a context manager, the writer flushes the remaining events on
+    exit unless an exception was raised::
+
+        with EventWriter() as events:
+            for job in jobs:
+                events.add(fileUUID=..., eventType="validation")
+    """
+
+    def __init__(self, max_events=500):
+        self.max_events = max_events
+        self.events = []  # [(Event, agents)]
+        self.unit_agents = {}  # (unit model, unit UUID): [Agent ID]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(
+        self,
+        fileUUID,
+        eventIdentifierUUID="",
+        eventType="",
+        eventDateTime=None,
+        eventDetail="",
+        eventOutcome="",
+        eventOutcomeDetailNote="",
+        agents=None,
+    ):
+        """Buffer an event, see `insertIntoEvents` for the arguments."""
+        if eventDateTime is None:
+            eventDateTime = getUTCDate()
+        if not eventIdentifierUUID:
+            eventIdentifierUUID = uuid.uuid4()
+
+        event = Event(
+            event_id=eventIdentifierUUID,
+            file_uuid_id=fileUUID,
+            event_type=eventType,
+            event_datetime=eventDateTime,
+            event_detail=eventDetail,
+            event_outcome=eventOutcome,
+            event_outcome_detail=eventOutcomeDetailNote,
+        )
+        self.events.append((event, agents))
+        if len(self.events) >= self.max_events:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered events."""
+        if not self.events:
+            return
+        events, self.events = self.events, []
+
+        agents = self._resolve_agents(
+            {str(event.file_uuid_id) for event, agents in events if not agents}
+        )
+        with transaction.atomic():
+            Event.objects.bulk_create([event for event, _ in events])
+            # bulk_create doesn't set the primary keys with every backend.
+            event_ids = dict(
+                Event.objects.filter(
+                    event_id__in=[event.event_id for event, _ in events]
+                ).values_list("event_id", "id")
+            )
+            Event.agents.through.objects.bulk_create(
+                [
+                    Event.agents.through(
+                        event_id=event_ids[uuid.UUID(str(event.event_id))],
+                        agent_id=agent_id,
+                    )
+                    for event, event_agents in events
+                    for agent_id in (event_agents or agents[str(event.file_uuid_id)])
+                ]
+            )
+
+    def _resolve_agents(self, file_uuids):
+        """Return the agents of the unit of each file, see `getAMAgentsForFile`."""
+        agents = {}
+        found = File.objects.filter(uuid__in=file_uuids).values_list(
+            "uuid", "sip_id", "transfer_id"
+        )
+        for file_uuid, sip_uuid, transfer_uuid in found:
+            if sip_uuid:
+                key = (SIP, sip_uuid)
+            elif transfer_uuid:
+                key = (Transfer, transfer_uuid)
+            else:
+                key = None
+            if key not in self.unit_agents:
+                self.unit_agents[key] = self._unit_agents(key)
+            agents[str(file_uuid)] = self.unit_agents[key]
+
+        for file_uuid in file_uuids.difference(agents):
+            logger.warning(
+                "File with UUID %s does not exist in database; unable to fetch Agents",
+                file_uuid,
+            )
+            agents[file_uuid] = []
+
+        return agents
+
+    @staticmethod
+    def _unit_agents(key):
+        if key is None:
+            queryset = Agent.objects.filter(
+                Agent.objects.default_agents_query_keywords()
+            )
+        else:
+            model, unit_uuid = key
+            queryset = model.objects.get(uuid=unit_uuid).agents
+        return list(queryset.values_list("pk", flat=True))
+
+
 def insertIntoDerivations(sourceFileUUID, derivedFileUUID, relatedEventUUID=None):
     """Creates a new entry in the Derivations table using the supplied
     arguments. The two files in this relationship should already exist in the
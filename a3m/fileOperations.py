@@ -20,7 +20,7 @@ import sys
 
 from django.conf import settings as django_settings
 
-from a3m.archivematicaFunctions import get_file_checksum
+from a3m import hashing
 from a3m.databaseFunctions import insertIntoEvents
 from a3m.databaseFunctions import insertIntoFiles
 from a3m.executeOrRunSubProcess import executeOrRun
@@ -37,33 +37,49 @@ def updateSizeAndChecksum(
     checksum=None,
     checksumType=None,
     add_event=True,
+    events=None,
 ):
     """
     Update a File with its size, checksum and checksum type. These are
     parameters that can be either generated or provided via keywords.
 
     Finally, insert the corresponding Event. This behavior can be cancelled
-    using the boolean keyword 'add_event'.
+    using the boolean keyword 'add_event'. The event is buffered in the
+    'events' EventWriter when one is given.
     """
-    if not fileSize:
-        fileSize = os.path.getsize(filePath)
     if not checksumType:
         checksumType = django_settings.DEFAULT_CHECKSUM_ALGORITHM
     if not checksum:
-        checksum = get_file_checksum(filePath, checksumType)
+        result = hashing.digest_files({fileUUID: filePath}, [checksumType])[
+            str(fileUUID)
+        ]
+        if isinstance(result, OSError):
+            raise result
+        checksum = result.digests[checksumType]
+        fileSize = fileSize or result.size
+    if not fileSize:
+        fileSize = os.path.getsize(filePath)
 
     File.objects.filter(uuid=fileUUID).update(
         size=fileSize, checksum=checksum, checksumtype=checksumType
     )
 
     if add_event:
-        insertIntoEvents(
-            fileUUID=fileUUID,
-            eventType="message digest calculation",
-            eventDateTime=date,
-            eventDetail=f'program="python"; module="hashlib.{checksumType}()"',
-            eventOutcomeDetailNote=checksum,
-        )
+        addChecksumEvent(fileUUID, date, checksum, checksumType, events=events)
+
+
+def addChecksumEvent(fileUUID, date, checksum, checksumType, events=None):
+    """Insert the message digest calculation event of a file, or buffer it in
+    the 'events' EventWriter when one is given.
+    """
+    insert_event = insertIntoEvents if events is None else events.add
+    insert_event(
+        fileUUID=fileUUID,
+        eventType="message digest calculation",
+        eventDateTime=date,
+        eventDetail=f'program="python"; module="hashlib.{checksumType}()"',
+        eventOutcomeDetailNote=checksum,
+    )
 
 
 def addFileToTransfer(
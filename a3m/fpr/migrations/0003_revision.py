@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:49
+import uuid
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fpr", "0002_initial_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Revision",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("uuid", models.UUIDField(default=uuid.uuid4)),
+            ],
+        ),
+    ]
@@ -10,6 +10,8 @@ from django.core.exceptions import NON_FIELD_ERRORS
 from django.core.validators import ValidationError
 from django.db import connection
 from django.db import models
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
 from django.utils.translation import gettext_lazy as _
 
 
@@ -434,3 +436,39 @@ class FPTool(models.Model):
         src = f"{self.description} {self.version}"
         encoded = src.encode("utf-8")[: self._meta.get_field("slug").max_length]
         return encoded.decode("utf-8", "ignore")
+
+
+# ########### REVISION ############
+
+
+class Revision(models.Model):
+    """Stamp that changes whenever the FPR changes.
+
+    Client processes keep the FPR in memory, see :mod:`a3m.client.fpr_index`,
+    and compare the stamp they loaded it at with this one to tell whether they
+    have to load it again. Changes made with ``QuerySet.update`` don't send
+    signals, ``Revision.touch`` has to be called after them.
+    """
+
+    uuid = models.UUIDField(default=uuid.uuid4)
+
+    @classmethod
+    def current(cls):
+        """Return the current stamp, ``None`` if the FPR was never changed."""
+        return cls.objects.values_list("uuid", flat=True).first()
+
+    @classmethod
+    def touch(cls):
+        cls.objects.update_or_create(pk=1, defaults={"uuid": uuid.uuid4()})
+
+
+def touch_revision(sender, raw=False, **kwargs):
+    # Fixtures are loaded when the database is created, the revision table
+    # may not exist yet and there is no index to invalidate.
+    if not raw:
+        Revision.touch()
+
+
+for model in (Format, FormatGroup, FormatVersion, FPRule, FPCommand, FPTool):
+    post_save.connect(touch_revision, sender=model)
+    post_delete.connect(touch_revision, sender=model)
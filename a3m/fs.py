@@ -0,0 +1,162 @@
+"""
+Filesystem walker shared by client scripts.
+
+Client scripts used to walk packages with `os.walk`, some of them more than
+once per job, which is slow when the shared directory is on a network
+filesystem. `scan` lists a tree once with `os.scandir`, optionally listing
+directories concurrently in a pool of threads, and returns a `Snapshot` that
+can be walked as many times as needed. The `os.DirEntry` objects are kept so
+the file type and stat results they cache are reused as well.
+
+A snapshot doesn't reflect the changes made to the tree after it was taken.
+"""
+import concurrent.futures
+import os
+from typing import NamedTuple
+from typing import Optional
+
+from django.conf import settings
+
+
+class Listing(NamedTuple):
+    # `os.DirEntry` of the subdirectories, including symlinks to directories.
+    dirs: list
+    # `os.DirEntry` of the other entries.
+    files: list
+
+    @property
+    def walked_dirs(self):
+        """Subdirectories that are walked, symlinks are not followed."""
+        return [entry for entry in self.dirs if not _is_symlink(entry)]
+
+
+def _is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _is_symlink(entry):
+    try:
+        return entry.is_symlink()
+    except OSError:
+        return False
+
+
+def list_dir(path) -> Optional[Listing]:
+    """Return the `Listing` of a directory, or ``None`` if it can't be read."""
+    dirs = []
+    files = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if _is_dir(entry):
+                    dirs.append(entry)
+                else:
+                    files.append(entry)
+    except OSError:
+        return None
+    return Listing(dirs, files)
+
+
+def scan(top, threads=None) -> "Snapshot":
+    """List the directories under ``top`` and return a `Snapshot`.
+
+    Directories are listed by ``threads`` threads, the ``walk_threads``
+    setting by default. They're listed one after another with less than two.
+    """
+    if threads is None:
+        threads = settings.WALK_THREADS
+    top = os.fspath(top)
+    listings = {}  # path: Listing
+
+    if threads < 2:
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            listing = list_dir(path)
+            if listing is None:
+                continue
+            listings[path] = listing
+            pending.extend(entry.path for entry in listing.walked_dirs)
+        return Snapshot(top, listings)
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        pending = {executor.submit(list_dir, top): top}
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                path = pending.pop(future)
+                listing = future.result()
+                if listing is None:
+                    continue
+                listings[path] = listing
+                for entry in listing.walked_dirs:
+                    pending[executor.submit(list_dir, entry.path)] = entry.path
+    return Snapshot(top, listings)
+
+
+class Snapshot:
+    """Listings of the directories of a tree, see `scan`.
+
+    Paths are built like `os.walk` builds them, i.e. by joining the names of
+    the entries to the path of the top directory. The tree, or any of its
+    subdirectories, can be walked in the same order as with `os.walk`.
+    """
+
+    def __init__(self, top, listings):
+        self.top = top
+        self.listings = listings
+        self._entries = None
+
+    def walk(self, top=None, topdown=True):
+        """Yield a ``(dirpath, dirnames, filenames)`` tuple for each
+        directory, like `os.walk`.
+
+        When ``topdown`` is true, ``dirnames`` can be modified in place to
+        skip subdirectories.
+        """
+        top = self.top if top is None else os.fspath(top)
+        steps = []
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            listing = self.listings.get(path)
+            if listing is None:
+                continue
+            dirnames = [entry.name for entry in listing.dirs]
+            step = (path, dirnames, [entry.name for entry in listing.files])
+            if topdown:
+                yield step
+                pending.extend(os.path.join(path, name) for name in reversed(dirnames))
+            else:
+                # Subdirectories are pushed in reverse order compared to the
+                # top-down walk so reversing the steps gives a bottom-up walk.
+                steps.append(step)
+                pending.extend(os.path.join(path, name) for name in dirnames)
+        yield from reversed(steps)
+
+    def files(self, top=None):
+        """Yield the paths of the files under ``top``."""
+        for dirpath, _, filenames in self.walk(top):
+            for filename in filenames:
+                yield os.path.join(dirpath, filename)
+
+    def dirs(self, top=None):
+        """Yield the paths of the directories walked, ``top`` included."""
+        for dirpath, _, _ in self.walk(top):
+            yield dirpath
+
+    def entry(self, path) -> Optional[os.DirEntry]:
+        """Return the `os.DirEntry` of a path found in the tree."""
+        if self._entries is None:
+            self._entries = {
+                entry.path: entry
+                for listing in self.listings.values()
+                for entries in listing
+                for entry in entries
+            }
+        return self._entries.get(os.fspath(path))
@@ -0,0 +1,175 @@
+"""
+Hashing service shared by client scripts.
+
+The same bytes used to be read several times per package: checksums were
+computed by ``update_size_and_checksum``, checksum files provided with a
+transfer were verified by external tools and the files were hashed again to
+write the manifests of the AIP bag.
+
+`hash_file` computes all the digests needed from a file in a single read.
+`digest_files` hashes files concurrently and records their digests as
+`FileDigest` rows, stamped with the size and the modification time of the
+file. Digests are reused by later calls for as long as the file is
+unchanged, only the missing algorithms cause the file to be read again.
+"""
+import concurrent.futures
+import os
+from typing import NamedTuple
+
+from django.conf import settings
+
+from a3m.archivematicaFunctions import get_file_checksums
+from a3m.main.models import FileDigest
+
+
+# Checksum files that can be provided in the metadata directory of a
+# transfer, and the algorithm they're computed with.
+CHECKSUM_FILES = {
+    "checksum.md5": "md5",
+    "checksum.sha1": "sha1",
+    "checksum.sha256": "sha256",
+    "checksum.sha512": "sha512",
+}
+
+
+class Digests(NamedTuple):
+    size: int
+    mtime_ns: int
+    digests: dict  # algorithm: hex digest
+
+
+def hash_file(path, algorithms) -> Digests:
+    """Compute the digests of a file with every algorithm in one read."""
+    stat, digests = get_file_checksums(path, algorithms)
+    return Digests(stat.st_size, stat.st_mtime_ns, digests)
+
+
+def checksum_file_algorithms(unit_path) -> list:
+    """Return the algorithms of the checksum files of a transfer."""
+    metadata_path = os.path.join(unit_path, "metadata")
+    return [
+        algorithm
+        for name, algorithm in CHECKSUM_FILES.items()
+        if os.path.isfile(os.path.join(metadata_path, name))
+    ]
+
+
+def _stored_digests(file_uuids) -> dict:
+    """Return the digests stored for the given files."""
+    stored = {}  # file UUID: {algorithm: FileDigest}
+    for file_digest in FileDigest.objects.filter(file_id__in=file_uuids):
+        file_digests = stored.setdefault(file_digest.file_id, {})
+        file_digests[file_digest.algorithm] = file_digest
+    return stored
+
+
+def _unchanged(file_digests, path):
+    """Return the `Digests` of a file that is unchanged since it was hashed
+    with the algorithms of ``file_digests``, or ``None``.
+    """
+    if not file_digests:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    digests = {}
+    for algorithm, file_digest in file_digests.items():
+        if (file_digest.size, file_digest.mtime_ns) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            digests[algorithm] = file_digest.digest
+    return Digests(stat.st_size, stat.st_mtime_ns, digests)
+
+
+def _save(results):
+    """Replace the digests stored for files with those just computed."""
+    FileDigest.objects.filter(file_id__in=results).delete()
+    FileDigest.objects.bulk_create(
+        [
+            FileDigest(
+                file_id=file_uuid,
+                algorithm=algorithm,
+                digest=digest,
+                size=digests.size,
+                mtime_ns=digests.mtime_ns,
+            )
+            for file_uuid, digests in results.items()
+            for algorithm, digest in digests.digests.items()
+        ]
+    )
+
+
+def hash_files(files, threads=None) -> dict:
+    """Hash files concurrently, see `hash_file`.
+
+    ``files`` maps keys to ``(path, algorithms)`` tuples. Returns the
+    `Digests` of the file of each key, or the ``OSError`` raised when reading
+    it. Files are hashed by ``threads`` threads, the ``checksum_threads``
+    setting by default (0 for one per CPU).
+    """
+    if threads is None:
+        threads = settings.CHECKSUM_THREADS
+    results = {}
+    if len(files) < 2 or threads == 1:
+        for key, (path, algorithms) in files.items():
+            try:
+                results[key] = hash_file(path, algorithms)
+            except OSError as err:
+                results[key] = err
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(threads or os.cpu_count()) as executor:
+        futures = {
+            executor.submit(hash_file, path, algorithms): key
+            for key, (path, algorithms) in files.items()
+        }
+        for future, key in futures.items():
+            try:
+                results[key] = future.result()
+            except OSError as err:
+                results[key] = err
+    return results
+
+
+def digest_files(files, algorithms, threads=None) -> dict:
+    """Return the digests of files computed with every algorithm.
+
+    ``files`` maps the UUIDs of File rows to the paths of the files. Digests
+    stored for an unchanged file are reused, the others are computed with
+    `hash_files` and stored. Files that can't be read are mapped to the
+    ``OSError`` raised when reading them instead of `Digests`.
+    """
+    files = {str(file_uuid): path for file_uuid, path in files.items()}
+    algorithms = set(algorithms)
+    stored = _stored_digests(files)
+
+    results = {}
+    pending = {}  # file UUID: algorithms
+    for file_uuid, path in files.items():
+        unchanged = _unchanged(stored.get(file_uuid), path)
+        if unchanged is not None and algorithms.issubset(unchanged.digests):
+            results[file_uuid] = unchanged
+            continue
+        # Digests that are still valid are computed again, it costs nothing
+        # more than the read, and all the digests stored for the file share
+        # the same stamp.
+        pending[file_uuid] = algorithms.union(unchanged.digests if unchanged else ())
+
+    computed = {}
+    for file_uuid, result in hash_files(
+        {
+            file_uuid: (files[file_uuid], file_algorithms)
+            for file_uuid, file_algorithms in pending.items()
+        },
+        threads,
+    ).items():
+        if isinstance(result, OSError):
+            results[file_uuid] = result
+        else:
+            computed[file_uuid] = result
+    _save(computed)
+
+    results.update(computed)
+    return results
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.13 on 2026-10-18 05:58
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0002_initial_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PackageSubmission",
+            fields=[
+                (
+                    "sipuuid",
+                    models.CharField(
+                        db_column="SIPUUID",
+                        max_length=36,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "transferuuid",
+                    models.CharField(db_column="transferUUID", max_length=36),
+                ),
+                ("name", models.TextField()),
+                ("url", models.TextField()),
+                ("config", models.BinaryField()),
+                ("priority", models.IntegerField(default=0)),
+                ("submitter", models.TextField(blank=True)),
+                (
+                    "createdtime",
+                    models.DateTimeField(auto_now_add=True, db_column="createdTime"),
+                ),
+                (
+                    "startedtime",
+                    models.DateTimeField(
+                        db_column="startedTime", db_index=True, default=None, null=True
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "PackageSubmissions",
+            },
+        ),
+    ]
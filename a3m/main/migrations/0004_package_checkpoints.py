@@ -0,0 +1,37 @@
+# Generated by Django 3.2.13 on 2026-10-18 06:05
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0003_package_submissions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="packagesubmission",
+            name="checkpointcontext",
+            field=models.TextField(blank=True, db_column="checkpointContext"),
+        ),
+        migrations.AddField(
+            model_name="packagesubmission",
+            name="checkpointlink",
+            field=models.UUIDField(db_column="checkpointLink", null=True),
+        ),
+        migrations.AddField(
+            model_name="packagesubmission",
+            name="checkpointstage",
+            field=models.CharField(
+                blank=True, db_column="checkpointStage", max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="packagesubmission",
+            name="finishedtime",
+            field=models.DateTimeField(
+                db_column="finishedTime", db_index=True, default=None, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 3.2.13 on 2026-10-18 06:26
+from django.db import migrations
+from django.db import models
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Func
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Coalesce
+
+
+# Values of `PackageRun.status`.
+STATUS_UNSPECIFIED = 0
+STATUS_FAILED = 1
+STATUS_REJECTED = 2
+STATUS_COMPLETE = 3
+
+
+def backfill_package_runs(apps, schema_editor):
+    """Record the status of the packages processed before runs existed, as
+    inferred from their latest job.
+
+    Runs are filled in with a few set-based queries. None of these packages
+    is being processed, so the status of those whose latest job doesn't tell
+    how they ended is unspecified.
+    """
+    SIP = apps.get_model("main", "SIP")
+    Job = apps.get_model("main", "Job")
+    UnitVariable = apps.get_model("main", "UnitVariable")
+    PackageRun = apps.get_model("main", "PackageRun")
+
+    transfer_ids = UnitVariable.objects.filter(
+        unittype="SIP", unituuid=OuterRef("uuid"), variable="transferID"
+    ).values("variablevalue")[:1]
+    sips = SIP.objects.annotate(
+        transfer_id=Coalesce(
+            Subquery(transfer_ids), Value(""), output_field=models.CharField()
+        )
+    ).values_list("uuid", "transfer_id")
+    PackageRun.objects.bulk_create(
+        (
+            PackageRun(sipuuid=sip_id, transferuuid=transfer_id)
+            for sip_id, transfer_id in sips.iterator()
+        ),
+        batch_size=500,
+    )
+
+    jobs = Job.objects.filter(
+        Q(sipuuid=OuterRef("sipuuid")) | Q(sipuuid=OuterRef("transferuuid"))
+    )
+    last_job = jobs.order_by("-createdtime", "-createdtimedec")[:1]
+    PackageRun.objects.update(
+        currentlink=Subquery(last_job.values("microservicechainlink")),
+        currentjob=Coalesce(Subquery(last_job.values("jobtype")), Value("")),
+        currentgroup=Coalesce(
+            Subquery(last_job.values("microservicegroup")), Value("")
+        ),
+        jobcount=Subquery(
+            jobs.order_by()
+            .annotate(count=Func(F("jobuuid"), function="COUNT"))
+            .values("count")
+        ),
+        startedtime=Subquery(jobs.order_by("createdtime").values("createdtime")[:1]),
+        finishedtime=Subquery(last_job.values("createdtime")),
+    )
+    PackageRun.objects.update(
+        status=Case(
+            When(currentgroup__icontains="failed", then=Value(STATUS_FAILED)),
+            When(currentgroup__icontains="reject", then=Value(STATUS_REJECTED)),
+            When(currentjob="a3m - Store AIP", then=Value(STATUS_COMPLETE)),
+            default=Value(STATUS_UNSPECIFIED),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_package_checkpoints"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PackageRun",
+            fields=[
+                (
+                    "sipuuid",
+                    models.CharField(
+                        db_column="SIPUUID",
+                        max_length=36,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "transferuuid",
+                    models.CharField(db_column="transferUUID", max_length=36),
+                ),
+                ("status", models.IntegerField(default=4)),
+                ("currentlink", models.UUIDField(db_column="currentLink", null=True)),
+                (
+                    "currentjob",
+                    models.CharField(
+                        blank=True, db_column="currentJob", max_length=250
+                    ),
+                ),
+                (
+                    "currentgroup",
+                    models.CharField(
+                        blank=True, db_column="currentGroup", max_length=50
+                    ),
+                ),
+                ("jobcount", models.IntegerField(db_column="jobCount", default=0)),
+                (
+                    "failedjobcount",
+                    models.IntegerField(db_column="failedJobCount", default=0),
+                ),
+                (
+                    "createdtime",
+                    models.DateTimeField(auto_now_add=True, db_column="createdTime"),
+                ),
+                (
+                    "startedtime",
+                    models.DateTimeField(db_column="startedTime", null=True),
+                ),
+                (
+                    "updatedtime",
+                    models.DateTimeField(auto_now=True, db_column="updatedTime"),
+                ),
+                (
+                    "finishedtime",
+                    models.DateTimeField(db_column="finishedTime", null=True),
+                ),
+            ],
+            options={
+                "db_table": "PackageRuns",
+                "index_together": {("status", "createdtime")},
+            },
+        ),
+        migrations.RunPython(backfill_package_runs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:53
+import django.db.models.deletion
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_package_runs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileDigest",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        db_column="pk",
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("algorithm", models.CharField(max_length=36)),
+                ("digest", models.CharField(max_length=128)),
+                ("size", models.BigIntegerField()),
+                ("mtime_ns", models.BigIntegerField(db_column="mtimeNs")),
+                (
+                    "file",
+                    models.ForeignKey(
+                        db_column="fileUUID",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="digests",
+                        to="main.file",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "FileDigests",
+                "unique_together": {("file", "algorithm")},
+            },
+        ),
+    ]
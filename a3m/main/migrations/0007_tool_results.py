@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:22
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_file_digests"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ToolResult",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        db_column="pk",
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("digest", models.CharField(max_length=128)),
+                (
+                    "script_name",
+                    models.CharField(db_column="scriptName", max_length=50),
+                ),
+                (
+                    "rule_id",
+                    models.CharField(blank=True, db_column="ruleId", max_length=73),
+                ),
+                (
+                    "tool_version",
+                    models.CharField(
+                        blank=True, db_column="toolVersion", max_length=128
+                    ),
+                ),
+                ("output", models.TextField()),
+            ],
+            options={
+                "db_table": "ToolResults",
+                "unique_together": {
+                    ("digest", "script_name", "rule_id", "tool_version")
+                },
+            },
+        ),
+    ]
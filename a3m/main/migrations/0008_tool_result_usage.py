@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:33
+import django.utils.timezone
+from django.db import migrations
+from django.db import models
+from django.db.models.functions import Length
+
+
+def backfill_sizes(apps, schema_editor):
+    """Record the size of the results cached so far."""
+    ToolResult = apps.get_model("main", "ToolResult")
+    ToolResult.objects.update(size=Length("output"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0007_tool_results"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="toolresult",
+            name="lastusedtime",
+            field=models.DateTimeField(
+                db_column="lastUsedTime",
+                db_index=True,
+                default=django.utils.timezone.now,
+            ),
+        ),
+        migrations.AddField(
+            model_name="toolresult",
+            name="size",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_sizes, migrations.RunPython.noop),
+    ]
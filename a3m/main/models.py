@@ -24,6 +24,7 @@ import uuid
 from django.db import models
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -489,6 +490,53 @@ class Directory(models.Model):
         return cls.objects.bulk_create(paths)
 
 
+class FileDigest(models.Model):
+    """Digest of the contents of a File, see :mod:`a3m.hashing`.
+
+    The size and the modification time of the file when it was hashed are
+    kept so the digest is only reused while the file is unchanged.
+    """
+
+    id = models.AutoField(primary_key=True, db_column="pk", editable=False)
+    file = models.ForeignKey(
+        "File",
+        db_column="fileUUID",
+        related_name="digests",
+        on_delete=models.CASCADE,
+    )
+    algorithm = models.CharField(max_length=36)
+    digest = models.CharField(max_length=128)
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField(db_column="mtimeNs")
+
+    class Meta:
+        db_table = "FileDigests"
+        unique_together = (("file", "algorithm"),)
+
+
+class ToolResult(models.Model):
+    """Output of a tool for files with the same contents, see
+    :mod:`a3m.client.result_cache`.
+    """
+
+    id = models.AutoField(primary_key=True, db_column="pk", editable=False)
+    digest = models.CharField(max_length=128)
+    script_name = models.CharField(max_length=50, db_column="scriptName")
+    rule_id = models.CharField(max_length=73, db_column="ruleId", blank=True)
+    tool_version = models.CharField(max_length=128, db_column="toolVersion", blank=True)
+    output = models.TextField()
+    # Bytes of the output, the sum is bounded by the ``result_cache_size``
+    # setting by evicting the least recently used results.
+    size = models.IntegerField(default=0)
+    lastusedtime = models.DateTimeField(
+        db_column="lastUsedTime", default=timezone.now, db_index=True
+    )
+
+    class Meta:
+        db_table = "ToolResults"
+        unique_together = (("digest", "script_name", "rule_id", "tool_version"),)
+
+
 class FileFormatVersion(models.Model):
     """
     Link between a File and the FormatVersion it is identified as.
@@ -628,6 +676,79 @@ class Task(models.Model):
         db_table = "Tasks"
 
 
+class PackageSubmission(models.Model):
+    """Packages submitted for processing.
+
+    Submissions are recorded so packages waiting for admission can be queued
+    again when the server restarts. ``startedtime`` is set once processing of
+    the package has started and ``finishedtime`` when its workflow ends.
+
+    While the package is processed, the position of its workflow is recorded
+    after every completed job (``checkpoint*`` fields) so processing can be
+    resumed from there after a restart.
+    """
+
+    sipuuid = models.CharField(max_length=36, primary_key=True, db_column="SIPUUID")
+    transferuuid = models.CharField(max_length=36, db_column="transferUUID")
+    name = models.TextField()
+    url = models.TextField()
+    # Serialized `ProcessingConfig` message.
+    config = models.BinaryField()
+    priority = models.IntegerField(default=0)
+    submitter = models.TextField(blank=True)
+    createdtime = models.DateTimeField(db_column="createdTime", auto_now_add=True)
+    startedtime = models.DateTimeField(
+        db_column="startedTime", null=True, default=None, db_index=True
+    )
+    finishedtime = models.DateTimeField(
+        db_column="finishedTime", null=True, default=None, db_index=True
+    )
+    # Link to run next, with the package stage and the job chain context.
+    checkpointlink = models.UUIDField(db_column="checkpointLink", null=True)
+    checkpointstage = models.CharField(
+        max_length=20, db_column="checkpointStage", blank=True
+    )
+    checkpointcontext = models.TextField(db_column="checkpointContext", blank=True)
+
+    class Meta:
+        db_table = "PackageSubmissions"
+
+
+class PackageRun(models.Model):
+    """Processing status of packages, kept up to date by the workflow engine.
+
+    A row is created when the package is submitted and updated every time the
+    workflow moves on to a new job, so the status of a package is read with a
+    single lookup instead of being inferred from its jobs.
+    """
+
+    # Same values as `PackageStatus` in the API.
+    STATUS_UNSPECIFIED = 0
+    STATUS_FAILED = 1
+    STATUS_REJECTED = 2
+    STATUS_COMPLETE = 3
+    STATUS_PROCESSING = 4
+
+    sipuuid = models.CharField(max_length=36, primary_key=True, db_column="SIPUUID")
+    transferuuid = models.CharField(max_length=36, db_column="transferUUID")
+    status = models.IntegerField(default=STATUS_PROCESSING)
+    # Link, description and group of the job being processed, or of the last
+    # job once the package is done.
+    currentlink = models.UUIDField(db_column="currentLink", null=True)
+    currentjob = models.CharField(max_length=250, db_column="currentJob", blank=True)
+    currentgroup = models.CharField(max_length=50, db_column="currentGroup", blank=True)
+    jobcount = models.IntegerField(db_column="jobCount", default=0)
+    failedjobcount = models.IntegerField(db_column="failedJobCount", default=0)
+    createdtime = models.DateTimeField(db_column="createdTime", auto_now_add=True)
+    startedtime = models.DateTimeField(db_column="startedTime", null=True)
+    updatedtime = models.DateTimeField(db_column="updatedTime", auto_now=True)
+    finishedtime = models.DateTimeField(db_column="finishedTime", null=True)
+
+    class Meta:
+        db_table = "PackageRuns"
+        index_together = (("status", "createdtime"),)
+
+
 class AgentManager(models.Manager):
 
     # These are set in the 0002_initial_data.py migration of the dashboard
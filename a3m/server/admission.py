@@ -0,0 +1,184 @@
+"""
+Admission of queued packages.
+
+`PackageQueue` holds the first job of every package waiting for a processing
+slot. The queue classes in this module decide which package is admitted next
+when a slot becomes available. They are `queue.Queue` subclasses so they keep
+its blocking semantics and bounds, only the selection order changes.
+
+Packages are always admitted in strict priority order first (see
+``SubmitRequest.priority``). Packages of the same priority are then admitted
+according to the configured policy:
+
+* ``fifo``: in order of submission.
+* ``fair_share``: the submitter with the lowest share of admitted packages,
+  relative to its weight, goes first.
+* ``shortest_first``: the package with the smallest estimated size goes first.
+"""
+import itertools
+import logging
+import math
+import queue
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from a3m.api.transferservice import v1beta1 as transfer_service_api
+from a3m.server import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+PRIORITY_NORMAL = transfer_service_api.request_response_pb2.PACKAGE_PRIORITY_NORMAL
+
+
+def normalize_priority(priority):
+    """Unspecified priorities are treated as normal."""
+    return priority or PRIORITY_NORMAL
+
+
+def parse_submitter_weights(value):
+    """Parse weights from a string like ``"alice:2, bob:1"``.
+
+    Submitters not listed have a weight of one.
+    """
+    weights = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        submitter, sep, weight = item.rpartition(":")
+        try:
+            if not sep:
+                raise ValueError
+            weight = float(weight)
+            if weight <= 0:
+                raise ValueError
+        except ValueError:
+            logger.warning("Ignoring invalid submitter weight: %s", item)
+            continue
+        weights[submitter.strip()] = weight
+    return weights
+
+
+@dataclass
+class Entry:
+    """A job waiting for admission."""
+
+    seq: int
+    enqueued_at: float
+    job: Any
+    priority: int = PRIORITY_NORMAL
+    submitter: str = ""
+
+
+class AdmissionQueue(queue.Queue):
+    """Admits packages in priority order, then in order of submission."""
+
+    def _init(self, maxsize):
+        self.entries = []
+        self.counter = itertools.count()
+
+    def _qsize(self):
+        return len(self.entries)
+
+    def _put(self, job):
+        package = job.package
+        self.entries.append(
+            Entry(
+                seq=next(self.counter),
+                enqueued_at=time.monotonic(),
+                job=job,
+                priority=normalize_priority(package.priority),
+                submitter=package.submitter,
+            )
+        )
+
+    def _get(self):
+        entry = min(self.entries, key=self.sort_key)
+        self.entries.remove(entry)
+        self.admitted(entry)
+        return entry.job
+
+    def sort_key(self, entry):
+        return (-entry.priority, entry.seq)
+
+    def admitted(self, entry):
+        metrics.package_admitted(entry.priority, time.monotonic() - entry.enqueued_at)
+
+
+class FairShareAdmissionQueue(AdmissionQueue):
+    """Shares admissions between submitters proportionally to their weights.
+
+    Every admission charges the submitter ``1 / weight`` units of usage and the
+    submitter with the lowest usage after its next admission goes first. New
+    submitters join at the lowest usage seen so they can't claim the capacity
+    that they didn't use while they were away.
+    """
+
+    def __init__(self, maxsize=0, weights=None):
+        self.weights = weights or {}
+        self.usage = {}  # submitter: admissions weighted by 1 / weight
+        super().__init__(maxsize)
+
+    def weight(self, submitter):
+        return self.weights.get(submitter, 1.0)
+
+    def _put(self, job):
+        super()._put(job)
+        submitter = self.entries[-1].submitter
+        if submitter not in self.usage:
+            self.usage[submitter] = min(self.usage.values(), default=0.0)
+
+    def sort_key(self, entry):
+        finish = self.usage[entry.submitter] + 1 / self.weight(entry.submitter)
+        return (-entry.priority, finish, entry.seq)
+
+    def admitted(self, entry):
+        self.usage[entry.submitter] += 1 / self.weight(entry.submitter)
+        super().admitted(entry)
+
+
+class ShortestFirstAdmissionQueue(AdmissionQueue):
+    """Admits the packages with the smallest estimated size first.
+
+    Packages whose size can't be estimated are admitted after the others.
+    """
+
+    def put(self, job, block=True, timeout=None):
+        # Estimate before taking the lock, it may need to hit the filesystem.
+        logger.debug(
+            "Package %s has an estimated size of %s objects",
+            job.package.uuid,
+            job.package.estimated_size,
+        )
+        super().put(job, block, timeout)
+
+    def sort_key(self, entry):
+        size = entry.job.package.estimated_size
+        if size is None:
+            size = math.inf
+        return (-entry.priority, size, entry.seq)
+
+
+POLICIES = {
+    "fifo": AdmissionQueue,
+    "fair_share": FairShareAdmissionQueue,
+    "shortest_first": ShortestFirstAdmissionQueue,
+}
+
+
+def create_admission_queue(policy, maxsize=0, submitter_weights=None):
+    """Return the admission queue implementing the given policy."""
+    try:
+        queue_class = POLICIES[policy or "fifo"]
+    except KeyError:
+        raise ValueError(
+            "Unknown admission policy {!r}, options: {}".format(
+                policy, ", ".join(POLICIES)
+            )
+        )
+    if queue_class is FairShareAdmissionQueue:
+        return queue_class(maxsize, parse_submitter_weights(submitter_weights))
+    return queue_class(maxsize)
@@ -0,0 +1,89 @@
+"""
+Processing events of packages.
+
+Clients used to follow the progress of a package by polling `Read`, which
+queries the database on every call. The workflow engine now publishes an
+event every time a job of a package starts or finishes, and another one when
+the package is done, so `TransferService.Watch` can push them to the clients
+as they happen.
+
+Events are only kept in memory, they're delivered to the subscriptions that
+exist when they're published.
+"""
+import asyncio
+import collections
+import queue
+import threading
+
+
+# Published when the processing of a package has ended.
+PACKAGE_DONE = None
+
+
+class Subscription:
+    """Events of a package, consumed from a thread."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def put(self, event):
+        self.events.put(event)
+
+    def get(self, timeout=None):
+        """Return the next event, raises `queue.Empty` after ``timeout``."""
+        return self.events.get(timeout=timeout)
+
+
+class AsyncSubscription:
+    """Events of a package, consumed from an asyncio event loop.
+
+    It must be created from the event loop, events can be put from any thread.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue()
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+
+    async def get(self):
+        return await self.events.get()
+
+
+class PackageEvents:
+    """Delivers the events of packages to their subscriptions.
+
+    Methods on this class are threadsafe.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = collections.defaultdict(set)  # package uuid: set
+
+    def subscribe(self, package_uuid, subscription):
+        with self.lock:
+            self.subscriptions[str(package_uuid)].add(subscription)
+        return subscription
+
+    def unsubscribe(self, package_uuid, subscription):
+        key = str(package_uuid)
+        with self.lock:
+            subscriptions = self.subscriptions.get(key)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[key]
+
+    def publish(self, package_uuid, event):
+        with self.lock:
+            subscriptions = tuple(self.subscriptions.get(str(package_uuid), ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def package_done(self, package_uuid):
+        self.publish(package_uuid, PACKAGE_DONE)
+
+
+package_events = PackageEvents()
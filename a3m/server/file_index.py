@@ -0,0 +1,134 @@
+"""
+Index of the files of a package.
+
+`Package.files` is used by every link that runs a client script per file. It
+used to walk the whole package with `os.walk` and to check that every file
+recorded in the database still existed, so large packages cost millions of
+stat calls per job even though most jobs don't add, move or remove files.
+
+`FileIndex` keeps the listing (names of files and subdirectories) of every
+directory of the package that it has walked, stamped with the inode and the
+modification time of the directory. Client scripts may run in other
+processes, but adding, removing or renaming an entry always updates the
+modification time of its directory, so a listing is reused for as long as
+the stamp of its directory is unchanged. Walking the package costs one stat
+call per directory instead of one per file.
+
+Listings of directories modified right before they were listed are not kept,
+further changes within the resolution of the modification time could go
+unnoticed otherwise.
+"""
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple
+from typing import Optional
+
+from a3m import fs
+
+
+logger = logging.getLogger(__name__)
+
+
+class Listing(NamedTuple):
+    stamp: tuple  # (st_dev, st_ino, st_mtime_ns) of the directory
+    files: tuple
+    # Subdirectories that are walked, i.e. excluding symlinks to directories.
+    subdirs: tuple
+
+
+class FileIndex:
+    """Directory listings of a package, see module docstring.
+
+    Methods on this class are threadsafe.
+    """
+
+    # Seconds after the modification of a directory during which its listing
+    # is not kept.
+    RACY_INTERVAL = 2.0
+
+    def __init__(self):
+        self.listings = {}  # path: Listing
+        self.lock = threading.Lock()
+
+    def walk(self, top) -> list:
+        """Return the paths of the files found under ``top``.
+
+        Paths are returned in the same order as they'd be found with
+        `os.walk`, which doesn't follow symlinks to directories either.
+        """
+        paths = []
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            listing = self._list(path)
+            if listing is None:
+                continue
+            paths.extend(os.path.join(path, name) for name in listing.files)
+            pending.extend(
+                os.path.join(path, name) for name in reversed(listing.subdirs)
+            )
+        return paths
+
+    def _list(self, path) -> Optional[Listing]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._forget(path)
+            return None
+        stamp = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+        with self.lock:
+            previous = self.listings.get(path)
+        if previous is not None and previous.stamp == stamp:
+            return previous
+
+        entries = fs.list_dir(path)
+        if entries is None:
+            self._forget(path)
+            return None
+        listing = Listing(
+            stamp,
+            tuple(entry.name for entry in entries.files),
+            tuple(entry.name for entry in entries.walked_dirs),
+        )
+
+        if previous is not None:
+            for name in set(previous.subdirs).difference(listing.subdirs):
+                self._forget(os.path.join(path, name))
+        with self.lock:
+            if time.time() - stat.st_mtime > self.RACY_INTERVAL:
+                self.listings[path] = listing
+            else:
+                self.listings.pop(path, None)
+
+        return listing
+
+    def _forget(self, path):
+        """Drop the listings of a directory and its descendants."""
+        prefix = os.path.join(path, "")
+        with self.lock:
+            for key in [
+                key for key in self.listings if key == path or key.startswith(prefix)
+            ]:
+                del self.listings[key]
+
+    def verify(self, top, paths) -> list:
+        """Compare the paths found with a full scan of ``top`` against
+        ``paths``, which were returned by `walk`. Returns the paths found by
+        the full scan.
+        """
+        walked = list(fs.scan(top).files())
+        missing = set(walked).difference(paths)
+        unexpected = set(paths).difference(walked)
+        if missing or unexpected:
+            logger.warning(
+                "File index of %s is out of date (%d files missing, %d files unexpected)",
+                top,
+                len(missing),
+                len(unexpected),
+            )
+            with self.lock:
+                self.listings.clear()
+        return walked
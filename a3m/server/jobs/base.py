@@ -2,6 +2,7 @@
 A base class for other Job types to inherit from.
 """
 import abc
+import asyncio
 import logging
 import uuid
 
@@ -43,13 +44,16 @@ class Job(metaclass=abc.ABCMeta):
         # always zero for non task jobs
         self.exit_code = 0
 
+        # Set when the job resumes a job interrupted by a restart
+        self.interrupted_job_id = None
+
     @classmethod
     @auto_close_old_connections()
     def cleanup_old_db_entries(cls):
         """Update the status of any in progress jobs.
 
-        This command is run on startup.
-        TODO: we could try to recover, instead of just failing.
+        This command is run on startup. Interrupted packages are resumed with
+        new jobs, see `Package.resume_interrupted`.
         """
         models.Job.objects.filter(currentstep=cls.STATUS_EXECUTING_COMMANDS).update(
             currentstep=cls.STATUS_FAILED
@@ -64,8 +68,22 @@ class Job(metaclass=abc.ABCMeta):
         to process.
         """
 
+    async def run_async(self, executor=None):
+        """
+        Run the job from an asyncio event loop.
+
+        Blocking work is done in ``executor``. By default the whole `run`
+        method is, subclasses that spend time waiting should override it so
+        the wait doesn't hold a thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.run)
+
     @auto_close_old_connections()
     def save_to_db(self):
+        # The first job recorded marks the start of processing of the package.
+        self.package.mark_started()
+        self.package.job_started(self)
         return models.Job.objects.create(
             jobuuid=self.uuid,
             jobtype=self.description,
@@ -87,6 +105,8 @@ class Job(metaclass=abc.ABCMeta):
             self.uuid,
             self.exit_code,
         )
-        return models.Job.objects.filter(jobuuid=self.uuid).update(
+        updated = models.Job.objects.filter(jobuuid=self.uuid).update(
             currentstep=self.STATUS_COMPLETED_SUCCESSFULLY
         )
+        self.package.job_finished(self, self.STATUS_COMPLETED_SUCCESSFULLY)
+        return updated
@@ -65,6 +65,9 @@ class JobChain:
         # TODO: package context hits the db, make that clearer
         self.context = self.package.context.copy()
 
+        # Job interrupted by a restart that the first job of the chain replaces.
+        self.interrupted_job_id = None
+
         logger.debug(
             "Creating JobChain for package %s (initial link %s)",
             package.uuid,
@@ -86,9 +89,9 @@ class JobChain:
 
         # End of chain.
         if not next_link:
+            self.chain_completed()
             self.current_link = None
             self.current_job = None
-            self.chain_completed()
             raise StopIteration
 
         # Ensure we have a Link instance instead of its identifier.
@@ -97,7 +100,14 @@ class JobChain:
 
         self.current_link = next_link
         job_class = get_job_class_for_link(self.current_link)
-        self.current_job = job_class(self, self.current_link, self.package)
+        job = job_class(self, self.current_link, self.package)
+
+        # The previous job is done, processing can be resumed from here.
+        self.package.advance(job, self.context, checkpoint=self.current_job is not None)
+        self.current_job = job
+        if self.interrupted_job_id is not None:
+            self.current_job.interrupted_job_id = self.interrupted_job_id
+            self.interrupted_job_id = None
         return self.current_job
 
     def job_completed(self):
@@ -115,3 +125,4 @@ class JobChain:
     def chain_completed(self):
         """Log chain completion"""
         logger.debug("Done with chain for package %s", self.package.uuid)
+        self.package.mark_finished(self.current_job)
@@ -2,7 +2,10 @@
 Jobs remotely executed by on MCP client.
 """
 import abc
+import asyncio
+import functools
 import logging
+import re
 
 from a3m.main import models
 from a3m.server import metrics
@@ -24,6 +27,137 @@ def _escape_for_command_line(value):
     return value
 
 
+class CommandTemplate:
+    """A string with replacement variables, e.g. the arguments of a link.
+
+    The string is split into literal text and variables once, and the
+    variables are substituted by the replacements of the job when the template
+    is compiled, escaped for the command line. Rendering it for a file only
+    substitutes the variables found in the replacements of the file, which
+    take priority.
+
+    Variables without replacements are left as they are.
+
+    This is not the same as replacing every key in turn with `str.replace`,
+    which was done before. Variables are found by a single scan of the
+    template, from left to right, so:
+
+    - A ``%`` can only be part of one variable: in ``%unknown%SIPName%`` the
+      variable is ``%unknown%`` and ``SIPName%`` is literal text, while
+      `str.replace` substituted ``%SIPName%``. Adjacent variables such as
+      ``%SIPName%%SIPUUID%`` are both substituted.
+    - Replacement values are never scanned for variables. `str.replace`
+      substituted the variables found in a value by the keys replaced after
+      it, depending on the order of the replacements, e.g. a ``%fileUUID%``
+      in the name of a package.
+    """
+
+    # re.split returns literal text at even indexes and variables at odd ones.
+    VARIABLE = re.compile(r"(%[^%\s]+%)")
+
+    # Characters of the command line that variables can't contain to be split
+    # ahead of time, see `split`.
+    SPECIAL_CHARS = frozenset("\"'\\`")
+
+    def __init__(self, template, replacements):
+        self.template = template
+        self.replacements = replacements
+        self.parts = self.VARIABLE.split(template)
+        self.variables = []  # (index, variable)
+        for index in range(1, len(self.parts), 2):
+            variable = self.parts[index]
+            self.variables.append((index, variable))
+            if variable in replacements:
+                self.parts[index] = _escape_for_command_line(replacements[variable])
+
+    def render(self, replacements=None):
+        if not replacements:
+            return "".join(self.parts)
+        parts = self.parts.copy()
+        for index, variable in self.variables:
+            if variable in replacements:
+                parts[index] = _escape_for_command_line(replacements[variable])
+        return "".join(parts)
+
+    @functools.cached_property
+    def argv(self):
+        """The template split into arguments the way the client splits the
+        rendered command line (`shlex.split` in POSIX mode), so the client
+        doesn't have to.
+
+        It's a list of ``(literals, variables)`` tuples, one per argument,
+        where the argument is ``literals[0] + variables[0] + literals[1] ...``
+        and ``literals`` has one more item than ``variables``. It's ``None``
+        when the result could depend on the replacement values, i.e. when a
+        variable isn't enclosed in double quotes, or when the template can't
+        be split.
+        """
+        arguments = []
+        literals = []
+        variables = []
+        chars = []
+        in_argument = False
+        quote = None
+        escaped = False
+
+        for index, part in enumerate(self.VARIABLE.split(self.template)):
+            if index % 2:
+                if quote != '"' or escaped or self.SPECIAL_CHARS.intersection(part):
+                    return None
+                literals.append("".join(chars))
+                variables.append(part)
+                chars = []
+                continue
+            for char in part:
+                if escaped:
+                    # Within double quotes, only quotes and backslashes can be
+                    # escaped.
+                    if quote == '"' and char not in '"\\':
+                        chars.append("\\")
+                    chars.append(char)
+                    escaped = False
+                elif quote == "'":
+                    if char == "'":
+                        quote = None
+                    else:
+                        chars.append(char)
+                elif quote == '"':
+                    if char == '"':
+                        quote = None
+                    elif char == "\\":
+                        escaped = True
+                    else:
+                        chars.append(char)
+                elif char in " \t\r\n":
+                    if in_argument:
+                        literals.append("".join(chars))
+                        arguments.append((literals, variables))
+                        literals, variables, chars = [], [], []
+                        in_argument = False
+                elif char == "\\":
+                    escaped = in_argument = True
+                elif char in "\"'":
+                    quote = char
+                    in_argument = True
+                else:
+                    chars.append(char)
+                    in_argument = True
+
+        if quote is not None or escaped:
+            return None
+        if in_argument:
+            literals.append("".join(chars))
+            arguments.append((literals, variables))
+
+        # The client drops backslashes followed by backticks from arguments,
+        # after they're split. Escaped values keep them so the variables are
+        # rendered as is, but literal backticks would need the same treatment.
+        if any("`" in literal for literals, _ in arguments for literal in literals):
+            return None
+
+        return arguments
+
+
 class ClientScriptJob(Job, metaclass=abc.ABCMeta):
     """A job with one or more Tasks."""
 
@@ -82,16 +216,46 @@ class ClientScriptJob(Job, metaclass=abc.ABCMeta):
         if command is None:
             return None
 
-        for key, replacement in replacements.items():
-            escaped_replacement = _escape_for_command_line(replacement)
-            command = command.replace(key, escaped_replacement)
+        return CommandTemplate(command, replacements).render()
 
-        return command
+    def compile_templates(self):
+        """Return `CommandTemplate` instances (or ``None``) for the arguments,
+        the stdout file and the stderr file of the link.
+        """
+        return tuple(
+            None
+            if template is None
+            else CommandTemplate(template, self.command_replacements)
+            for template in (self.arguments, self.stdout_file, self.stderr_file)
+        )
 
     @auto_close_old_connections()
     def run(self, *args, **kwargs):
         super().run(*args, **kwargs)
 
+        self.start()
+        # Block until out of process tasks have completed
+        self.wait_for_task_results()
+
+        self.update_status_from_exit_code()
+
+        return next(self.job_chain, None)
+
+    async def run_async(self, executor=None):
+        loop = asyncio.get_running_loop()
+
+        await loop.run_in_executor(executor, self.start)
+        # Wait for out of process tasks without holding a thread
+        await self.wait_for_task_results_async()
+
+        await loop.run_in_executor(executor, self.update_status_from_exit_code)
+
+        # Moving along the chain records a checkpoint in the database.
+        return await loop.run_in_executor(executor, next, self.job_chain, None)
+
+    @auto_close_old_connections()
+    def start(self):
+        """Record the job and submit its tasks to the backend."""
         logger.debug("Running %s (package %s)", self.description, self.package.uuid)
 
         # Reload the package, in case the path has changed
@@ -104,17 +268,12 @@ class ClientScriptJob(Job, metaclass=abc.ABCMeta):
 
         self.task_backend = get_task_backend()
         self.submit_tasks()
-        # Block until out of process tasks have completed
-        self.wait_for_task_results()
-
-        self.update_status_from_exit_code()
-
-        return next(self.job_chain, None)
 
     def submit_tasks(self):
-        arguments = self.replace_values(self.arguments, self.command_replacements)
-        stdout_file = self.replace_values(self.stdout_file, self.command_replacements)
-        stderr_file = self.replace_values(self.stderr_file, self.command_replacements)
+        templates = self.compile_templates()
+        arguments, stdout_file, stderr_file = (
+            None if template is None else template.render() for template in templates
+        )
 
         task = Task(
             self.execute,
@@ -123,15 +282,41 @@ class ClientScriptJob(Job, metaclass=abc.ABCMeta):
             stderr_file,
             self.command_replacements,
             wants_output=self.capture_task_output,
+            arguments_template=templates[0],
         )
+        self.submit_task(task)
+
+    def submit_task(self, task):
+        self.package.task_submitted()
         self.task_backend.submit_task(self, task)
 
     def wait_for_task_results(self):
+        tasks = []
         for task in self.task_backend.wait_for_results(self):
-            # A3M-TODO: These 0s avoid comparing int with None
+            tasks.append(task)
+            self.task_done(task)
+        self.update_exit_code(tasks)
+
+    async def wait_for_task_results_async(self):
+        tasks = []
+        async for task in self.task_backend.wait_for_results_async(self):
+            tasks.append(task)
+            self.task_done(task)
+        self.update_exit_code(tasks)
+
+    def update_exit_code(self, tasks):
+        """Account for exit codes that changed after the tasks were reported
+        done, when the final results of their batch were received.
+        """
+        for task in tasks:
             self.exit_code = max([self.exit_code or 0, task.exit_code or 0])
-            metrics.task_completed(task, self)
-            self.task_completed_callback(task)
+
+    def task_done(self, task):
+        # A3M-TODO: These 0s avoid comparing int with None
+        self.exit_code = max([self.exit_code or 0, task.exit_code or 0])
+        self.package.task_completed(task.exit_code)
+        metrics.task_completed(task, self)
+        self.task_completed_callback(task)
 
     @abc.abstractmethod
     def task_completed_callback(self, task):
@@ -141,6 +326,7 @@ class ClientScriptJob(Job, metaclass=abc.ABCMeta):
     def update_status_from_exit_code(self):
         status_code = self.link.get_status_id(self.exit_code)
         models.Job.objects.filter(jobuuid=self.uuid).update(currentstep=status_code)
+        self.package.job_finished(self, status_code)
         if status_code != models.Job.STATUS_COMPLETED_SUCCESSFULLY:
             try:
                 status = models.Job.STATUS[status_code][1]
@@ -180,28 +366,45 @@ class FilesClientScriptJob(ClientScriptJob):
         return self.link.config.get("filter_subdir", "")
 
     def submit_tasks(self):
-        """Iterate through all matching files for the package, and submit tasks."""
+        """Iterate through all matching files for the package, and submit tasks.
+
+        When resuming a job interrupted by a restart, files whose task already
+        completed are skipped.
+        """
+        completed = {}
+        if self.interrupted_job_id is not None:
+            completed = Task.completed_exit_codes(self.interrupted_job_id)
+
+        # Templates are compiled with the replacement values of the job, only
+        # the values of each file are substituted afterwards.
+        templates = self.compile_templates()
+
         for file_replacements in self.package.files(filter_subdir=self.filter_subdir):
-            # File replacement values take priority
-            command_replacements = self.command_replacements.copy()
-            command_replacements.update(file_replacements)
+            if file_replacements.get(r"%fileUUID%") in completed:
+                continue
 
-            arguments = self.replace_values(self.arguments, command_replacements)
-            stdout_file = self.replace_values(self.stdout_file, command_replacements)
-            stderr_file = self.replace_values(self.stderr_file, command_replacements)
+            # File replacement values take priority
+            arguments, stdout_file, stderr_file = (
+                None if template is None else template.render(file_replacements)
+                for template in templates
+            )
 
             task = Task(
                 self.execute,
                 arguments,
                 stdout_file,
                 stderr_file,
-                command_replacements,
+                file_replacements,
                 wants_output=self.capture_task_output,
+                arguments_template=templates[0],
             )
-            self.task_backend.submit_task(self, task)
+            self.submit_task(task)
         else:
             # Nothing to do; set exit code to success
             self.exit_code = 0
 
+        if completed:
+            self.exit_code = max(completed.values())
+
     def task_completed_callback(self, task):
         pass
@@ -12,6 +12,8 @@ from prometheus_client import Info
 from prometheus_client import start_http_server
 
 from a3m import __version__
+from a3m.api.transferservice import v1beta1 as transfer_service_api
+from a3m.common_metrics import PROCESSING_TIME_BUCKETS
 from a3m.common_metrics import TASK_DURATION_BUCKETS
 
 
@@ -63,6 +65,12 @@ job_queue_length_gauge = Gauge(
 package_queue_length_gauge = Gauge(
     "mcpserver_package_queue_length", "Number of queued packages"
 )
+package_queue_wait_histogram = Histogram(
+    "mcpserver_package_queue_wait_seconds",
+    "Histogram of time spent by packages waiting for admission, labeled by priority",
+    ["priority"],
+    buckets=PROCESSING_TIME_BUCKETS,
+)
 
 
 def skip_if_prometheus_disabled(func):
@@ -125,3 +133,14 @@ def task_failed(task, job):
         task_group_name=job.group, task_name=job.description
     ).inc()
     task_counter.labels(task_group_name=job.group, task_name=job.description).inc()
+
+
+@skip_if_prometheus_disabled
+def package_admitted(priority, wait_time):
+    try:
+        priority_name = transfer_service_api.request_response_pb2.PackagePriority.Name(
+            priority
+        )
+    except ValueError:
+        priority_name = str(priority)
+    package_queue_wait_histogram.labels(priority=priority_name).observe(wait_time)
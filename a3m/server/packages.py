@@ -1,23 +1,34 @@
 """Package management."""
 import ast
 import collections
+import dataclasses
+import datetime
 import functools
+import json
 import logging
 import os
+import zipfile
 from dataclasses import dataclass
 from dataclasses import field
 from enum import auto
 from enum import Enum
 from typing import Optional
+from urllib.parse import urlparse
+from uuid import UUID
 from uuid import uuid4
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from google.protobuf import timestamp_pb2
 
 from a3m.api.transferservice import v1beta1 as transfer_service_api
 from a3m.archivematicaFunctions import strToUnicode
 from a3m.main import models
 from a3m.server.db import auto_close_old_connections
+from a3m.server.events import package_events
+from a3m.server.file_index import FileIndex
 from a3m.server.jobs import JobChain
 
 
@@ -37,7 +48,11 @@ BASE_REPLACEMENTS = {
 
 
 def get_file_replacement_mapping(file_obj, unit_directory):
-    mapping = BASE_REPLACEMENTS.copy()
+    """Return the replacement values of a file.
+
+    `BASE_REPLACEMENTS` are not included, they're part of the replacement
+    values of the package, see `Package.get_replacement_mapping`.
+    """
     dirname = os.path.dirname(file_obj.currentlocation)
     name, ext = os.path.splitext(file_obj.currentlocation)
     name = os.path.basename(name)
@@ -45,24 +60,20 @@ def get_file_replacement_mapping(file_obj, unit_directory):
     absolute_path = file_obj.currentlocation.replace(r"%SIPDirectory%", unit_directory)
     absolute_path = absolute_path.replace(r"%transferDirectory%", unit_directory)
 
-    mapping.update(
-        {
-            r"%fileUUID%": file_obj.pk,
-            r"%originalLocation%": file_obj.originallocation,
-            r"%currentLocation%": file_obj.currentlocation,
-            r"%fileGrpUse%": file_obj.filegrpuse,
-            r"%fileDirectory%": dirname,
-            r"%fileName%": name,
-            r"%fileExtension%": ext[1:],
-            r"%fileExtensionWithDot%": ext,
-            r"%relativeLocation%": absolute_path,
-            # TODO: standardize duplicates
-            r"%inputFile%": absolute_path,
-            r"%fileFullName%": absolute_path,
-        }
-    )
-
-    return mapping
+    return {
+        r"%fileUUID%": file_obj.pk,
+        r"%originalLocation%": file_obj.originallocation,
+        r"%currentLocation%": file_obj.currentlocation,
+        r"%fileGrpUse%": file_obj.filegrpuse,
+        r"%fileDirectory%": dirname,
+        r"%fileName%": name,
+        r"%fileExtension%": ext[1:],
+        r"%fileExtensionWithDot%": ext,
+        r"%relativeLocation%": absolute_path,
+        # TODO: standardize duplicates
+        r"%inputFile%": absolute_path,
+        r"%fileFullName%": absolute_path,
+    }
 
 
 class Stage(Enum):
@@ -80,57 +91,271 @@ class Package:
     package is in.
     """
 
-    def __init__(self, name, url, config, transfer, sip):
+    # Upper bound for the number of objects counted by `estimated_size`.
+    MAX_ESTIMATED_SIZE = 100000
+
+    def __init__(self, name, url, config, transfer, sip, priority=0, submitter=""):
         self.name = name
         self.url = url
         self.config = config
         self.transfer = transfer
         self.sip = sip
+        self.priority = priority
+        self.submitter = submitter
+        self.started = False
         self.stage = Stage.TRANSFER
         self.aip_filename = None
         self._current_path = self.transfer.currentlocation
+        self.state = PackageState()
+        self.file_index = FileIndex()
 
     def __repr__(self):
         return "{class_name}({uuid})".format(
             class_name=self.__class__.__name__, uuid=self.uuid
         )
 
+    @classmethod
+    def create_package(
+        cls,
+        package_queue,
+        executor,
+        workflow,
+        name,
+        url,
+        config,
+        priority=0,
+        submitter="",
+    ):
+        """Launch transfer and return its object immediately.
+
+        The submission is recorded so the package can be queued again if the
+        server restarts before it's admitted. Raises `QueueFullError` when too
+        many packages are waiting for admission.
+        """
+        return cls.create_packages(
+            package_queue,
+            executor,
+            workflow,
+            [
+                {
+                    "name": name,
+                    "url": url,
+                    "config": config,
+                    "priority": priority,
+                    "submitter": submitter,
+                }
+            ],
+        )[0]
+
     @classmethod
     @auto_close_old_connections()
-    def create_package(cls, package_queue, executor, workflow, name, url, config):
-        """Launch transfer and return its object immediately."""
-        if not name:
-            raise ValueError("No transfer name provided.")
-        if not url:
-            raise ValueError("No url provided.")
-
-        transfer_id = str(uuid4())
-        transfer_dir = os.path.join(
-            _get_setting("PROCESSING_DIRECTORY"), "transfer", transfer_id, ""
-        )
-        transfer = models.Transfer.objects.create(
-            uuid=transfer_id, currentlocation=transfer_dir
-        )
-        logger.debug("Transfer object created: %s", transfer.pk)
+    def create_packages(cls, package_queue, executor, workflow, submissions):
+        """Launch many transfers at once and return their objects.
 
-        sip_id = str(uuid4())
-        sip_dir = os.path.join(
-            _get_setting("PROCESSING_DIRECTORY"), "ingest", sip_id, ""
+        ``submissions`` is a list of dicts with the arguments accepted by
+        `create_package`. The rows of all the packages are inserted in bulk
+        within a single transaction, so either all of them are accepted or
+        none is.
+        """
+        for submission in submissions:
+            if not submission.get("name"):
+                raise ValueError("No transfer name provided.")
+            if not submission.get("url"):
+                raise ValueError("No url provided.")
+
+        with package_queue.submission_lock:
+            package_queue.check_capacity(
+                models.PackageSubmission.objects.filter(
+                    startedtime__isnull=True
+                ).count()
+                + len(submissions)
+                - 1
+            )
+            with transaction.atomic():
+                packages = cls._create_packages(submissions)
+
+        for package in packages:
+            cls.start_workflow(package, package_queue, executor, workflow)
+
+        return packages
+
+    @classmethod
+    def _create_packages(cls, submissions):
+        processing_dir = _get_setting("PROCESSING_DIRECTORY")
+        packages = []
+        rows = collections.defaultdict(list)  # model: list of instances
+        for submission in submissions:
+            name = submission["name"]
+            url = submission["url"]
+            config = submission["config"]
+            priority = submission.get("priority", 0)
+            submitter = submission.get("submitter", "")
+
+            transfer_id = str(uuid4())
+            transfer_dir = os.path.join(processing_dir, "transfer", transfer_id, "")
+            transfer = models.Transfer(uuid=transfer_id, currentlocation=transfer_dir)
+            rows[models.Transfer].append(transfer)
+
+            sip_id = str(uuid4())
+            sip_dir = os.path.join(processing_dir, "ingest", sip_id, "")
+            sip = models.SIP(uuid=sip_id, currentpath=sip_dir)
+            rows[models.SIP].append(sip)
+
+            # Equivalent to setting `SIP.transfer_id`, without a query per SIP.
+            rows[models.UnitVariable].append(
+                models.UnitVariable(
+                    unittype="SIP",
+                    unituuid=sip_id,
+                    variable="transferID",
+                    variablevalue=transfer_id,
+                    microservicechainlink=None,
+                )
+            )
+
+            rows[models.PackageSubmission].append(
+                models.PackageSubmission(
+                    sipuuid=sip_id,
+                    transferuuid=transfer_id,
+                    name=name,
+                    url=url,
+                    config=config.SerializeToString(),
+                    priority=priority,
+                    submitter=submitter,
+                )
+            )
+
+            rows[models.PackageRun].append(
+                models.PackageRun(sipuuid=sip_id, transferuuid=transfer_id)
+            )
+
+            packages.append(cls(name, url, config, transfer, sip, priority, submitter))
+
+        for model, instances in rows.items():
+            model.objects.bulk_create(instances)
+        logger.debug("Transfer and SIP objects created for %d packages", len(packages))
+
+        return packages
+
+    @classmethod
+    def _from_submission(cls, submission):
+        """Recreate a package from its submission, or return ``None`` if the
+        submission can't be used anymore.
+        """
+        try:
+            transfer = models.Transfer.objects.get(uuid=submission.transferuuid)
+            sip = models.SIP.objects.get(uuid=submission.sipuuid)
+        except (models.Transfer.DoesNotExist, models.SIP.DoesNotExist):
+            logger.warning(
+                "Discarding submission of package %s, its units are missing.",
+                submission.sipuuid,
+            )
+            submission.delete()
+            return None
+        config = transfer_service_api.request_response_pb2.ProcessingConfig()
+        config.ParseFromString(bytes(submission.config))
+        return cls(
+            submission.name,
+            submission.url,
+            config,
+            transfer,
+            sip,
+            submission.priority,
+            submission.submitter,
         )
-        sip = models.SIP.objects.create(uuid=sip_id, currentpath=sip_dir)
-        sip.transfer_id = transfer_id
-        logger.debug("SIP object created: %s", sip.pk)
 
-        package = cls(name, url, config, transfer, sip)
+    @classmethod
+    @auto_close_old_connections()
+    def requeue_submissions(cls, package_queue, executor, workflow):
+        """Queue again the packages that were waiting for admission when the
+        server stopped, in order of submission.
+        """
+        submissions = models.PackageSubmission.objects.filter(
+            startedtime__isnull=True
+        ).order_by("createdtime")
+        for submission in submissions:
+            package = cls._from_submission(submission)
+            if package is None:
+                continue
+            # Triggered synchronously to preserve the order of submission.
+            Package.trigger_workflow(package, package_queue, workflow)
+            logger.info("Package %s queued again (%s)", package.uuid, package.name)
+
+    @classmethod
+    @auto_close_old_connections()
+    def resume_interrupted(cls, package_queue, workflow):
+        """Resume processing of the packages that were being processed when
+        the server stopped.
+
+        Each package is resumed from its last checkpoint, i.e. the link that
+        was running is run again. Tasks of that link that had completed are
+        not run again, see `FilesClientScriptJob`.
+        """
+        submissions = models.PackageSubmission.objects.filter(
+            startedtime__isnull=False, finishedtime__isnull=True
+        ).order_by("startedtime")
+        for submission in submissions:
+            package = cls._from_submission(submission)
+            if package is None:
+                continue
+            package.started = True
+            if submission.checkpointstage == Stage.INGEST.name:
+                package.start_ingest()
+
+            try:
+                if submission.checkpointlink:
+                    link = workflow.get_link(str(submission.checkpointlink))
+                else:
+                    link = workflow.get_initiator()
+            except KeyError:
+                logger.warning(
+                    "Package %s can't be resumed, link %s is not in the workflow.",
+                    package.uuid,
+                    submission.checkpointlink,
+                )
+                package.mark_finished()
+                continue
 
+            try:
+                context = PackageContext.from_checkpoint(submission.checkpointcontext)
+            except ValueError as err:
+                logger.warning(
+                    "Package %s can't be resumed, its checkpoint context is invalid: %s",
+                    package.uuid,
+                    err,
+                )
+                package.mark_finished()
+                continue
+
+            job_chain = JobChain(package, workflow, link)
+            if context is not None:
+                job_chain.context = context
+            job_chain.interrupted_job_id = (
+                models.Job.objects.filter(
+                    sipuuid=package.subid, microservicechainlink=link.id
+                )
+                .order_by("-createdtime", "-createdtimedec")
+                .values_list("jobuuid", flat=True)
+                .first()
+            )
+
+            package_queue.schedule_job(next(job_chain))
+            logger.info(
+                "Package %s resumed from link %s (%s)",
+                package.uuid,
+                link.id,
+                package.name,
+            )
+
+    @staticmethod
+    def start_workflow(package, package_queue, executor, workflow):
         params = (package, package_queue, workflow)
         future = executor.submit(Package.trigger_workflow, *params)
         future.add_done_callback(
-            functools.partial(Package.trigger_workflow_done_callback, package.uuid)
+            functools.partial(
+                Package.trigger_workflow_done_callback, package, package_queue
+            )
         )
 
-        return package
-
     @staticmethod
     def trigger_workflow(package, package_queue, workflow):
         logger.debug("Package %s: starting workflow processing", package.uuid)
@@ -144,18 +369,206 @@ class Package:
         package_queue.schedule_job(next(job_chain))
 
     @staticmethod
-    def trigger_workflow_done_callback(package_id, future):
+    def trigger_workflow_done_callback(package, package_queue, future):
         try:
             future.result()
         except Exception as err:
             logger.warning("Exception detected: %s", err, exc_info=True)
+            if package_queue.shutdown_event.is_set():
+                # Queued again after the restart, see `requeue_submissions`.
+                return
+            package.mark_failed()
+            package_events.package_done(package.uuid)
         else:
-            logger.info("Package processing started (%s)", package_id)
+            logger.info("Package processing started (%s)", package.uuid)
 
     @property
     def uuid(self):
         return self.sip.pk
 
+    @auto_close_old_connections()
+    def mark_started(self):
+        """Record that processing has started, i.e. the package was admitted
+        and should not be queued again after a restart.
+        """
+        if self.started:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            models.PackageSubmission.objects.filter(sipuuid=self.uuid).update(
+                startedtime=now
+            )
+            models.PackageRun.objects.filter(sipuuid=self.uuid).update(
+                startedtime=now, updatedtime=now
+            )
+        self.started = True
+
+    def job_started(self, job):
+        """Update the live state of the package when a job starts."""
+        self._publish_job(job, models.Job.STATUS_EXECUTING_COMMANDS)
+        self.state = dataclasses.replace(
+            self.state,
+            started_at=self.state.started_at or job.created_at,
+            link_id=job.link.id,
+            job_id=job.uuid,
+            job_name=job.description,
+            job_started_at=job.created_at,
+            tasks_submitted=0,
+            tasks_completed=0,
+            tasks_failed=0,
+        )
+
+    def job_finished(self, job, status_code):
+        """Notify the watchers of the package that a job has finished."""
+        self._publish_job(job, status_code)
+        if status_code == models.Job.STATUS_FAILED:
+            models.PackageRun.objects.filter(sipuuid=self.uuid).update(
+                failedjobcount=F("failedjobcount") + 1, updatedtime=timezone.now()
+            )
+
+    def _publish_job(self, job, status_code):
+        start_time = timestamp_pb2.Timestamp()
+        start_time.FromDatetime(job.created_at)
+        package_events.publish(
+            self.uuid,
+            transfer_service_api.request_response_pb2.Job(
+                id=str(job.uuid),
+                name=job.description,
+                group=job.group,
+                link_id=str(job.link.id),
+                status=status_code,
+                start_time=start_time,
+            ),
+        )
+
+    def task_submitted(self):
+        self.state = dataclasses.replace(
+            self.state, tasks_submitted=self.state.tasks_submitted + 1
+        )
+
+    def task_completed(self, exit_code):
+        self.state = dataclasses.replace(
+            self.state,
+            tasks_completed=self.state.tasks_completed + 1,
+            tasks_failed=self.state.tasks_failed + bool(exit_code),
+        )
+
+    @auto_close_old_connections()
+    def checkpoint(self, link_id, context):
+        """Record that processing should continue with the given link, so it
+        can be resumed from there after a restart.
+        """
+        self._checkpoint(link_id, context)
+
+    def _checkpoint(self, link_id, context):
+        models.PackageSubmission.objects.filter(sipuuid=self.uuid).update(
+            checkpointlink=link_id,
+            checkpointstage=self.stage.name,
+            checkpointcontext=PackageContext.to_checkpoint(context),
+        )
+
+    @auto_close_old_connections()
+    def advance(self, job, context, checkpoint=True):
+        """Record that the workflow of the package moved on to ``job``.
+
+        The run of the package is updated and, with ``checkpoint``, processing
+        is recorded to continue with the link of the job (see `checkpoint`),
+        in the same transaction.
+        """
+        with transaction.atomic():
+            if checkpoint:
+                self._checkpoint(job.link.id, context)
+            models.PackageRun.objects.filter(sipuuid=self.uuid).update(
+                currentlink=job.link.id,
+                currentjob=job.description,
+                currentgroup=job.group,
+                jobcount=F("jobcount") + 1,
+                updatedtime=timezone.now(),
+            )
+
+    @auto_close_old_connections()
+    def mark_finished(self, last_job=None):
+        """Record that the workflow of the package has ended.
+
+        The final status of the package is inferred from ``last_job``, the
+        package failed if there's none.
+        """
+        status = models.PackageRun.STATUS_FAILED
+        if last_job is not None:
+            status = _status_from_job(last_job.group, last_job.description)
+            if status is None:
+                logger.warning(
+                    "Package %s status cannot be determined (job.type=%s, job.microservicegroup=%s)",
+                    self.uuid,
+                    last_job.description,
+                    last_job.group,
+                )
+                status = models.PackageRun.STATUS_UNSPECIFIED
+        now = timezone.now()
+        with transaction.atomic():
+            models.PackageSubmission.objects.filter(sipuuid=self.uuid).update(
+                finishedtime=now
+            )
+            models.PackageRun.objects.filter(sipuuid=self.uuid).update(
+                status=status, finishedtime=now, updatedtime=now
+            )
+
+    @auto_close_old_connections()
+    def mark_failed(self):
+        """Record that the workflow of the package ended with an error.
+
+        The package is marked as started too if it wasn't, so a package that
+        failed before it was admitted no longer counts against the capacity of
+        the queue and isn't queued again after a restart.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            models.PackageSubmission.objects.filter(
+                sipuuid=self.uuid, startedtime__isnull=True
+            ).update(startedtime=now)
+            models.PackageSubmission.objects.filter(sipuuid=self.uuid).update(
+                finishedtime=now
+            )
+            models.PackageRun.objects.filter(
+                sipuuid=self.uuid, startedtime__isnull=True
+            ).update(startedtime=now)
+            models.PackageRun.objects.filter(sipuuid=self.uuid).update(
+                status=models.PackageRun.STATUS_FAILED,
+                finishedtime=now,
+                updatedtime=now,
+            )
+        self.started = True
+
+    @functools.cached_property
+    def estimated_size(self) -> Optional[int]:
+        """Estimated number of objects in the package before it is downloaded,
+        or ``None`` when it can't be estimated cheaply.
+
+        Only local sources are looked at: directories are walked (up to
+        ``MAX_ESTIMATED_SIZE`` files) and ZIP files are counted from their
+        central directory. Other files count as one object.
+        """
+        parsed = urlparse(self.url)
+        if parsed.scheme not in ("file", ""):
+            return None
+        path = parsed.path
+        if os.path.isdir(path):
+            count = 0
+            for _, _, files in os.walk(path):
+                count += len(files)
+                if count >= self.MAX_ESTIMATED_SIZE:
+                    return self.MAX_ESTIMATED_SIZE
+            return count
+        if not os.path.isfile(path):
+            return None
+        if zipfile.is_zipfile(path):
+            try:
+                with zipfile.ZipFile(path) as zip_file:
+                    return len(zip_file.infolist())
+            except (OSError, zipfile.BadZipFile):
+                return None
+        return 1
+
     @property
     def subid(self):
         if self.stage is Stage.INGEST:
@@ -281,6 +694,10 @@ class Package:
     def files(self, filter_subdir=None):
         """Generator that yields all files associated with the package or that
         should be associated with a package.
+
+        Files on disk are found through the file index of the package, see
+        `FileIndex`. With the ``verify_file_index`` setting the package is
+        also walked fully to check the index.
         """
         with auto_close_old_connections():
             queryset = self.base_queryset
@@ -293,26 +710,30 @@ class Package:
             if filter_subdir:
                 start_path = start_path + filter_subdir
 
+            file_paths = self.file_index.walk(start_path)
+            if settings.VERIFY_FILE_INDEX:
+                file_paths = self.file_index.verify(start_path, file_paths)
+            files_on_disk = set(file_paths)
+
             files_returned_already = set()
-            if queryset.exists():
-                for file_obj in queryset.iterator():
-                    file_obj_mapped = get_file_replacement_mapping(
-                        file_obj, self.current_path
-                    )
-                    if not os.path.exists(file_obj_mapped.get("%inputFile%")):
-                        continue
-                    files_returned_already.add(file_obj_mapped.get("%inputFile%"))
-                    yield file_obj_mapped
-
-            for basedir, subdirs, files in os.walk(start_path):
-                for file_name in files:
-                    file_path = os.path.join(basedir, file_name)
-                    if file_path not in files_returned_already:
-                        yield {
-                            r"%relativeLocation%": file_path,
-                            r"%fileUUID%": "None",
-                            r"%fileGrpUse%": "",
-                        }
+            for file_obj in queryset.iterator():
+                file_obj_mapped = get_file_replacement_mapping(
+                    file_obj, self.current_path
+                )
+                file_path = file_obj_mapped.get("%inputFile%")
+                # Paths that aren't walked, e.g. under symlinks, are checked.
+                if file_path not in files_on_disk and not os.path.exists(file_path):
+                    continue
+                files_returned_already.add(file_path)
+                yield file_obj_mapped
+
+            for file_path in file_paths:
+                if file_path not in files_returned_already:
+                    yield {
+                        r"%relativeLocation%": file_path,
+                        r"%fileUUID%": "None",
+                        r"%fileGrpUse%": "",
+                    }
 
 
 class PackageContext:
@@ -344,6 +765,26 @@ class PackageContext:
     def __delitem__(self, key):
         del self._data[key]
 
+    @staticmethod
+    def to_checkpoint(context):
+        """Serialize a context, or ``None``, for `Package.checkpoint`."""
+        if context is None:
+            return ""
+        return json.dumps(dict(context), default=str)
+
+    @classmethod
+    def from_checkpoint(cls, value):
+        """Deserialize a context serialized by `to_checkpoint`.
+
+        Raises ``ValueError`` if the value can't be parsed.
+        """
+        if not value:
+            return None
+        items = json.loads(value)
+        if not isinstance(items, dict):
+            raise ValueError(f"Expected an object, got {value!r}")
+        return cls(*items.items())
+
     @classmethod
     @auto_close_old_connections()
     def load_from_db(cls, uuid):
@@ -386,6 +827,26 @@ class PackageNotFoundError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class PackageState:
+    """Live processing state of a package.
+
+    It's kept in memory so the status of active packages can be reported
+    without querying the database. Instances are immutable: the package swaps
+    in an updated copy on every change so readers in other threads always see
+    a consistent record without taking a lock.
+    """
+
+    started_at: Optional[datetime.datetime] = None
+    link_id: Optional[str] = None
+    job_id: Optional[UUID] = None
+    job_name: Optional[str] = None
+    job_started_at: Optional[datetime.datetime] = None
+    tasks_submitted: int = 0
+    tasks_completed: int = 0
+    tasks_failed: int = 0
+
+
 @dataclass
 class PackageStatus:
     status: Optional[int] = None
@@ -393,64 +854,40 @@ class PackageStatus:
     jobs: list = field(default_factory=list)
 
 
-@auto_close_old_connections()
-def get_package_status(package_queue, package_id: str) -> PackageStatus:
-    try:
-        sip = models.SIP.objects.get(pk=package_id)
-    except models.SIP.DoesNotExist:
-        raise PackageNotFoundError
+def _status_from_job(microservicegroup, jobtype):
+    """Infer the final status of a package from its last job, or return
+    ``None`` if it can't be determined.
+    """
+    if "failed" in microservicegroup.lower():
+        return models.PackageRun.STATUS_FAILED
+    if "reject" in microservicegroup.lower():
+        return models.PackageRun.STATUS_REJECTED
+    if jobtype == "a3m - Store AIP":
+        return models.PackageRun.STATUS_COMPLETE
+    return None
 
-    def get_latest_job(unit_id):
-        return (
-            models.Job.objects.filter(sipuuid=unit_id)
-            .order_by("-createdtime", "-createdtimedec")
-            .first()
-        )
 
+@auto_close_old_connections()
+def get_package_status(package_queue, package_id: str) -> PackageStatus:
+    # Active packages are answered from their live state, see `PackageState`.
     package = package_queue.active_packages.get(package_id)
-    if package:
-        # Reminder: package.subid can be in Transfer or Ingest.
-        job = get_latest_job(package.subid)
+    if package is not None:
         return PackageStatus(
             status=transfer_service_api.request_response_pb2.PACKAGE_STATUS_PROCESSING,
-            job=job.jobtype if job else None,
+            job=package.state.job_name,
         )
 
-    # A3M-TODO: persist package-workflow status!
-    # It'd be much easier if a workflow instance could keep the package
-    # model(s) up to date.
-
-    # We have an inactive package, look up the status in the database.
-    job = get_latest_job(package_id)
-
-    # It must be an error during Transfer when Ingest activity not recorded.
-    if not job:
-        transfer_id = sip.transfer_id
-        if transfer_id is None:
-            raise Exception(
-                "Package status cannot be determined: transfer_id is undefined"
-            )
-        job = get_latest_job(sip.transfer_id)
-        if job is None:
-            return PackageStatus(
-                status=transfer_service_api.request_response_pb2.PACKAGE_STATUS_PROCESSING
-            )
-
-    if "failed" in job.microservicegroup.lower():
-        status = transfer_service_api.request_response_pb2.PACKAGE_STATUS_FAILED
-    elif "reject" in job.microservicegroup.lower():
-        status = transfer_service_api.request_response_pb2.PACKAGE_STATUS_REJECTED
-    elif job.jobtype == "a3m - Store AIP":
-        status = transfer_service_api.request_response_pb2.PACKAGE_STATUS_COMPLETE
-    else:
-        raise Exception(
-            f"Package status cannot be determined (job.currentstep={job.currentstep}, job.type={job.jobtype}, job.microservicegroup={job.microservicegroup})"
-        )
+    try:
+        run = models.PackageRun.objects.get(pk=package_id)
+    except models.PackageRun.DoesNotExist:
+        raise PackageNotFoundError
 
-    package_status = PackageStatus(status=status, job=job.microservicegroup)
+    package_status = PackageStatus(status=run.status, job=run.currentgroup or None)
+    if run.status == models.PackageRun.STATUS_PROCESSING:
+        return package_status
 
     for item in (
-        models.Job.objects.filter(sipuuid__in=(sip.pk, sip.transfer_id))
+        models.Job.objects.filter(sipuuid__in=(run.sipuuid, run.transferuuid))
         .order_by("createdtime")
         .values(
             "jobuuid",
@@ -477,3 +914,33 @@ def get_package_status(package_queue, package_id: str) -> PackageStatus:
         )
 
     return package_status
+
+
+@auto_close_old_connections()
+def get_package_statuses(package_queue, package_ids) -> dict:
+    """Return the status of many packages, keyed by package id.
+
+    Unlike `get_package_status`, the jobs of the packages are not included
+    and inactive packages are all looked up with a single query. Ids that
+    don't match any package are left out of the result.
+    """
+    statuses = {}
+    inactive_ids = []
+    for package_id in package_ids:
+        package = package_queue.active_packages.get(package_id)
+        if package is None:
+            inactive_ids.append(package_id)
+            continue
+        statuses[package_id] = PackageStatus(
+            status=transfer_service_api.request_response_pb2.PACKAGE_STATUS_PROCESSING,
+            job=package.state.job_name,
+        )
+    if not inactive_ids:
+        return statuses
+
+    for sip_id, status, group in models.PackageRun.objects.filter(
+        pk__in=inactive_ids
+    ).values_list("sipuuid", "status", "currentgroup"):
+        statuses[sip_id] = PackageStatus(status=status, job=group or None)
+
+    return statuses
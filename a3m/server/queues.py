@@ -1,25 +1,100 @@
 """
 The PackageQueue class handles job queueing, as it relates to packages.
 """
+import asyncio
+import collections
 import functools
 import logging
 import queue
 import threading
-import uuid
+import time
 
 from django.conf import settings
 
 from a3m.server import metrics
+from a3m.server.admission import create_admission_queue
+from a3m.server.events import package_events
 
 
 logger = logging.getLogger(__name__)
 
 
+class QueueFullError(Exception):
+    """No more packages can be queued.
+
+    ``retry_after`` is the number of seconds after which the client may try
+    again.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many queued packages, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ActivePackages:
+    """Registry of the packages that are being processed.
+
+    The registry is read on every scheduled job and on every status request,
+    but it only changes when a package is admitted or completed. Reads don't
+    take any lock: writers copy the mapping, update the copy and swap it in,
+    so readers always see a consistent snapshot.
+
+    Packages are keyed by the string form of their UUID.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._packages = {}  # package uuid: Package
+
+    @staticmethod
+    def _key(package_uuid):
+        return str(package_uuid)
+
+    def add(self, package):
+        """Register a package, return ``False`` if it already was."""
+        key = self._key(package.uuid)
+        with self._lock:
+            if key in self._packages:
+                return False
+            packages = self._packages.copy()
+            packages[key] = package
+            self._packages = packages
+        return True
+
+    def remove(self, package):
+        """Unregister a package, return ``False`` if it wasn't registered."""
+        key = self._key(package.uuid)
+        with self._lock:
+            if key not in self._packages:
+                return False
+            packages = self._packages.copy()
+            del packages[key]
+            self._packages = packages
+        return True
+
+    def get(self, package_uuid, default=None):
+        return self._packages.get(self._key(package_uuid), default)
+
+    def values(self):
+        return self._packages.values()
+
+    def __contains__(self, package_uuid):
+        return self._key(package_uuid) in self._packages
+
+    def __len__(self):
+        return len(self._packages)
+
+    def __iter__(self):
+        return iter(self._packages)
+
+
 class PackageQueue:
     """Package queue.
 
     This queue throttles `Job` objects belonging to packages, so that at most
-    `CONCURRENT_PACKAGES` are active at any one time.
+    `CONCURRENT_PACKAGES` are active at any one time. The order in which queued
+    packages are admitted is given by the admission policy, see
+    `a3m.server.admission`.
 
     It also tracks any jobs waiting for decisions in memory. This is a bit of
     a separate concern from package queuing and could be isolated in future.
@@ -52,7 +127,11 @@ class PackageQueue:
     """
 
     # An arbitrary, large value, so we don't accept infinite packages.
-    MAX_QUEUED_PACKAGES = 4096
+    MAX_QUEUED_PACKAGES = settings.MAX_QUEUED_PACKAGES
+
+    # Seconds suggested to clients before retrying when the queue is full and
+    # we don't know yet how often packages are admitted.
+    DEFAULT_RETRY_AFTER = 60
 
     def __init__(
         self,
@@ -60,21 +139,31 @@ class PackageQueue:
         shutdown_event=None,
         max_concurrent_packages=settings.CONCURRENT_PACKAGES,
         max_queued_packages=MAX_QUEUED_PACKAGES,
+        admission_policy=settings.ADMISSION_POLICY,
         debug=False,
     ):
         self.executor = executor
         self.max_concurrent_packages = max_concurrent_packages
+        self.max_queued_packages = max_queued_packages
         self.debug = debug
 
         if shutdown_event is None:
             shutdown_event = threading.Event()
         self.shutdown_event = shutdown_event
 
-        self.active_package_lock = threading.Lock()
-        self.active_packages = {}  # package uuid: Package
+        self.active_packages = ActivePackages()
+
+        self.admission_times = collections.deque(maxlen=16)
 
         self.job_queue = queue.Queue(maxsize=max_concurrent_packages)
-        self.queue = queue.Queue(maxsize=max_queued_packages)
+        # Packages waiting for admission are bounded by `check_capacity`,
+        # which counts the submissions recorded in the database, so queueing a
+        # package never fails, e.g. when packages are queued again on startup.
+        self.queue = create_admission_queue(
+            admission_policy, submitter_weights=settings.SUBMITTER_WEIGHTS
+        )
+        # Held while submissions are counted and recorded, see `check_capacity`.
+        self.submission_lock = threading.Lock()
 
         if self.debug:
             logger.debug(
@@ -82,6 +171,28 @@ class PackageQueue:
                 self.max_concurrent_packages,
             )
 
+    def check_capacity(self, queued_packages):
+        """Raise `QueueFullError` unless there is room for another package,
+        given the number of packages waiting for admission.
+
+        Callers hold ``submission_lock`` from counting the packages waiting
+        until the new ones are recorded, so concurrent submissions can't
+        exceed the limit together.
+        """
+        if queued_packages >= self.max_queued_packages:
+            raise QueueFullError(self.retry_after())
+
+    def retry_after(self):
+        """Estimate how many seconds it will take to admit the next package,
+        using the average time between recent admissions.
+        """
+        if len(self.admission_times) < 2:
+            return self.DEFAULT_RETRY_AFTER
+        interval = (self.admission_times[-1] - self.admission_times[0]) / (
+            len(self.admission_times) - 1
+        )
+        return max(1, min(3600, int(interval)))
+
     def schedule_job(self, job):
         """Add a job to the queue.
 
@@ -94,29 +205,27 @@ class PackageQueue:
 
         # The most common case is an already active package is scheduled
         package = job.package
-        with self.active_package_lock:
-            if package.uuid in self.active_packages:
-                # If there's no slot available, block until ready
-                self.job_queue.put(job, block=True)
-                metrics.job_queue_length_gauge.inc()
-                return
+        if package.uuid in self.active_packages:
+            # If there's no slot available, block until ready
+            self.job_queue.put(job, block=True)
+            metrics.job_queue_length_gauge.inc()
+            return
 
-            # Otherwise, we need to queue the package
-            active_package_count = len(self.active_packages)
+        # Otherwise, we need to queue the package
+        active_package_count = len(self.active_packages)
 
         self._put_package_nowait(package, job)
 
         if self.debug:
-            with self.active_package_lock:
-                logger.debug(
-                    "Active packages are: %s",
-                    ", ".join(
-                        [
-                            repr(active_package)
-                            for active_package in self.active_packages.values()
-                        ]
-                    ),
-                )
+            logger.debug(
+                "Active packages are: %s",
+                ", ".join(
+                    [
+                        repr(active_package)
+                        for active_package in self.active_packages.values()
+                    ]
+                ),
+            )
             logger.debug(
                 "Scheduled job %s (%s %s). Current queue size: %s",
                 job.uuid,
@@ -169,7 +278,7 @@ class PackageQueue:
         metrics.active_jobs_gauge.inc()
 
         result = self.executor.submit(job.run)
-        result.add_done_callback(self._job_completed_callback)
+        result.add_done_callback(functools.partial(self._job_completed_callback, job))
 
         if job.link.is_terminal:
             package_done_callback = functools.partial(
@@ -191,6 +300,8 @@ class PackageQueue:
         job in the chain. This function is called by an executor on completion
         of a Job.
         """
+        if future.exception() is not None:
+            return  # See `_job_completed_callback`.
         if future.result() is not None:
             logger.warning(
                 "Unexpectedly received another job on package completion. "
@@ -202,7 +313,7 @@ class PackageQueue:
         self.deactivate_package(package)
         self.queue_next_job()
 
-    def _job_completed_callback(self, future):
+    def _job_completed_callback(self, job, future):
         """Schedule the next job in the chain.
 
         Retrieve the next job from the result from the previous job. If there is
@@ -210,12 +321,28 @@ class PackageQueue:
         called by an executor on completion of a Job.
         """
         metrics.active_jobs_gauge.dec()
-        next_job = future.result()
+        try:
+            next_job = future.result()
+        except Exception:
+            logger.exception("Error running job %s", job.uuid)
+            self.package_failed(job.package)
+            return
 
         if not next_job:
             return
         self.schedule_job(next_job)
 
+    def package_failed(self, package):
+        """End the workflow of a package after one of its jobs raised and
+        admit the next package.
+        """
+        try:
+            package.mark_failed()
+        except Exception:
+            logger.exception("Error marking package %s as failed", package.uuid)
+        self.deactivate_package(package)
+        self.queue_next_job()
+
     def _put_package_nowait(self, package, job):
         """Queue a package and job for later processing."""
         self.queue.put_nowait(job)
@@ -223,7 +350,7 @@ class PackageQueue:
 
     def _get_package_job_nowait(self):
         """Return a waiting job for an inactive package.
-        Prioritized by package type.
+        Prioritized by the admission policy.
         """
         try:
             job = self.queue.get_nowait()
@@ -237,40 +364,31 @@ class PackageQueue:
 
     def activate_package(self, package):
         """Mark a package as active, allowing jobs related to it to process."""
-        with self.active_package_lock:
-            if package.uuid not in self.active_packages:
-                self.active_packages[package.uuid] = package
-                metrics.active_package_gauge.inc()
-                if self.debug:
-                    logger.debug("Marked package %s as active", package.uuid)
-            else:
-                logger.warning(
-                    "Package %s was activated, but was already active", package.uuid
-                )
+        if self.active_packages.add(package):
+            metrics.active_package_gauge.inc()
+            if self.debug:
+                logger.debug("Marked package %s as active", package.uuid)
+        else:
+            logger.warning(
+                "Package %s was activated, but was already active", package.uuid
+            )
 
     def deactivate_package(self, package):
         """Mark a package as inactive."""
-        with self.active_package_lock:
-            if package.uuid in self.active_packages:
-                del self.active_packages[package.uuid]
-                metrics.active_package_gauge.dec()
-                if self.debug:
-                    logger.debug("Marked package %s as inactive", package.uuid)
-            else:
-                logger.warning(
-                    "Package %s was deactivated, but was not marked active",
-                    package.uuid,
-                )
+        if self.active_packages.remove(package):
+            package_events.package_done(package.uuid)
+            metrics.active_package_gauge.dec()
+            if self.debug:
+                logger.debug("Marked package %s as inactive", package.uuid)
+        else:
+            logger.warning(
+                "Package %s was deactivated, but was not marked active",
+                package.uuid,
+            )
 
     def is_package_active(self, package_uuid):
         """Determine whether a package is still active."""
-        if not isinstance(package_uuid, uuid.UUID):
-            package_uuid = uuid.UUID(package_uuid)
-        # TODO: use timeout or rwlock
-        with self.active_package_lock:
-            if package_uuid in self.active_packages:
-                return True
-        return False
+        return package_uuid in self.active_packages
 
     def queue_next_job(self):
         """Load another job into the active job queue.
@@ -284,6 +402,7 @@ class PackageQueue:
 
         package = job.package
         self.activate_package(package)
+        self.admission_times.append(time.monotonic())
         self.job_queue.put_nowait(job)
         metrics.job_queue_length_gauge.inc()
 
@@ -295,3 +414,81 @@ class PackageQueue:
                 package.uuid,
                 self.queue.qsize(),
             )
+
+
+class AsyncPackageQueue(PackageQueue):
+    """Package queue that runs jobs as coroutines on an asyncio event loop.
+
+    Packages are admitted exactly like in `PackageQueue`, but jobs are run with
+    `Job.run_async` so they only hold a thread of the executor while they do
+    blocking work (e.g. database queries), not while they wait for their
+    tasks. The number of packages in flight is no longer bound by the size of
+    the executor.
+
+    `work_async` must be awaited from the event loop, everything else can be
+    called from any thread.
+    """
+
+    def __init__(self, executor, *args, **kwargs):
+        super().__init__(executor, *args, **kwargs)
+
+        self.running_jobs = set()  # asyncio.Task
+
+    async def work_async(self):
+        """Process the package queue until `stop` is called."""
+        loop = asyncio.get_running_loop()
+        while not self.shutdown_event.is_set():
+            # Using a timeout here allows shutdown signals to fire
+            try:
+                job = await loop.run_in_executor(None, self.job_queue.get, True, 1.0)
+            except queue.Empty:
+                continue
+            self.process_job_async(job)
+
+        for running_job in self.running_jobs:
+            running_job.cancel()
+        await asyncio.gather(*self.running_jobs, return_exceptions=True)
+
+    def process_job_async(self, job):
+        """Schedule the job as a task of the running event loop."""
+        metrics.job_queue_length_gauge.dec()
+        metrics.active_jobs_gauge.inc()
+
+        running_job = asyncio.get_running_loop().create_task(self._run_job(job))
+        self.running_jobs.add(running_job)
+        running_job.add_done_callback(self.running_jobs.discard)
+
+        return running_job
+
+    async def _run_job(self, job):
+        """Run the job and schedule the next one, like the callbacks attached
+        by `process_one_job` do.
+        """
+        loop = asyncio.get_running_loop()
+        failed = False
+        try:
+            next_job = await job.run_async(self.executor)
+        except Exception:
+            logger.exception("Error running job %s", job.uuid)
+            failed = True
+        finally:
+            metrics.active_jobs_gauge.dec()
+
+        if failed:
+            await loop.run_in_executor(self.executor, self.package_failed, job.package)
+            return
+
+        if next_job is not None:
+            # Scheduling blocks when the active job queue is full.
+            await loop.run_in_executor(self.executor, self.schedule_job, next_job)
+
+        if job.link.is_terminal:
+            if next_job is not None:
+                logger.warning(
+                    "Unexpectedly received another job on package completion. "
+                    "Please verify the value of `end` in the workflow. Link %s.",
+                    job.link.id,
+                )
+                return
+            self.deactivate_package(job.package)
+            await loop.run_in_executor(self.executor, self.queue_next_job)
@@ -3,6 +3,7 @@ from typing import Callable
 from typing import Optional
 
 import tenacity
+from google.protobuf import field_mask_pb2
 from grpc import Channel
 from grpc import RpcError
 
@@ -59,9 +60,11 @@ class Client:
         url: str,
         name: str,
         config: transfer_service_api.request_response_pb2.ProcessingConfig = None,
+        priority: transfer_service_api.request_response_pb2.PackagePriority = None,
+        submitter: str = None,
     ):
         request = transfer_service_api.request_response_pb2.SubmitRequest(
-            name=name, url=url, config=config
+            name=name, url=url, config=config, priority=priority, submitter=submitter
         )
         return self._unary_call(self.transfer_stub.Submit, request)
 
@@ -69,6 +72,20 @@ class Client:
         request = transfer_service_api.request_response_pb2.ReadRequest(id=package_id)
         return self._unary_call(self.transfer_stub.Read, request)
 
+    def batch_submit(
+        self, packages: list[transfer_service_api.request_response_pb2.SubmitRequest]
+    ):
+        request = transfer_service_api.request_response_pb2.BatchSubmitRequest(
+            packages=packages
+        )
+        return self._unary_call(self.transfer_stub.BatchSubmit, request)
+
+    def batch_read(self, package_ids: list[str]):
+        request = transfer_service_api.request_response_pb2.BatchReadRequest(
+            ids=package_ids
+        )
+        return self._unary_call(self.transfer_stub.BatchRead, request)
+
     def wait_until_complete(
         self, package_id: str, spin_cb: Callable = None
     ) -> transfer_service_api.request_response_pb2.ReadResponse:
@@ -97,8 +114,78 @@ class Client:
 
         return _poll()
 
-    def list_tasks(self, job_id: str):
+    def watch(self, package_id: str):
+        """Stream the processing events of a package until it's done.
+
+        The stream isn't bound by ``rpc_timeout``, processing a package can
+        take much longer than a single call.
+        """
+        request = transfer_service_api.request_response_pb2.WatchRequest(id=package_id)
+        logger.debug("RPC call Watch with request: %r", request)
+        return self.transfer_stub.Watch(
+            request,
+            metadata=Client.version_metadata(),
+            wait_for_ready=self.wait_for_ready,
+        )
+
+    def watch_until_complete(
+        self, package_id: str, event_cb: Callable = None
+    ) -> transfer_service_api.request_response_pb2.WatchResponse:
+        """Blocks until processing of a package has completed.
+
+        Like `wait_until_complete` but the server pushes the progress of the
+        package instead of being polled. ``event_cb`` is called with every
+        event received, the last one is returned.
+        """
+        resp = None
+        try:
+            for resp in self.watch(package_id):
+                if event_cb is not None:
+                    event_cb(resp)
+        except RpcError as e:
+            logger.warning("RPC call Watch got error %s", e)
+            raise
+        return resp
+
+    def list_tasks(
+        self,
+        job_id: str,
+        page_size: int = None,
+        page_token: str = None,
+        fields: list[str] = None,
+    ):
+        """List a page of the tasks of a job.
+
+        ``fields`` limits the fields of the tasks returned, e.g. to leave out
+        ``stdout`` and ``stderr``. Use the ``next_page_token`` of the response
+        to list the following page.
+        """
         request = transfer_service_api.request_response_pb2.ListTasksRequest(
-            job_id=job_id
+            job_id=job_id,
+            page_size=page_size,
+            page_token=page_token,
+            read_mask=field_mask_pb2.FieldMask(paths=fields) if fields else None,
         )
         return self._unary_call(self.transfer_stub.ListTasks, request)
+
+    def stream_tasks(self, job_id: str, fields: list[str] = None):
+        """Iterate over all the tasks of a job, see `list_tasks`.
+
+        Tasks are streamed by the server one page at a time. The stream isn't
+        bound by ``rpc_timeout``.
+        """
+        request = transfer_service_api.request_response_pb2.ListTasksRequest(
+            job_id=job_id,
+            read_mask=field_mask_pb2.FieldMask(paths=fields) if fields else None,
+        )
+        logger.debug("RPC call StreamTasks with request: %r", request)
+        try:
+            for resp in self.transfer_stub.StreamTasks(
+                request,
+                metadata=Client.version_metadata(),
+                wait_for_ready=self.wait_for_ready,
+            ):
+                yield from resp.tasks
+        except RpcError as e:
+            logger.warning("RPC call StreamTasks got error %s", e)
+            raise
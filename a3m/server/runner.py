@@ -12,13 +12,15 @@ structure, and default processing configs added.
 as they are presumed to have been the result of a shutdown while processing.
 6. If Prometheus metrics are enabled, an thread is started to serve metrics for
 scraping.
-7. A `PackageQueue` (see the `queues` module) is initialized.
+7. A `PackageQueue` (see the `queues` module) is initialized, or an
+`AsyncPackageQueue` running on an event loop when ENGINE_MODE is "asyncio".
 8. A configured number (default 4) of RPCServer (see the `rpc_server` module)
 threads are started to handle gearman "RPC" requests from the dashboard.
 9. A watched directory thread is started to observe changes in any of the
 watched dirs as set in the workflow.
 10. The `PackageQueue.work` processing loop is started on the main thread.
 """
+import asyncio
 import concurrent.futures
 import enum
 import logging
@@ -26,6 +28,7 @@ import threading
 from typing import Optional
 
 import grpc
+from django.conf import settings
 from grpc_reflection.v1alpha import reflection
 
 from a3m.api.transferservice import v1beta1 as transfer_service_api
@@ -33,10 +36,13 @@ from a3m.server import metrics
 from a3m.server import shared_dirs
 from a3m.server.db import migrate
 from a3m.server.jobs import Job
+from a3m.server.packages import Package
+from a3m.server.queues import AsyncPackageQueue
 from a3m.server.queues import PackageQueue
 from a3m.server.tasks import Task
 from a3m.server.tasks.backends import get_task_backend
 from a3m.server.tasks.backends import TaskBackend
+from a3m.server.transfer_service import AsyncTransferService
 from a3m.server.transfer_service import TransferService
 from a3m.server.workflow import load_default_workflow
 from a3m.server.workflow import Workflow
@@ -60,6 +66,9 @@ class Server:
     customized as needed.
     """
 
+    queue_class = PackageQueue
+    transfer_service_class = TransferService
+
     def __init__(
         self,
         bind_address: str,
@@ -81,20 +90,23 @@ class Server:
         self.workflow = workflow
         self.queue_executor = queue_executor
         self.queue_shutdown_event = threading.Event()
-        self.queue = PackageQueue(
+        self.queue = self.queue_class(
             self.queue_executor,
             self.queue_shutdown_event,
             max_concurrent_packages=max_concurrent_packages,
             debug=debug,
         )
         self.grpc_executor = grpc_executor
-        self.grpc_server = grpc.server(grpc_executor)
+        self.grpc_server = self._create_grpc_server(grpc_executor)
         self.grpc_port = self.grpc_server.add_insecure_port(bind_address)
 
         self._mount_services()
 
+    def _create_grpc_server(self, grpc_executor):
+        return grpc.server(grpc_executor)
+
     def _mount_services(self):
-        transfer_service = TransferService(
+        transfer_service = self.transfer_service_class(
             self.workflow, self.queue, self.queue_executor
         )
         transfer_service_api.service_pb2_grpc.add_TransferServiceServicer_to_server(
@@ -118,9 +130,17 @@ class Server:
 
             self.stage = ServerStage.STARTED
 
+            self._requeue_packages()
             threading.Thread(target=self.queue.work).start()
             threading.Thread(target=self.grpc_server.start).start()
 
+    def _requeue_packages(self):
+        """Resume the packages that were being processed when the server last
+        stopped and queue the ones that were still waiting for admission.
+        """
+        Package.resume_interrupted(self.queue, self.workflow)
+        Package.requeue_submissions(self.queue, self.queue_executor, self.workflow)
+
     def wait_for_termination(self, timeout=None):
         """Blocks current thread until the server stops."""
         while not self.termination_event.is_set():
@@ -141,7 +161,7 @@ class Server:
             def _stop():
                 logger.info("Shutting down...")
 
-                self.grpc_server.stop(grace)
+                self._stop_grpc_server(grace)
                 self.queue_shutdown_event.set()
                 self.queue.wait_for_termination()
                 get_task_backend().shutdown(wait=False)
@@ -155,6 +175,66 @@ class Server:
             shutdown_event.wait()
             return shutdown_event
 
+    def _stop_grpc_server(self, grace):
+        self.grpc_server.stop(grace)
+
+
+class AsyncServer(Server):
+    """a3m server running on an asyncio event loop.
+
+    The workflow engine (see `AsyncPackageQueue`) and the gRPC API server
+    (``grpc.aio``) share a single event loop, which runs in its own thread.
+    Jobs don't hold a thread while they wait for their tasks, so many more
+    packages can be in flight with the same number of threads. Handlers of
+    the API and the blocking parts of jobs still run in their thread pools.
+    """
+
+    queue_class = AsyncPackageQueue
+    transfer_service_class = AsyncTransferService
+
+    def __init__(self, *args, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        super().__init__(*args, **kwargs)
+
+    def _create_grpc_server(self, grpc_executor):
+        # The server binds to the current event loop when it's created.
+        asyncio.set_event_loop(self.loop)
+        try:
+            return grpc.aio.server(migration_thread_pool=grpc_executor)
+        finally:
+            asyncio.set_event_loop(None)
+
+    def start(self):
+        """Starts this Server.
+
+        This method may only be called once. (i.e. it is not idempotent).
+        """
+        with self.lock:
+            if self.stage is not ServerStage.STOPPED:
+                raise ValueError("Cannot start already-started server!")
+
+            self.stage = ServerStage.STARTED
+
+            self._requeue_packages()
+            get_task_backend().attach_event_loop(self.loop)
+            threading.Thread(target=self._run_loop).start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.loop.close()
+
+    async def _serve(self):
+        await self.grpc_server.start()
+        await self.queue.work_async()
+
+    def _stop_grpc_server(self, grace):
+        asyncio.run_coroutine_threadsafe(
+            self.grpc_server.stop(grace), self.loop
+        ).result()
+
 
 def create_server(
     bind_address,
@@ -182,7 +262,9 @@ def create_server(
     metrics.init_labels(workflow)
     metrics.start_prometheus_server()
 
-    return Server(
+    server_class = AsyncServer if settings.ENGINE_MODE == "asyncio" else Server
+
+    return server_class(
         bind_address,
         server_credentials,
         workflow,
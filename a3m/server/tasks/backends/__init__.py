@@ -1,26 +1,37 @@
 """
 Handle offloading of Task objects to MCP Client for processing.
 """
+from django.conf import settings
+
 from a3m.server.tasks.backends.base import TaskBackend
 from a3m.server.tasks.backends.pool_backend import PoolTaskBackend
+from a3m.server.tasks.backends.process_pool_backend import ProcessPoolTaskBackend
 
 
-# This could be a configuration setting.
-DEFAULT_BACKEND = PoolTaskBackend
-
 # Backend is shared across all threads.
 backend_global = None
 
 
 def get_task_backend():
-    """Return the backend for processing tasks."""
-    if DEFAULT_BACKEND == PoolTaskBackend:
-        global backend_global
-        if backend_global is None:
+    """Return the backend for processing tasks.
+
+    Tasks are processed in worker processes when ``WORKER_PROCESSES`` is
+    enabled, otherwise they're processed in a thread of the server process.
+    """
+    global backend_global
+    if backend_global is None:
+        if settings.WORKER_PROCESSES > 0:
+            backend_global = ProcessPoolTaskBackend(
+                settings.WORKER_PROCESSES, settings.WORKER_MAX_BATCHES
+            )
+        else:
             backend_global = PoolTaskBackend()
-        return backend_global
-
-    raise RuntimeError("Unsupported task backend")
+    return backend_global
 
 
-__all__ = ("PoolTaskBackend", "TaskBackend", "get_task_backend")
+__all__ = (
+    "PoolTaskBackend",
+    "ProcessPoolTaskBackend",
+    "TaskBackend",
+    "get_task_backend",
+)
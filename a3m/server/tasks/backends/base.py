@@ -1,4 +1,5 @@
 import abc
+import asyncio
 
 from django.conf import settings
 
@@ -14,6 +15,9 @@ class TaskBackend(metaclass=abc.ABCMeta):
     # hurt throughput.  So the trick is to set it juuuust right.
     TASK_BATCH_SIZE = settings.BATCH_SIZE
 
+    # Event loop of the workflow engine when it runs in asyncio mode.
+    loop = None
+
     @abc.abstractmethod
     def submit_task(self, job, task):
         """Submit a task as part of the job given, for offline processing."""
@@ -30,5 +34,25 @@ class TaskBackend(metaclass=abc.ABCMeta):
         they were submitted.
         """
 
+    async def wait_for_results_async(self, job):
+        """Asynchronous generator version of `wait_for_results`, used when the
+        workflow engine runs on an asyncio event loop.
+
+        This implementation consumes `wait_for_results` from a thread of the
+        default executor of the loop; backends should override it if they can
+        wait for results without blocking a thread.
+        """
+        loop = asyncio.get_running_loop()
+        results = self.wait_for_results(job)
+        while True:
+            task = await loop.run_in_executor(None, next, results, None)
+            if task is None:
+                return
+            yield task
+
+    def attach_event_loop(self, loop):
+        """Use ``loop`` to deliver results to `wait_for_results_async`."""
+        self.loop = loop
+
     def shutdown(self, wait=True):
         """Shut down the backend."""
@@ -0,0 +1,74 @@
+"""
+Adaptive sizing of task batches.
+
+Client scripts have very different costs: updating a row in the database takes
+a few milliseconds per file while normalizing a video can take minutes. A single
+batch size is either too small for the former, where the per-batch overhead
+dominates, or too large for the latter, where one batch holds a worker for a
+long time while others sit idle.
+
+`BatchSizer` learns how long each script takes per task and sizes its batches so
+they take roughly ``target_time`` seconds to complete.
+"""
+import threading
+
+
+class BatchSizer:
+    """Computes the size of the next batch of a given script.
+
+    Latencies are tracked per script with an exponentially weighted moving
+    average of the time spent per task. Until a script has been observed, or
+    when ``target_time`` is not set, the default batch size is used.
+
+    The time per task is derived from the time the worker spent on whole
+    batches (see `pool_backend.run_batch`), the interval observed by the
+    client's ``task_execution_time_histogram``, rather than from individual
+    tasks. Time spent waiting for a worker isn't included, but the per-batch
+    overhead (e.g. loading the script, updating the task rows) is spread over
+    the tasks of the batch. This is deliberate: the overhead is part of the
+    wall time of a batch, so sizes converge on batches that take
+    ``target_time`` including it, and scripts dominated by their overhead get
+    larger batches.
+
+    Methods on this class are threadsafe.
+    """
+
+    # Upper bound for batch sizes. Larger batches use more memory on both
+    # sides and delay results, with little gain in throughput.
+    MAX_BATCH_SIZE = 1024
+
+    # Weight given to the most recent observation.
+    SMOOTHING = 0.3
+
+    def __init__(self, target_time=None, max_batch_size=MAX_BATCH_SIZE):
+        self.target_time = target_time
+        self.max_batch_size = max_batch_size
+
+        self.lock = threading.Lock()
+        self.task_times = {}  # script name: seconds per task
+
+    def batch_size(self, script_name, default):
+        """Return the number of tasks to put in the next batch."""
+        if not self.target_time:
+            return default
+        with self.lock:
+            task_time = self.task_times.get(script_name)
+        if task_time is None:
+            return default
+        if task_time <= 0:
+            return self.max_batch_size
+
+        return max(1, min(self.max_batch_size, int(self.target_time / task_time)))
+
+    def observe(self, script_name, task_count, duration):
+        """Record that a batch of ``task_count`` tasks took ``duration``
+        seconds to be processed.
+        """
+        if not task_count or duration is None:
+            return
+        task_time = duration / task_count
+        with self.lock:
+            previous = self.task_times.get(script_name)
+            if previous is not None:
+                task_time = self.SMOOTHING * task_time + (1 - self.SMOOTHING) * previous
+            self.task_times[script_name] = task_time
@@ -1,79 +1,245 @@
 """
 Built-in task backend. Submits `Task` objects to a local pool of processes for
 processing, and returns results.
+
+Batches are sent to the client as `TaskBatch` messages, see
+`PoolTaskBatch.serialize`.
+
+Results are sent back through a result channel (a queue) as soon as each task
+is done, followed by a final message once its whole batch has been processed.
+When the workflow engine runs on an asyncio event loop, results are delivered
+to the loop instead, see `AsyncResultChannel`.
 """
+import asyncio
+import collections
 import concurrent
+import datetime
 import logging
+import queue
+import time
 import uuid
 
+from django.conf import settings
+
+from a3m.api.tasks.v1beta1.batch_pb2 import TaskBatch
 from a3m.client.mcp import execute_command
 from a3m.client.metrics import init_counter_labels
 from a3m.server import metrics
 from a3m.server.db import auto_close_old_connections
-from a3m.server.jobs import Job
 from a3m.server.tasks.backends.base import TaskBackend
+from a3m.server.tasks.backends.batching import BatchSizer
+from a3m.server.tasks.backends.scheduling import TaskScheduler
 from a3m.server.tasks.task import Task
 
 
 logger = logging.getLogger(__name__)
 
 
+# Kinds of messages sent through result channels.
+TASK_DONE = "task"
+BATCH_DONE = "batch"
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@auto_close_old_connections()
+def run_batch(job_name: str, batch_payload, result_channel=None):
+    """Execute a batch payload and return its results.
+
+    This is a module-level function so it can be pickled and sent to worker
+    processes, see :class:`ProcessPoolTaskBackend`. The time spent processing
+    the batch is included in the results.
+
+    Task results are also put in ``result_channel`` as soon as they're known.
+    """
+
+    def on_task_result(task_id, task_result):
+        if result_channel is not None:
+            result_channel.put((TASK_DONE, task_id, task_result))
+
+    start = time.monotonic()
+    results = execute_command(job_name, batch_payload, on_task_result)
+    results["duration"] = time.monotonic() - start
+    return results
+
+
 class PoolTaskBatch:
-    def __init__(self):
+    def __init__(self, max_size):
         self.uuid: uuid.UUID = uuid.uuid4()
+        self.max_size = max_size
         self.tasks: list[Task] = []
         self.future = None
 
     def __len__(self):
         return len(self.tasks)
 
-    def serialize_task(self, task: Task):
-        return {
-            "uuid": str(task.uuid),
-            "createdDate": task.start_timestamp.isoformat(" "),
-            "arguments": task.arguments,
-            "wants_output": task.wants_output,
-            "execute": task.execute,
-        }
+    def serialize(self) -> bytes:
+        """Return the tasks of the batch as a serialized `TaskBatch`.
+
+        When all the tasks were rendered from the same template, its split
+        arguments are sent once, with the values that differ per task in
+        columns. Command lines are sent otherwise.
+        """
+        batch = TaskBatch(
+            execute=self.tasks[0].execute,
+            task_ids=b"".join(task.uuid.bytes for task in self.tasks),
+            created_times=[
+                (task.start_timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+                for task in self.tasks
+            ],
+            wants_output=[task.wants_output for task in self.tasks],
+        )
+        if not self._add_arguments(batch):
+            batch.ClearField("arguments")
+            batch.ClearField("columns")
+            batch.command_lines.extend(task.arguments or "" for task in self.tasks)
+        return batch.SerializeToString()
+
+    def _add_arguments(self, batch) -> bool:
+        template = self.tasks[0].arguments_template
+        if template is None or template.argv is None:
+            return False
+        if any(task.arguments_template is not template for task in self.tasks):
+            return False
+
+        columns = {}  # variable: index
+        for literals, variables in template.argv:
+            argument = batch.arguments.add(literals=literals[:1])
+            for variable, literal in zip(variables, literals[1:]):
+                found = [variable in task.context for task in self.tasks]
+                if all(found):
+                    if variable not in columns:
+                        columns[variable] = len(batch.columns)
+                        batch.columns.add(
+                            values=[task.context[variable] for task in self.tasks]
+                        )
+                    argument.variables.add(column=columns[variable])
+                    argument.literals.append(literal)
+                elif any(found):
+                    # The variable would be left as is for some of the tasks.
+                    return False
+                elif variable in template.replacements:
+                    argument.literals[-1] += template.replacements[variable] + literal
+                else:
+                    argument.variables.add(name=variable)
+                    argument.literals.append(literal)
+        return True
 
     def add_task(self, task: Task):
         self.tasks.append(task)
 
-    @auto_close_old_connections()
-    def run(self, job_name: str, batch_payload):
-        result = execute_command(job_name, batch_payload)
-        return self, result
-
-    def submit(self, executor, job):
+    def submit(self, scheduler, job, result_channel):
         # Log tasks to DB, before submitting the batch, as mcpclient then updates them
         Task.bulk_log(self.tasks, job)
 
-        data = {
-            "tasks": {str(task.uuid): self.serialize_task(task) for task in self.tasks}
-        }
-
-        self.future = executor.submit(self.run, job.name, data)
+        self.future = scheduler.submit(
+            job.package.uuid, run_batch, job.name, self.serialize(), result_channel
+        )
+        self.future.add_done_callback(
+            lambda future: result_channel.put((BATCH_DONE, self.uuid, None))
+        )
 
         logger.debug("Submitted pool job %s (%s)", self.uuid, job.name)
 
+    def update_task_result(self, task: Task, task_result) -> bool:
+        """Update a task with its result.
+
+        Returns ``True`` the first time the task is updated, i.e. when it has
+        to be reported as done. The exit code of a task can still change when
+        the final results of the batch are received, e.g. when a client script
+        changes the status of a job after it was reported done. The task is
+        then updated but not reported again.
+        """
+        exit_code = task_result["exitCode"]
+        if task.done:
+            if task.exit_code != exit_code:
+                logger.debug(
+                    "Task %s exit code changed from %s to %s",
+                    task.uuid,
+                    task.exit_code,
+                    exit_code,
+                )
+                task.exit_code = exit_code
+                task.finished_timestamp = task_result.get("finishedTimestamp")
+            return False
+
+        task.exit_code = exit_code
+        task.finished_timestamp = task_result.get("finishedTimestamp")
+        task.stdout = task_result.get("stdout", "")
+        task.stderr = task_result.get("stderr", "")
+        task.write_output()
+        task.done = True
+
+        logger.debug("Task %s finished! Result %s", task.uuid, exit_code)
+
+        return True
+
     def update_task_results(self, results):
         result = results["task_results"]
         for task in self.tasks:
-            task_id = str(task.uuid)
-            task_result = result[task_id]
-            task.exit_code = task_result["exitCode"]
-            task.stdout = task_result.get("stdout", "")
-            task.stderr = task_result.get("stderr", "")
-            task.finished_timestamp = task_result.get("finishedTimestamp")
-            task.write_output()
+            if self.update_task_result(task, result[str(task.uuid)]):
+                yield task
+
 
-            task.done = True
+class AsyncResultChannel:
+    """Result channel consumed from an asyncio event loop.
 
-            logger.debug(
-                "Task %s finished! Result %s", task_id, task_result["exitCode"]
-            )
+    Messages can be put from any thread, they're handed over to the loop so
+    waiting for them doesn't block a thread.
+    """
 
-            yield task
+    def __init__(self, loop):
+        self.loop = loop
+        self.messages = collections.deque()
+        self.waiter = None
+
+    def put(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        self.messages.append(message)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get_async(self):
+        while not self.messages:
+            self.waiter = self.loop.create_future()
+            await self.waiter
+        return self.messages.popleft()
+
+
+class PendingResults:
+    """Tracks the results of the batches submitted for a job."""
+
+    def __init__(self, job, batches, channel, batch_sizer):
+        self.job = job
+        self.channel = channel
+        self.batch_sizer = batch_sizer
+        self.batches = {batch.uuid: batch for batch in batches}
+        self.tasks = {
+            str(task.uuid): (batch, task) for batch in batches for task in batch.tasks
+        }
+
+    @property
+    def done(self):
+        return not self.batches
+
+    def handle(self, message):
+        """Process a message from the result channel and yield the tasks that
+        were updated.
+        """
+        kind, key, task_result = message
+        if kind == TASK_DONE:
+            batch, task = self.tasks[key]
+            if batch.update_task_result(task, task_result):
+                yield task
+            return
+
+        batch = self.batches.pop(key)
+        results = batch.future.result()
+        self.batch_sizer.observe(self.job.name, len(batch), results.get("duration"))
+        yield from batch.update_task_results(results)
+        metrics.gearman_active_jobs_gauge.dec()
 
 
 class PoolTaskBackend(TaskBackend):
@@ -81,33 +247,72 @@ class PoolTaskBackend(TaskBackend):
 
     Tasks are batched into BATCH_SIZE groups (default 128) and sent to the
     client. This adds some complexity but saves a lot of overhead.
+
+    When BATCH_TARGET_TIME is set, batch sizes are adapted per script so each
+    batch takes about that many seconds to process, see `BatchSizer`.
+
+    Batches from all active packages share the workers of the executor, they
+    are interleaved by a `TaskScheduler` so no package can monopolize them.
     """
 
     def __init__(self):
         init_counter_labels()
 
-        # Having multiple threads would be equivalent to deploying multiple
-        # MCPClient instances in Archivematica which is known to be problematic.
-        # Let's stick to one for now.
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.batch_sizer = BatchSizer(settings.BATCH_TARGET_TIME)
+
+        self.executor = self._create_executor()
+        self.scheduler = TaskScheduler(
+            self.executor, self.worker_slots, settings.PACKAGE_TASK_QUOTA
+        )
 
         self.current_task_batches = {}  # job_uuid: PoolTaskBatch
         self.pending_jobs = {}  # job_uuid: List[PoolTaskBatch]
+        self.result_channels = {}  # job_uuid: Queue
 
-    def submit_task(self, job: Job, task: Task):
-        current_task_batch = self._get_current_task_batch(job.uuid)
+    def submit_task(self, job, task: Task):
+        current_task_batch = self._get_current_task_batch(job)
         if len(current_task_batch) == 0:
             metrics.gearman_pending_jobs_gauge.inc()
 
         current_task_batch.add_task(task)
 
-        # If we've hit TASK_BATCH_SIZE, send the batch to gearman
-        if (len(current_task_batch) % self.TASK_BATCH_SIZE) == 0:
+        # If the batch is full, send it to the pool
+        if len(current_task_batch) >= current_task_batch.max_size:
             self._submit_batch(job, current_task_batch)
 
     def wait_for_results(self, job):
+        results = self._collect_results(job)
+        if results is None:
+            return
+
+        # Yield tasks as they're done, until all batches have completed.
+        while not results.done:
+            yield from results.handle(results.channel.get())
+
+        self._clear_results(job)
+
+    async def wait_for_results_async(self, job):
+        loop = asyncio.get_running_loop()
+        # Submitting the last batch logs its tasks to the database.
+        results = await loop.run_in_executor(None, self._collect_results, job)
+        if results is None:
+            return
+
+        while not results.done:
+            if isinstance(results.channel, AsyncResultChannel):
+                message = await results.channel.get_async()
+            else:
+                # Channels shared with other processes can't notify the loop.
+                message = await loop.run_in_executor(None, results.channel.get)
+            for task in results.handle(message):
+                yield task
+
+        self._clear_results(job)
+
+    def _collect_results(self, job):
+        """Submit the last batch of the job and return a `PendingResults`."""
         # Check if we have anything for this job that hasn't been submitted
-        current_task_batch = self._get_current_task_batch(job.uuid)
+        current_task_batch = self._get_current_task_batch(job)
         if len(current_task_batch) > 0:
             self._submit_batch(job, current_task_batch)
 
@@ -115,30 +320,49 @@ class PoolTaskBackend(TaskBackend):
             pending_batches = self.pending_jobs[job.uuid]
         except KeyError:
             # No batches submitted
-            return
+            return None
 
-        # Wait for all batches to complete.
-        futures = [item.future for item in pending_batches]
-        for future in concurrent.futures.as_completed(futures):
-            batch, results = future.result()
-            yield from batch.update_task_results(results)
-            metrics.gearman_active_jobs_gauge.dec()
+        return PendingResults(
+            job, pending_batches, self.result_channels[job.uuid], self.batch_sizer
+        )
 
+    def _clear_results(self, job):
         # Once we've gotten results for all job tasks, clear the batches
         del self.pending_jobs[job.uuid]
+        del self.result_channels[job.uuid]
 
-    def _get_current_task_batch(self, job_uuid) -> PoolTaskBatch:
+    def _create_executor(self):
+        # Having multiple threads would be equivalent to deploying multiple
+        # MCPClient instances in Archivematica which is known to be problematic.
+        # Let's stick to one for now.
+        return concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def worker_slots(self):
+        """Number of batches that the executor can process at the same time."""
+        return 1
+
+    def _create_result_channel(self):
+        if self.loop is not None:
+            return AsyncResultChannel(self.loop)
+        return queue.Queue()
+
+    def _get_current_task_batch(self, job) -> PoolTaskBatch:
         try:
-            return self.current_task_batches[job_uuid]
+            return self.current_task_batches[job.uuid]
         except KeyError:
-            self.current_task_batches[job_uuid] = PoolTaskBatch()
-            return self.current_task_batches[job_uuid]
+            max_size = self.batch_sizer.batch_size(job.name, self.TASK_BATCH_SIZE)
+            self.current_task_batches[job.uuid] = PoolTaskBatch(max_size)
+            return self.current_task_batches[job.uuid]
 
     def _submit_batch(self, job, task_batch):
         if len(task_batch) == 0:
             return
 
-        task_batch.submit(self.executor, job)
+        if job.uuid not in self.result_channels:
+            self.result_channels[job.uuid] = self._create_result_channel()
+
+        task_batch.submit(self.scheduler, job, self.result_channels[job.uuid])
 
         metrics.gearman_active_jobs_gauge.inc()
         metrics.gearman_pending_jobs_gauge.dec()
@@ -0,0 +1,92 @@
+"""
+Multi-process task backend. Submits `Task` batches to a pool of long-lived
+worker processes, so CPU-bound client scripts can run in parallel without
+contending for the server process.
+"""
+import concurrent.futures
+import logging
+import multiprocessing
+
+from a3m.cli.common import init_django
+from a3m.server.tasks.backends.pool_backend import PoolTaskBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolExecutor:
+    """Executor backed by `multiprocessing.Pool`.
+
+    It mimics the subset of the `concurrent.futures.Executor` interface used by
+    `PoolTaskBackend`. We don't use `ProcessPoolExecutor` because it can't
+    recycle its workers in the Python versions that we support.
+
+    Workers are started with the spawn method because forking a process that
+    runs the gRPC server is not supported. Each worker sets up Django on start
+    and opens its own database connection the first time it needs it.
+    """
+
+    def __init__(self, max_workers, max_batches_per_worker=None):
+        context = multiprocessing.get_context("spawn")
+        self.pool = context.Pool(
+            processes=max_workers,
+            initializer=init_django,
+            maxtasksperchild=max_batches_per_worker or None,
+        )
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self.pool.apply_async(
+            fn,
+            args,
+            callback=future.set_result,
+            error_callback=future.set_exception,
+        )
+        return future
+
+    def shutdown(self, wait=True):
+        self.pool.close()
+        if wait:
+            self.pool.join()
+        else:
+            self.pool.terminate()
+
+
+class ProcessPoolTaskBackend(PoolTaskBackend):
+    """Submits tasks to a pool of worker processes.
+
+    Batches are built exactly like in `PoolTaskBackend`, but up to
+    ``max_workers`` of them are processed at the same time. Workers are
+    replaced after processing ``max_batches_per_worker`` batches, which keeps
+    memory leaked by client scripts or their dependencies under control.
+    """
+
+    def __init__(self, max_workers, max_batches_per_worker=None):
+        self.max_workers = max_workers
+        self.max_batches_per_worker = max_batches_per_worker
+
+        # Result channels need to be shared with the worker processes.
+        self.manager = multiprocessing.get_context("spawn").Manager()
+
+        super().__init__()
+
+        logger.debug(
+            "Started %s worker processes (recycled after %s batches).",
+            self.max_workers,
+            self.max_batches_per_worker or "unlimited",
+        )
+
+    def _create_executor(self):
+        return WorkerPoolExecutor(self.max_workers, self.max_batches_per_worker)
+
+    @property
+    def worker_slots(self):
+        return self.max_workers
+
+    def _create_result_channel(self):
+        return self.manager.Queue()
+
+    def shutdown(self, wait=True):
+        super().shutdown(wait)
+        self.manager.shutdown()
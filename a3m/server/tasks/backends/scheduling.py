@@ -0,0 +1,132 @@
+"""
+Scheduling of task batches across packages.
+
+Batches used to be handed to the executor as soon as they were full, so the
+executor processed them in submission order: a package with thousands of
+per-file batches kept every other package waiting, and a package waiting on a
+single slow batch couldn't lend its idle workers to the others.
+
+`TaskScheduler` sits between the backend and the executor. It keeps a queue of
+batches per package and only hands a batch to the executor when a worker slot
+is free, picking the package that holds the fewest slots. An optional
+per-package quota bounds how many slots a single package can hold at once.
+"""
+import collections
+import concurrent.futures
+import itertools
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskScheduler:
+    """Interleaves batches from all packages into shared worker slots.
+
+    ``slots`` is the number of batches that can be processed at the same time,
+    typically the number of workers of the executor. ``package_quota`` is the
+    maximum number of slots that a package can use, or ``None`` to only be
+    limited by the number of slots.
+
+    Methods on this class are threadsafe.
+    """
+
+    def __init__(self, executor, slots, package_quota=None):
+        self.executor = executor
+        self.slots = max(1, slots)
+        self.package_quota = package_quota or self.slots
+
+        self.lock = threading.Lock()
+        self.pending = {}  # package: deque of submissions
+        self.running = collections.Counter()  # package: running batches
+        self.turns = {}  # package: when it was last served, if it's still around
+        self.counter = itertools.count()
+
+    def submit(self, package, fn, *args):
+        """Schedule ``fn(*args)`` on behalf of ``package``.
+
+        Returns a `concurrent.futures.Future` that is resolved once the
+        executor has run the function.
+        """
+        future = concurrent.futures.Future()
+        with self.lock:
+            self.pending.setdefault(package, collections.deque()).append(
+                (future, fn, args)
+            )
+        self._dispatch()
+        return future
+
+    def running_count(self):
+        with self.lock:
+            return sum(self.running.values())
+
+    def pending_count(self):
+        with self.lock:
+            return sum(len(submissions) for submissions in self.pending.values())
+
+    def _next_submission(self):
+        """Pop the next submission, or return ``None`` if no slot is available.
+        Must be called with the lock held.
+
+        Packages holding the fewest slots go first, ties are broken in favour
+        of the package that has been waiting the longest for its turn.
+        """
+        if sum(self.running.values()) >= self.slots:
+            return None
+        eligible = [
+            package
+            for package in self.pending
+            if self.running[package] < self.package_quota
+        ]
+        if not eligible:
+            return None
+        package = min(
+            eligible,
+            key=lambda package: (self.running[package], self.turns.get(package, -1)),
+        )
+        submissions = self.pending[package]
+        submission = submissions.popleft()
+        if not submissions:
+            del self.pending[package]
+        self.turns[package] = next(self.counter)
+        self.running[package] += 1
+        return package, submission
+
+    def _dispatch(self):
+        while True:
+            with self.lock:
+                item = self._next_submission()
+            if item is None:
+                return
+            package, (future, fn, args) = item
+            if not future.set_running_or_notify_cancel():
+                self._release(package)
+                continue
+            try:
+                executor_future = self.executor.submit(fn, *args)
+            except Exception as err:
+                future.set_exception(err)
+                self._release(package)
+                continue
+            executor_future.add_done_callback(
+                lambda executor_future, package=package, future=future: self._done(
+                    package, future, executor_future
+                )
+            )
+
+    def _done(self, package, future, executor_future):
+        self._release(package)
+        try:
+            future.set_result(executor_future.result())
+        except Exception as err:
+            future.set_exception(err)
+        self._dispatch()
+
+    def _release(self, package):
+        with self.lock:
+            self.running[package] -= 1
+            if self.running[package] <= 0:
+                del self.running[package]
+                if package not in self.pending:
+                    del self.turns[package]
@@ -25,6 +25,9 @@ class Task:
     MCPClient.
     """
 
+    # Exit code recorded for tasks that were running when the server stopped.
+    INTERRUPTED_EXIT_CODE = -1
+
     def __init__(
         self,
         execute,
@@ -33,11 +36,14 @@ class Task:
         stderr_file_path,
         context,
         wants_output=False,
+        arguments_template=None,
     ):
         self.uuid = uuid.uuid4()
         self.done = False
         self.execute = execute
         self.arguments = arguments
+        # `CommandTemplate` that ``arguments`` was rendered from, if any.
+        self.arguments_template = arguments_template
         self.stdout_file_path = stdout_file_path
         self.stderr_file_path = stderr_file_path
         self.context = context
@@ -61,13 +67,28 @@ class Task:
     def cleanup_old_db_entries(cls):
         """Update the status of any in progress tasks.
 
-        This command is run on startup.
-        TODO: we could try to recover, instead of just failing.
+        This command is run on startup. Interrupted tasks are given a negative
+        exit code, they're run again when their package is resumed.
         """
         models.Task.objects.filter(exitcode=None).update(
-            exitcode=-1, stderror="MCP shut down while processing."
+            exitcode=cls.INTERRUPTED_EXIT_CODE,
+            stderror="MCP shut down while processing.",
         )
 
+    @classmethod
+    @auto_close_old_connections()
+    def completed_exit_codes(cls, job_id):
+        """Return the exit codes of the tasks of a job that completed, keyed by
+        file UUID.
+        """
+        exit_codes = {}
+        tasks = models.Task.objects.filter(job_id=job_id, exitcode__isnull=False)
+        for file_uuid, exit_code in tasks.exclude(
+            exitcode=cls.INTERRUPTED_EXIT_CODE
+        ).values_list("fileuuid", "exitcode"):
+            exit_codes[str(file_uuid)] = exit_code
+        return exit_codes
+
     @classmethod
     @auto_close_old_connections()
     def bulk_log(self, tasks, job):
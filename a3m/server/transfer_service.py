@@ -1,24 +1,153 @@
+import asyncio
+import base64
+import binascii
 import logging
+import queue
 
-from google.protobuf import timestamp_pb2
+from google.protobuf import any_pb2
+from google.protobuf import duration_pb2
 from google.rpc import code_pb2
+from google.rpc import error_details_pb2
+from google.rpc import status_pb2
+from grpc_status import rpc_status
 
 from a3m.api.transferservice import v1beta1 as transfer_service_api
 from a3m.main.models import Task
+from a3m.server.events import AsyncSubscription
+from a3m.server.events import PACKAGE_DONE
+from a3m.server.events import package_events
+from a3m.server.events import Subscription
 from a3m.server.packages import get_package_status
+from a3m.server.packages import get_package_statuses
 from a3m.server.packages import Package
 from a3m.server.packages import PackageNotFoundError
+from a3m.server.queues import QueueFullError
 
 logger = logging.getLogger(__name__)
 
 
+PACKAGE_STATUS_PROCESSING = (
+    transfer_service_api.request_response_pb2.PACKAGE_STATUS_PROCESSING
+)
+
+PACKAGE_PRIORITIES = frozenset(
+    transfer_service_api.request_response_pb2.PackagePriority.values()
+)
+
+
+def _resource_exhausted(message, retry_after):
+    """Build a RESOURCE_EXHAUSTED status including a retry-after hint."""
+    retry_info = error_details_pb2.RetryInfo(
+        retry_delay=duration_pb2.Duration(seconds=retry_after)
+    )
+    detail = any_pb2.Any()
+    detail.Pack(retry_info)
+    return rpc_status.to_status(
+        status_pb2.Status(
+            code=code_pb2.RESOURCE_EXHAUSTED, message=message, details=[detail]
+        )
+    )
+
+
+def _job_event(job):
+    return transfer_service_api.request_response_pb2.WatchResponse(
+        status=PACKAGE_STATUS_PROCESSING, job=job
+    )
+
+
+def _final_event(package_status):
+    return transfer_service_api.request_response_pb2.WatchResponse(
+        status=package_status.status, jobs=package_status.jobs
+    )
+
+
+# Fields of `Task` messages and the columns of the `Task` model they're read
+# from. Only the columns of the fields requested are loaded.
+TASK_FIELDS = {
+    "id": "taskuuid",
+    "file_id": "fileuuid",
+    "exit_code": "exitcode",
+    "filename": "filename",
+    "execution": "execution",
+    "arguments": "arguments",
+    "stdout": "stdout",
+    "stderr": "stderror",
+    "start_time": "starttime",
+    "end_time": "endtime",
+}
+
+
+def _encode_page_token(task_id):
+    if task_id is None:
+        return ""
+    return base64.urlsafe_b64encode(task_id.encode()).decode()
+
+
+def _decode_page_token(page_token):
+    """Return the id of the last task of the previous page, or ``None``.
+    Raises `ValueError` if the token is malformed.
+    """
+    if not page_token:
+        return None
+    try:
+        return base64.urlsafe_b64decode(page_token.encode()).decode()
+    except (binascii.Error, UnicodeError) as err:
+        raise ValueError(str(err)) from err
+
+
+def _get_tasks_page(job_id, fields, page_size, after=None):
+    """Return a page of `Task` messages of a job, with the id of its last task
+    if more tasks follow or ``None`` otherwise.
+
+    Tasks are paginated by primary key, the page starts after the task with
+    id ``after``.
+    """
+    columns = list(dict.fromkeys(["taskuuid"] + [TASK_FIELDS[f] for f in fields]))
+    queryset = Task.objects.filter(job_id=job_id).order_by("taskuuid")
+    if after is not None:
+        queryset = queryset.filter(taskuuid__gt=after)
+    rows = list(queryset.values_list(*columns)[: page_size + 1])
+    last_id = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last_id = rows[-1][0]
+
+    tasks = []
+    for row in rows:
+        values = dict(zip(columns, row))
+        message = transfer_service_api.request_response_pb2.Task()
+        for field_name in fields:
+            value = values[TASK_FIELDS[field_name]]
+            if value is None:
+                continue
+            if field_name in ("start_time", "end_time"):
+                getattr(message, field_name).FromDatetime(value)
+            else:
+                setattr(message, field_name, value)
+        tasks.append(message)
+
+    return tasks, last_id
+
+
 class TransferService(transfer_service_api.service_pb2_grpc.TransferServiceServicer):
+    # Seconds between checks of whether a watching client is still connected.
+    WATCH_POLL_INTERVAL = 1.0
+
+    # Maximum number of packages accepted by the batch methods.
+    MAX_BATCH_SIZE = 500
+
+    # Number of tasks per page of ListTasks and StreamTasks.
+    DEFAULT_TASKS_PAGE_SIZE = 100
+    MAX_TASKS_PAGE_SIZE = 1000
+
     def __init__(self, workflow, package_queue, executor):
         self.workflow = workflow
         self.package_queue = package_queue
         self.executor = executor
 
     def Submit(self, request, context):
+        if request.priority not in PACKAGE_PRIORITIES:
+            context.abort(code_pb2.INVALID_ARGUMENT, "Unknown priority")
         try:
             package = Package.create_package(
                 self.package_queue,
@@ -27,7 +156,11 @@ class TransferService(transfer_service_api.service_pb2_grpc.TransferServiceServi
                 request.name,
                 request.url,
                 request.config,
+                request.priority,
+                request.submitter,
             )
+        except QueueFullError as err:
+            context.abort_with_status(_resource_exhausted(str(err), err.retry_after))
         except Exception as err:
             logger.warning("TransferService.Submit handler error: %s", err)
             context.abort(code_pb2.INTERNAL, "Unknown error")
@@ -52,27 +185,163 @@ class TransferService(transfer_service_api.service_pb2_grpc.TransferServiceServi
             resp.jobs.extend(package_status.jobs)
         return resp
 
+    def BatchSubmit(self, request, context):
+        if not request.packages:
+            context.abort(code_pb2.INVALID_ARGUMENT, "packages is mandatory")
+        if len(request.packages) > self.MAX_BATCH_SIZE:
+            context.abort(
+                code_pb2.INVALID_ARGUMENT,
+                f"Too many packages (max. {self.MAX_BATCH_SIZE})",
+            )
+        if any(item.priority not in PACKAGE_PRIORITIES for item in request.packages):
+            context.abort(code_pb2.INVALID_ARGUMENT, "Unknown priority")
+        try:
+            packages = Package.create_packages(
+                self.package_queue,
+                self.executor,
+                self.workflow,
+                [
+                    {
+                        "name": item.name,
+                        "url": item.url,
+                        "config": item.config,
+                        "priority": item.priority,
+                        "submitter": item.submitter,
+                    }
+                    for item in request.packages
+                ],
+            )
+        except QueueFullError as err:
+            context.abort_with_status(_resource_exhausted(str(err), err.retry_after))
+        except Exception as err:
+            logger.warning("TransferService.BatchSubmit handler error: %s", err)
+            context.abort(code_pb2.INTERNAL, "Unknown error")
+        return transfer_service_api.request_response_pb2.BatchSubmitResponse(
+            ids=[str(package.uuid) for package in packages]
+        )
+
+    def BatchRead(self, request, context):
+        if len(request.ids) > self.MAX_BATCH_SIZE:
+            context.abort(
+                code_pb2.INVALID_ARGUMENT,
+                f"Too many packages (max. {self.MAX_BATCH_SIZE})",
+            )
+        try:
+            package_statuses = get_package_statuses(self.package_queue, request.ids)
+        except Exception as err:
+            logger.warning("TransferService.BatchRead handler error: %s", err)
+            context.abort(code_pb2.INTERNAL, "Unknown error")
+        resp = transfer_service_api.request_response_pb2.BatchReadResponse()
+        for package_id in request.ids:
+            package_status = package_statuses.get(package_id)
+            if package_status is None:
+                resp.not_found.append(package_id)
+                continue
+            resp.packages.add(
+                id=package_id,
+                status=package_status.status,
+                job=package_status.job or "",
+            )
+        return resp
+
+    def Watch(self, request, context):
+        subscription = package_events.subscribe(request.id, Subscription())
+        try:
+            package_status = self._get_watched_status(request.id, context)
+            while package_status.status == PACKAGE_STATUS_PROCESSING:
+                try:
+                    event = subscription.get(timeout=self.WATCH_POLL_INTERVAL)
+                except queue.Empty:
+                    if not context.is_active():
+                        return
+                    continue
+                if event is PACKAGE_DONE:
+                    package_status = self._get_watched_status(request.id, context)
+                    break
+                yield _job_event(event)
+            yield _final_event(package_status)
+        finally:
+            package_events.unsubscribe(request.id, subscription)
+
+    def _get_watched_status(self, package_id, context):
+        try:
+            return get_package_status(self.package_queue, package_id)
+        except PackageNotFoundError:
+            context.abort(code_pb2.NOT_FOUND, "Package not found")
+        except Exception as err:
+            logger.warning("TransferService.Watch handler error: %s", err)
+            context.abort(code_pb2.INTERNAL, "Unknown error")
+
     def ListTasks(self, request, context):
+        fields, page_size, after = self._parse_list_tasks_request(request, context)
+        tasks, last_id = _get_tasks_page(request.job_id, fields, page_size, after)
+        return transfer_service_api.request_response_pb2.ListTasksResponse(
+            tasks=tasks, next_page_token=_encode_page_token(last_id)
+        )
+
+    def StreamTasks(self, request, context):
+        fields, page_size, after = self._parse_list_tasks_request(request, context)
+        while True:
+            tasks, after = _get_tasks_page(request.job_id, fields, page_size, after)
+            yield transfer_service_api.request_response_pb2.ListTasksResponse(
+                tasks=tasks, next_page_token=_encode_page_token(after)
+            )
+            if after is None:
+                break
+
+    def _parse_list_tasks_request(self, request, context):
         if not request.job_id:
             context.abort(code_pb2.INVALID_ARGUMENT, "job_id is mandatory")
-        resp = transfer_service_api.request_response_pb2.ListTasksResponse()
-        for item in Task.objects.filter(job_id=request.job_id):
-            start_time = timestamp_pb2.Timestamp()
-            start_time.FromDatetime(item.starttime)
-            end_time = timestamp_pb2.Timestamp()
-            end_time.FromDatetime(item.endtime)
-            resp.tasks.append(
-                transfer_service_api.request_response_pb2.Task(
-                    id=item.pk,
-                    file_id=item.fileuuid,
-                    exit_code=item.exitcode,
-                    filename=item.filename,
-                    execution=item.execution,
-                    arguments=item.arguments,
-                    stdout=item.stdout,
-                    stderr=item.stderror,
-                    start_time=start_time,
-                    end_time=end_time,
-                )
+        if request.page_size < 0:
+            context.abort(code_pb2.INVALID_ARGUMENT, "page_size must be positive")
+        page_size = min(
+            request.page_size or self.DEFAULT_TASKS_PAGE_SIZE,
+            self.MAX_TASKS_PAGE_SIZE,
+        )
+        fields = list(request.read_mask.paths) or list(TASK_FIELDS)
+        unknown = [path for path in fields if path not in TASK_FIELDS]
+        if unknown:
+            context.abort(
+                code_pb2.INVALID_ARGUMENT,
+                f"Unknown fields in read_mask: {', '.join(unknown)}",
             )
-        return resp
+        try:
+            after = _decode_page_token(request.page_token)
+        except ValueError:
+            context.abort(code_pb2.INVALID_ARGUMENT, "Invalid page_token")
+        return fields, page_size, after
+
+
+class AsyncTransferService(TransferService):
+    """Transfer service mounted on an asyncio gRPC server.
+
+    Watching a package doesn't hold a thread of the server while waiting for
+    its events, the other methods are still run in threads.
+    """
+
+    async def Watch(self, request, context):
+        loop = asyncio.get_running_loop()
+        subscription = package_events.subscribe(request.id, AsyncSubscription())
+        try:
+            package_status = await loop.run_in_executor(
+                None, self._get_status, request.id
+            )
+            while package_status.status == PACKAGE_STATUS_PROCESSING:
+                event = await subscription.get()
+                if event is PACKAGE_DONE:
+                    package_status = await loop.run_in_executor(
+                        None, self._get_status, request.id
+                    )
+                    break
+                yield _job_event(event)
+            yield _final_event(package_status)
+        except PackageNotFoundError:
+            await context.abort(code_pb2.NOT_FOUND, "Package not found")
+        except Exception as err:
+            logger.warning("TransferService.Watch handler error: %s", err)
+            await context.abort(code_pb2.INTERNAL, "Unknown error")
+        finally:
+            package_events.unsubscribe(request.id, subscription)
+
+    def _get_status(self, package_id):
+        return get_package_status(self.package_queue, package_id)
@@ -14,6 +14,11 @@ from a3m.appconfig import Config
 CONFIG_MAPPING = {
     "debug": {"section": "a3m", "option": "debug", "type": "boolean"},
     "batch_size": {"section": "a3m", "option": "batch_size", "type": "int"},
+    "batch_target_time": {
+        "section": "a3m",
+        "option": "batch_target_time",
+        "type": "float",
+    },
     "concurrent_packages": {
         "section": "a3m",
         "option": "concurrent_packages",
@@ -21,6 +26,58 @@ CONFIG_MAPPING = {
     },
     "rpc_threads": {"section": "a3m", "option": "rpc_threads", "type": "int"},
     "worker_threads": {"section": "a3m", "option": "worker_threads", "type": "int"},
+    "worker_processes": {
+        "section": "a3m",
+        "option": "worker_processes",
+        "type": "int",
+    },
+    "worker_max_batches": {
+        "section": "a3m",
+        "option": "worker_max_batches",
+        "type": "int",
+    },
+    "max_queued_packages": {
+        "section": "a3m",
+        "option": "max_queued_packages",
+        "type": "int",
+    },
+    "engine_mode": {"section": "a3m", "option": "engine_mode", "type": "string"},
+    "package_task_quota": {
+        "section": "a3m",
+        "option": "package_task_quota",
+        "type": "int",
+    },
+    "admission_policy": {
+        "section": "a3m",
+        "option": "admission_policy",
+        "type": "string",
+    },
+    "submitter_weights": {
+        "section": "a3m",
+        "option": "submitter_weights",
+        "type": "string",
+    },
+    "result_cache": {
+        "section": "a3m",
+        "option": "result_cache",
+        "type": "boolean",
+    },
+    "result_cache_size": {
+        "section": "a3m",
+        "option": "result_cache_size",
+        "type": "int",
+    },
+    "verify_file_index": {
+        "section": "a3m",
+        "option": "verify_file_index",
+        "type": "boolean",
+    },
+    "walk_threads": {"section": "a3m", "option": "walk_threads", "type": "int"},
+    "checksum_threads": {
+        "section": "a3m",
+        "option": "checksum_threads",
+        "type": "int",
+    },
     "shared_directory": {
         "section": "a3m",
         "option": "shared_directory",
@@ -138,7 +195,20 @@ CONFIG_DEFAULTS = """[a3m]
 
 debug = False
 batch_size = 128
+batch_target_time = 0                   ; Seconds, 0 disables adaptive batching
 rpc_threads = 4
+worker_processes = 0                    ; 0 runs tasks in the server process
+worker_max_batches = 0                  ; 0 never recycles worker processes
+max_queued_packages = 4096
+engine_mode = threads                   ; Options: threads or asyncio
+package_task_quota = 0                  ; Batches per package, 0 is unlimited
+admission_policy = fifo                 ; Options: fifo, fair_share or shortest_first
+submitter_weights =                     ; E.g.: alice:2, bob:1
+result_cache = True                     ; Reuse tool results of files with the same contents
+result_cache_size = 268435456           ; Bytes, least recently used results are evicted first
+verify_file_index = False               ; Check the file index of packages with full walks
+walk_threads = 0                        ; Threads listing directories, 0 lists them serially
+checksum_threads = 0                    ; Threads hashing files, 0 uses one per CPU
 prometheus_bind_address =
 prometheus_bind_port =
 time_zone = UTC
@@ -305,11 +375,24 @@ def concurrent_packages_default():
 
 
 BATCH_SIZE = config.get("batch_size")
+BATCH_TARGET_TIME = config.get("batch_target_time")
 CONCURRENT_PACKAGES = config.get(
     "concurrent_packages", default=concurrent_packages_default()
 )
 RPC_THREADS = config.get("rpc_threads")
 WORKER_THREADS = config.get("worker_threads", default=multiprocessing.cpu_count() + 1)
+WORKER_PROCESSES = config.get("worker_processes")
+WORKER_MAX_BATCHES = config.get("worker_max_batches")
+MAX_QUEUED_PACKAGES = config.get("max_queued_packages")
+ENGINE_MODE = config.get("engine_mode")
+PACKAGE_TASK_QUOTA = config.get("package_task_quota")
+ADMISSION_POLICY = config.get("admission_policy")
+SUBMITTER_WEIGHTS = config.get("submitter_weights")
+RESULT_CACHE = config.get("result_cache")
+RESULT_CACHE_SIZE = config.get("result_cache_size")
+VERIFY_FILE_INDEX = config.get("verify_file_index")
+WALK_THREADS = config.get("walk_threads")
+CHECKSUM_THREADS = config.get("checksum_threads")
 REMOVABLE_FILES = config.get("removable_files")
 CLAMAV_SERVER = config.get("clamav_server")
 CLAMAV_PASS_BY_STREAM = config.get("clamav_pass_by_stream")
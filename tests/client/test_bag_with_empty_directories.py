@@ -0,0 +1,89 @@
+import hashlib
+import os
+import uuid
+
+import pytest
+from bagit import Bag
+
+from a3m import hashing
+from a3m.client.clientScripts import bag_with_empty_directories
+from a3m.client.job import Job
+from a3m.main.models import File
+from a3m.main.models import SIP
+
+
+@pytest.fixture
+def sip(tmp_path, db):
+    sip = SIP.objects.create(uuid=uuid.uuid4(), currentpath=r"%sharedPath%sip/")
+    sip_dir = tmp_path / "sip"
+    (sip_dir / "objects" / "nested").mkdir(parents=True)
+    (sip_dir / "objects" / "empty").mkdir()
+    (sip_dir / "logs").mkdir()
+    (sip_dir / "objects" / "a.txt").write_bytes(b"a")
+    (sip_dir / "objects" / "nested" / "b.txt").write_bytes(b"b")
+    (sip_dir / "logs" / "log.txt").write_bytes(b"log")
+    (sip_dir / f"METS.{sip.uuid}.xml").write_bytes(b"<mets/>")
+    (sip_dir / "ignored.txt").write_bytes(b"ignored")
+    for name in ("a.txt", "nested/b.txt"):
+        File.objects.create(
+            uuid=uuid.uuid4(),
+            sip=sip,
+            currentlocation=f"%SIPDirectory%objects/{name}",
+        )
+    return sip, sip_dir
+
+
+def test_call_creates_bag_with_stored_digests(sip, tmp_path, mocker):
+    sip, sip_dir = sip
+    hashing.digest_files(
+        {
+            file_obj.uuid: str(sip_dir / file_obj.currentlocation.split("%", 2)[2])
+            for file_obj in File.objects.filter(sip=sip)
+        },
+        ["sha256"],
+    )
+    hash_file = mocker.spy(hashing, "hash_file")
+    destination = tmp_path / "bag"
+    job = Job("stub", "stub", [str(destination), f"{sip_dir}/", str(sip.uuid)])
+
+    bag_with_empty_directories.call([job])
+
+    assert job.get_exit_code() == 0
+    # Only the files that aren't tracked are hashed.
+    assert sorted(call.args[0] for call in hash_file.call_args_list) == [
+        str(sip_dir / f"METS.{sip.uuid}.xml"),
+        str(sip_dir / "logs" / "log.txt"),
+    ]
+    bag = Bag(str(destination))
+    bag.validate()
+    assert bag.info["External-Identifier"] == str(sip.uuid)
+    assert bag.info["Payload-Oxum"] == "12.4"
+    assert bag.entries["data/objects/a.txt"] == {
+        "sha256": hashlib.sha256(b"a").hexdigest()
+    }
+    assert sorted(bag.payload_files()) == [
+        f"data/METS.{sip.uuid}.xml",
+        "data/logs/log.txt",
+        "data/objects/a.txt",
+        "data/objects/nested/b.txt",
+    ]
+    assert (destination / "data" / "objects" / "empty").is_dir()
+    # The payload is linked rather than copied.
+    assert os.path.samefile(
+        destination / "data" / "objects" / "a.txt", sip_dir / "objects" / "a.txt"
+    )
+
+
+def test_call_copies_payload_that_cannot_be_linked(sip, tmp_path, mocker):
+    sip, sip_dir = sip
+    mocker.patch("os.link", side_effect=OSError)
+    destination = tmp_path / "bag"
+    job = Job("stub", "stub", [str(destination), f"{sip_dir}/", str(sip.uuid)])
+
+    bag_with_empty_directories.call([job])
+
+    assert job.get_exit_code() == 0
+    Bag(str(destination)).validate()
+    assert not os.path.samefile(
+        destination / "data" / "objects" / "a.txt", sip_dir / "objects" / "a.txt"
+    )
@@ -1,6 +1,17 @@
+import uuid
+
 import pytest
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
+from a3m.api.tasks.v1beta1.batch_pb2 import TaskBatch
+from a3m.client.mcp import execute_command
 from a3m.client.mcp import handle_batch_task
+from a3m.main import models
+from a3m.server.jobs.client import CommandTemplate
+from a3m.server.tasks import Task
+from a3m.server.tasks.backends.pool_backend import PoolTaskBatch
 
 
 @pytest.mark.django_db
@@ -21,20 +32,186 @@ def test_handle_batch_task_replaces_non_ascii_arguments(mocker):
 
     # Mock the two parameters sent to handle_batch_task
     task_name = "tásk".encode()
-    batch_payload = {
-        "tasks": {
-            "some_task_uuid": {
-                "uuid": "some_task_uuid",
-                "arguments": "montréal %taskUUID% %jobCreatedDate%",
-                "createdDate": "some montréal datetime",
-                "wants_output": False,
-                "execute": "command",
-            }
-        }
-    }
+    task_uuid = uuid.uuid4()
+    batch_payload = TaskBatch(
+        execute="command",
+        task_ids=task_uuid.bytes,
+        created_times=[0],
+        wants_output=[False],
+        command_lines=["montréal %taskUUID% %jobCreatedDate%"],
+    ).SerializeToString()
     handle_batch_task(task_name, batch_payload)
 
     # Check that string replacement were successful
     _parse_command_line.assert_called_once_with(
-        "montréal some_task_uuid some montréal datetime"
+        f"montréal {task_uuid} 1970-01-01 00:00:00+00:00"
+    )
+
+
+@pytest.mark.django_db
+def test_handle_batch_task_renders_split_arguments(mocker):
+    job = mocker.patch("a3m.client.mcp.Job")
+    mocker.patch("a3m.client.mcp.retryOnFailure")
+    _parse_command_line = mocker.patch("a3m.client.mcp._parse_command_line")
+    mocker.patch(
+        "importlib.import_module", return_value=mocker.MagicMock(spec=["call"])
+    )
+
+    task_uuids = [uuid.uuid4(), uuid.uuid4()]
+    batch = TaskBatch(
+        execute="command",
+        task_ids=b"".join(task_uuid.bytes for task_uuid in task_uuids),
+        created_times=[0, 0],
+        wants_output=[False, True],
+    )
+    batch.columns.add(values=["%sharedPath%sip/a b.txt", '/sip/"c".txt'])
+    argument = batch.arguments.add(literals=["--file=", ""])
+    argument.variables.add(column=0)
+    argument = batch.arguments.add(literals=["", "/log"])
+    argument.variables.add(name="%taskUUID%")
+    batch.arguments.add(literals=["%unknown%"])
+    batch.arguments.add(literals=["%sharedPath%transfer/"])
+
+    handle_batch_task("task", batch.SerializeToString())
+
+    _parse_command_line.assert_not_called()
+    assert [call.args[2] for call in job.call_args_list] == [
+        [
+            f"--file={settings.SHARED_DIRECTORY}sip/a b.txt",
+            f"{task_uuids[0]}/log",
+            "%unknown%",
+            f"{settings.SHARED_DIRECTORY}transfer/",
+        ],
+        [
+            '--file=/sip/"c".txt',
+            f"{task_uuids[1]}/log",
+            "%unknown%",
+            f"{settings.SHARED_DIRECTORY}transfer/",
+        ],
+    ]
+    assert [call.kwargs["caller_wants_output"] for call in job.call_args_list] == [
+        False,
+        True,
+    ]
+
+
+@pytest.mark.django_db
+def test_handle_batch_task_replaces_variables_in_split_argument_values(mocker):
+    job = mocker.patch("a3m.client.mcp.Job")
+    mocker.patch("a3m.client.mcp.retryOnFailure")
+    mocker.patch(
+        "importlib.import_module", return_value=mocker.MagicMock(spec=["call"])
+    )
+    # Package paths are stored with %sharedPath%, which is only known to the
+    # client.
+    template = CommandTemplate(
+        '"%SIPDirectory%" "%relativeLocation%"',
+        {r"%SIPDirectory%": r"%sharedPath%currentlyProcessing/sip/"},
     )
+    file_replacements = {
+        r"%relativeLocation%": r"%sharedPath%currentlyProcessing/sip/objects/a.txt"
+    }
+    batch = PoolTaskBatch(max_size=1)
+    batch.add_task(
+        Task(
+            "command",
+            template.render(file_replacements),
+            None,
+            None,
+            file_replacements,
+            arguments_template=template,
+        )
+    )
+
+    handle_batch_task("task", batch.serialize())
+
+    assert TaskBatch.FromString(batch.serialize()).arguments
+    assert job.call_args.args[2] == [
+        f"{settings.SHARED_DIRECTORY}currentlyProcessing/sip/",
+        f"{settings.SHARED_DIRECTORY}currentlyProcessing/sip/objects/a.txt",
+    ]
+
+
+@pytest.fixture
+def task_batch(db):
+    job = models.Job.objects.create(
+        sipuuid=str(uuid.uuid4()), createdtime=timezone.now()
+    )
+    task_uuids = [uuid.uuid4(), uuid.uuid4()]
+    for task_uuid in task_uuids:
+        models.Task.objects.create(
+            taskuuid=str(task_uuid), job=job, createdtime=timezone.now()
+        )
+    batch = TaskBatch(
+        execute="command",
+        task_ids=b"".join(task_uuid.bytes for task_uuid in task_uuids),
+        created_times=[0, 0],
+        wants_output=[False, False],
+        command_lines=["", ""],
+    )
+    return [str(task_uuid) for task_uuid in task_uuids], batch.SerializeToString()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_execute_command_reports_results_once_committed(task_batch, mocker):
+    task_uuids, batch_payload = task_batch
+    job_completed = mocker.patch("a3m.client.metrics.job_completed")
+    job_failed = mocker.patch("a3m.client.metrics.job_failed")
+    reported = []
+
+    def call(jobs):
+        with transaction.atomic():
+            jobs[0].done()
+            assert reported == []
+        assert reported == [(task_uuids[0], 0)]
+        try:
+            with transaction.atomic():
+                jobs[1].done()
+                raise ValueError
+        except ValueError:
+            jobs[1].set_status(1)
+
+    mocker.patch("importlib.import_module", return_value=mocker.Mock(call=call))
+
+    results = execute_command(
+        "task",
+        batch_payload,
+        lambda task_uuid, result: reported.append((task_uuid, result["exitCode"])),
+    )
+
+    # The rolled back result of the second task was never reported.
+    assert reported == [(task_uuids[0], 0)]
+    assert {
+        task_uuid: result["exitCode"]
+        for task_uuid, result in results["task_results"].items()
+    } == {task_uuids[0]: 0, task_uuids[1]: 1}
+    assert models.Task.objects.get(taskuuid=task_uuids[1]).exitcode == 1
+    job_completed.assert_called_once_with("task")
+    job_failed.assert_called_once_with("task")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_execute_command_counts_updated_exit_codes_once(task_batch, mocker):
+    task_uuids, batch_payload = task_batch
+    job_completed = mocker.patch("a3m.client.metrics.job_completed")
+    job_failed = mocker.patch("a3m.client.metrics.job_failed")
+    reported = []
+
+    def call(jobs):
+        for job in jobs:
+            job.done()
+        jobs[0].set_status(1)
+
+    mocker.patch("importlib.import_module", return_value=mocker.Mock(call=call))
+
+    results = execute_command(
+        "task",
+        batch_payload,
+        lambda task_uuid, result: reported.append((task_uuid, result["exitCode"])),
+    )
+
+    assert reported == [(task_uuids[0], 0), (task_uuids[1], 0)]
+    assert results["task_results"][task_uuids[0]]["exitCode"] == 1
+    assert models.Task.objects.get(taskuuid=task_uuids[0]).exitcode == 1
+    job_completed.assert_called_once_with("task")
+    job_failed.assert_called_once_with("task")
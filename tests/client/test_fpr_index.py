@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+
+from a3m.client import fpr_index
+from a3m.fpr.models import FormatVersion
+from a3m.fpr.models import FPCommand
+from a3m.fpr.models import FPRule
+
+
+@pytest.fixture
+def index(db, monkeypatch):
+    monkeypatch.setattr(fpr_index, "_index", None)
+    return fpr_index.get_fpr_index()
+
+
+def test_rules_match_queries(index, django_assert_num_queries):
+    format_version = FormatVersion.active.get(pronom_id="fmt/353")
+    expected = list(FPRule.active.filter(format=format_version, purpose="access"))
+    defaults = list(FPRule.active.filter(purpose="default_access"))
+
+    with django_assert_num_queries(0):
+        assert index.get_rules("access", format_version) == expected
+        assert index.get_rules("access", str(format_version.uuid)) == expected
+        assert index.get_rules("default_access") == defaults
+        assert index.get_rules("access", uuid.uuid4()) == []
+        assert index.get_format_version("fmt/353") == format_version
+        assert index.get_format_version("fmt/0") is None
+        rule = index.get_rule("preservation", format_version)
+        assert rule.command.description
+
+    with pytest.raises(FPRule.DoesNotExist):
+        index.get_rule("extract", format_version)
+
+
+def test_refresh_drops_index_when_fpr_changes(index, django_assert_num_queries):
+    format_version = FormatVersion.active.get(pronom_id="fmt/353")
+
+    # The FPR didn't change.
+    with django_assert_num_queries(1):
+        fpr_index.refresh()
+    assert fpr_index.get_fpr_index() is index
+
+    rule = FPRule.objects.create(
+        purpose="extract",
+        format=format_version,
+        command=FPCommand.objects.filter(command_usage="extraction").first(),
+    )
+    fpr_index.refresh()
+    new_index = fpr_index.get_fpr_index()
+
+    assert new_index is not index
+    assert new_index.get_rule("extract", format_version) == rule
@@ -2,7 +2,10 @@ import uuid
 
 import pytest
 
+from a3m.client.clientScripts.identify_file_format import call
 from a3m.client.clientScripts.identify_file_format import identify_file_format
+from a3m.client.job import Job
+from a3m.fpr.models import FormatVersion
 from a3m.main.models import Event
 from a3m.main.models import File
 from a3m.main.models import FileFormatVersion
@@ -71,3 +74,50 @@ def test_identify_file_format(file_obj, file_path):
         format_name="Python Script File",
         format_registry_key="fmt/938",
     )
+
+
+def test_identify_file_format_reuses_cached_results(
+    file_obj, file_path, settings, mocker
+):
+    settings.RESULT_CACHE = True
+    identify = mocker.patch("pygfried.identify", return_value="fmt/938")
+
+    assert identify_file_format(str(file_path), file_obj.uuid, False) == 0
+    assert identify_file_format(str(file_path), file_obj.uuid, False) == 0
+
+    identify.assert_called_once()
+    assert (
+        Event.objects.filter(
+            file_uuid=file_obj, event_type="format identification"
+        ).count()
+        == 2
+    )
+
+
+def test_call_identifies_batch_with_constant_queries(
+    file_obj, file_path, transfer, mocker, django_assert_max_num_queries
+):
+    mocker.patch("pygfried.identify", return_value="fmt/938")
+    file_objs = [file_obj] + [
+        File.objects.create(
+            uuid=uuid.uuid4(),
+            transfer=transfer,
+            currentlocation=file_obj.currentlocation,
+        )
+        for _ in range(9)
+    ]
+    # The format of the first file was identified before.
+    FileFormatVersion.objects.create(
+        file_uuid=file_obj,
+        format_version=FormatVersion.objects.get(pronom_id="fmt/1"),
+    )
+    jobs = [Job("stub", "stub", [str(file_path), str(f.uuid)]) for f in file_objs]
+
+    with django_assert_max_num_queries(21):
+        call(jobs)
+
+    assert [job.get_exit_code() for job in jobs] == [0] * 10
+    for f in file_objs:
+        FileFormatVersion.objects.get(file_uuid=f, format_version__pronom_id="fmt/938")
+        FileID.objects.get(file_id=f.uuid, format_registry_key="fmt/938")
+        Event.objects.get(file_uuid=f, event_type="format identification")
@@ -32,3 +32,20 @@ def test_job_encoding():
     assert job.UUID in job_dump
     assert stderr in job_dump
     assert stdout in job_dump
+
+
+def test_job_context_reports_job_done():
+    done_jobs = []
+    job = Job(
+        name="somejob",
+        uuid=str(uuid4()),
+        args=["a", "b"],
+        done_callback=done_jobs.append,
+    )
+
+    with job.JobContext():
+        assert done_jobs == []
+        raise Exception("error")
+
+    assert done_jobs == [job]
+    assert job.get_exit_code() == 1
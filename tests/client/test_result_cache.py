@@ -0,0 +1,143 @@
+import datetime
+import hashlib
+
+import pytest
+
+from a3m import hashing
+from a3m.client import result_cache
+from a3m.client.result_cache import cache_key
+from a3m.client.result_cache import ResultCache
+from a3m.main.models import File
+from a3m.main.models import ToolResult
+
+
+@pytest.fixture
+def enabled_cache(settings):
+    settings.RESULT_CACHE = True
+
+
+def test_result_cache_is_shared_through_the_database(
+    enabled_cache, db, mocker, django_assert_num_queries
+):
+    hit = mocker.patch("a3m.client.metrics.result_cache_hit")
+    miss = mocker.patch("a3m.client.metrics.result_cache_miss")
+    one, two = (cache_key(digest, "script") for digest in ("1", "2"))
+    cache = ResultCache()
+
+    assert cache.get(one) is None
+    cache.put(one, "a")
+    cache.flush()
+    # Another worker records the same result concurrently.
+    other_cache = ResultCache()
+    other_cache.put(one, "a")
+    other_cache.flush()
+
+    cache = ResultCache()
+    with django_assert_num_queries(1):
+        cache.load([one, two])
+        assert cache.get(one) == "a"
+        assert cache.get(two) is None
+    assert ToolResult.objects.count() == 1
+    assert hit.call_count == 1
+    assert miss.call_count == 2
+
+
+def test_result_cache_ignores_unknown_keys(enabled_cache, db):
+    cache = ResultCache()
+
+    cache.put(None, "value")
+    cache.flush()
+
+    assert cache.get(None) is None
+    assert not ToolResult.objects.exists()
+
+
+def test_result_cache_when_disabled(settings, db, django_assert_num_queries):
+    settings.RESULT_CACHE = False
+    cache = ResultCache()
+
+    with django_assert_num_queries(0):
+        cache.put(cache_key("1", "script"), "value")
+        cache.flush()
+        assert cache.get(cache_key("1", "script")) is None
+
+
+def test_file_digests_are_never_computed(enabled_cache, db, tmp_path, mocker):
+    paths = {}
+    for name in ("checksum", "stored", "changed", "unknown"):
+        path = paths[name] = tmp_path / name
+        path.write_text(name)
+    checksum = File.objects.create(
+        uuid="a21ee8e1-4f53-4c3c-8b54-6b0d2c3f4a11",
+        checksum="abc",
+        checksumtype="sha256",
+    )
+    stored, changed, unknown = (
+        File.objects.create(uuid=uuid, checksum="def", checksumtype="md5")
+        for uuid in (
+            "b21ee8e1-4f53-4c3c-8b54-6b0d2c3f4a11",
+            "c21ee8e1-4f53-4c3c-8b54-6b0d2c3f4a11",
+            "d21ee8e1-4f53-4c3c-8b54-6b0d2c3f4a11",
+        )
+    )
+    hashing.digest_files(
+        {stored.uuid: str(paths["stored"]), changed.uuid: str(paths["changed"])},
+        ["sha256"],
+    )
+    paths["changed"].write_text("changed!")
+    hash_file = mocker.spy(hashing, "hash_file")
+
+    digests = result_cache.file_digests(
+        {
+            checksum: str(paths["checksum"]),
+            stored: str(paths["stored"]),
+            changed: str(paths["changed"]),
+            unknown: str(paths["unknown"]),
+        }
+    )
+
+    assert digests == {
+        checksum.uuid: "abc",
+        stored.uuid: hashlib.sha256(b"stored").hexdigest(),
+    }
+    hash_file.assert_not_called()
+
+
+def test_file_digests_when_cache_is_disabled(settings, mocker):
+    settings.RESULT_CACHE = False
+    file_obj = mocker.Mock(uuid="abc", checksum="abc", checksumtype="sha256")
+
+    assert result_cache.file_digests({file_obj: "path"}) == {}
+    assert result_cache.file_digest(None, "path") is None
+
+
+def test_result_cache_evicts_least_recently_used(enabled_cache, db, mocker):
+    now = mocker.patch("django.utils.timezone.now")
+    one, two, three = (cache_key(digest, "script") for digest in ("1", "2", "3"))
+    for minute, (key, output) in enumerate(((one, "a" * 40), (two, "b" * 40))):
+        now.return_value = datetime.datetime(
+            2020, 1, 1, 0, minute, tzinfo=datetime.timezone.utc
+        )
+        cache = ResultCache(max_size=100)
+        cache.put(key, output)
+        cache.flush()
+
+    # The oldest result is used again, so the other one is evicted first.
+    now.return_value = datetime.datetime(2020, 1, 1, 0, 2, tzinfo=datetime.timezone.utc)
+    cache = ResultCache(max_size=100)
+    assert cache.get(one) == "a" * 40
+    cache.put(three, "c" * 40)
+    cache.flush()
+
+    assert sorted(ToolResult.objects.values_list("digest", flat=True)) == ["1", "3"]
+    assert ToolResult.objects.get(digest="1").lastusedtime == now.return_value
+
+
+def test_result_cache_without_size_limit(enabled_cache, db):
+    cache = ResultCache(max_size=0)
+
+    for digest in ("1", "2", "3"):
+        cache.put(cache_key(digest, "script"), "x" * 100)
+    cache.flush()
+
+    assert ToolResult.objects.count() == 3
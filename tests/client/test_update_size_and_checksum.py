@@ -0,0 +1,88 @@
+import hashlib
+import uuid
+
+import pytest
+
+from a3m.client.clientScripts import update_size_and_checksum
+from a3m.client.job import Job
+from a3m.main.models import Event
+from a3m.main.models import File
+from a3m.main.models import Transfer
+
+
+@pytest.fixture
+def transfer(db):
+    return Transfer.objects.create(
+        uuid=uuid.uuid4(), currentlocation=r"%transferDirectory%"
+    )
+
+
+def _job(file_uuid, file_path):
+    return Job(
+        "stub",
+        "stub",
+        [
+            "--fileUUID",
+            str(file_uuid),
+            "--filePath",
+            str(file_path),
+            "--date",
+            "2026-10-18T00:00:00+00:00",
+            "--eventIdentifierUUID",
+            str(uuid.uuid4()),
+        ],
+    )
+
+
+@pytest.mark.parametrize("threads", [0, 1])
+def test_call_updates_files_of_batch(tmp_path, transfer, settings, threads):
+    settings.CHECKSUM_THREADS = threads
+    contents = [b"", b"a" * 3000000, b"abc"]
+    files = []
+    for index, content in enumerate(contents):
+        path = tmp_path / f"file{index}"
+        path.write_bytes(content)
+        file_obj = File.objects.create(
+            uuid=uuid.uuid4(),
+            transfer=transfer,
+            currentlocation=f"%transferDirectory%objects/file{index}",
+        )
+        files.append((file_obj, path))
+    jobs = [_job(file_obj.uuid, path) for file_obj, path in files]
+    jobs.append(_job(uuid.uuid4(), tmp_path / "missing"))
+
+    update_size_and_checksum.call(jobs)
+
+    assert [job.get_exit_code() for job in jobs] == [0, 0, 0, 1]
+    for (file_obj, _), content in zip(files, contents):
+        file_obj.refresh_from_db()
+        assert file_obj.size == len(content)
+        assert file_obj.checksum == hashlib.sha256(content).hexdigest()
+        assert file_obj.checksumtype == "sha256"
+        event = Event.objects.get(
+            file_uuid=file_obj, event_type="message digest calculation"
+        )
+        assert event.event_outcome_detail == file_obj.checksum
+        assert event.agents.count() == 2
+
+
+def test_call_hashes_with_algorithms_of_checksum_files(tmp_path, transfer):
+    (tmp_path / "metadata").mkdir()
+    (tmp_path / "metadata" / "checksum.md5").touch()
+    (tmp_path / "objects").mkdir()
+    path = tmp_path / "objects" / "file.txt"
+    path.write_bytes(b"abc")
+    file_obj = File.objects.create(
+        uuid=uuid.uuid4(),
+        transfer=transfer,
+        currentlocation="%transferDirectory%objects/file.txt",
+    )
+    job = _job(file_obj.uuid, path)
+
+    update_size_and_checksum.call([job])
+
+    assert job.get_exit_code() == 0
+    assert dict(file_obj.digests.values_list("algorithm", "digest")) == {
+        "md5": hashlib.md5(b"abc").hexdigest(),
+        "sha256": hashlib.sha256(b"abc").hexdigest(),
+    }
@@ -16,248 +16,228 @@
 # along with Archivematica.  If not, see <http://www.gnu.org/licenses/>.
 """Test Verify Checksum Job in Archivematica.
 
-Tests for the verify checksum Job in Archivematica which makes calls out to the
-hashsum checksum utilities. We need to ensure that the output of the tool is
-mapped consistently to something that can be understood by users when
-debugging their preservation workflow.
+Tests for the verify checksum Job in Archivematica which compares the checksum
+files provided with a transfer with the digests of its objects. We need to
+ensure that mismatches are reported consistently to something that can be
+understood by users when debugging their preservation workflow.
 """
+import hashlib
 import os
-import subprocess
+import uuid
 from uuid import UUID
 
 import pytest
 from django.core.management import call_command
 
+from a3m import hashing
+from a3m.client.clientScripts import verify_checksum
+from a3m.client.clientScripts.verify_checksum import ChecksumFile
 from a3m.client.clientScripts.verify_checksum import get_file_queryset
-from a3m.client.clientScripts.verify_checksum import Hashsum
-from a3m.client.clientScripts.verify_checksum import NoHashCommandAvailable
+from a3m.client.clientScripts.verify_checksum import Mismatch
 from a3m.client.clientScripts.verify_checksum import PREMISFailure
+from a3m.client.clientScripts.verify_checksum import UnsupportedChecksumFile
 from a3m.client.clientScripts.verify_checksum import write_premis_event_per_file
 from a3m.client.job import Job
 from a3m.main.models import Event
 from a3m.main.models import File
+from a3m.main.models import Transfer
 
 
 THIS_DIR = os.path.dirname(__file__)
 
+MD5_A = hashlib.md5(b"a").hexdigest()
+MD5_B = hashlib.md5(b"b").hexdigest()
 
-class TestHashsum:
-    """Hashsum test runner object."""
 
-    assert_exception_string = "Hashsum exception string returned is incorrect"
-    assert_return_value = "Hashsum comparison returned something other than 1: {}"
+def _checksum_file(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    return ChecksumFile(str(path))
 
-    @staticmethod
-    def setup_hashsum(path, job):
-        """Return a hashsum instance to calling functions and perform any
-        other additional setup as necessary.
-        """
-        return Hashsum(path, job)
 
-    def test_invalid_initialisation(self):
-        """Test that we don't return a Hashsum object if there isn't a tool
-        configured to work with the file path provided.
+def _digests(path_contents, algorithm="md5"):
+    return {
+        path: hashing.Digests(
+            len(content), 0, {algorithm: hashlib.new(algorithm, content).hexdigest()}
+        )
+        for path, content in path_contents.items()
+    }
+
+
+class TestChecksumFile:
+    """ChecksumFile test runner object."""
+
+    @pytest.mark.parametrize(
+        "name", ["checksum.invalid_hash", "checksum_md5", "checksum.sha224"]
+    )
+    def test_invalid_initialisation(self, tmp_path, name):
+        """Test that we don't return a ChecksumFile object if the algorithm of
+        the file path provided isn't supported.
         """
-        with pytest.raises(NoHashCommandAvailable):
-            Hashsum("checksum.invalid_hash")
+        with pytest.raises(UnsupportedChecksumFile):
+            _checksum_file(tmp_path, name, [])
 
     @pytest.mark.parametrize(
-        "fixture",
+        "name,algorithm,ext",
         [
-            ("metadata/checksum.md5", True),
-            ("metadata/checksum.sha1", True),
-            ("metadata/checksum.sha256", True),
-            ("metadata/checksum.sha512", True),
-            ("metadata/checksum_md5", False),
-            ("metadata/checksum_sha1", False),
-            ("metadata/checksum_sha256", False),
-            ("metadata/checksum_sha512", False),
+            ("checksum.md5", "md5", "md5"),
+            ("checksum.sha1", "sha1", "sha1"),
+            ("checksum.sha256", "sha256", "sha256"),
+            ("checksum.sha512", "sha512", "sha512"),
         ],
     )
-    def test_valid_initialisation(self, fixture):
-        """Test that we don't return a Hashsum object if there isn't a tool
-        configured to work with the file path provided.
-        """
-        if fixture[1]:
-            assert isinstance(
-                Hashsum(fixture[0]), Hashsum
-            ), "Hashsum object not instantiated correctly"
-        else:
-            with pytest.raises(NoHashCommandAvailable):
-                Hashsum(fixture[0])
-
-    def test_provenance_string(self, mocker):
-        """Test to ensure that the string output to the PREMIS event for this
-        microservice Job is consistent with what we're expecting. Provenance
-        string includes the command called, plus the utility's version string.
-        """
-        hash_file = "metadata/checksum.md5"
-        hashsum = self.setup_hashsum(hash_file, Job("stub", "stub", ["", ""]))
-        version_string = [
-            "md5sum (GNU coreutils) 8.28",
-            "Copyright (C) 2017 Free Software Foundation, Inc.",
-        ]
-        mock = mocker.patch.object(hashsum, "_call", return_value=version_string)
-        assert (
-            hashsum.version() == "md5sum (GNU coreutils) 8.28"
-        ), "Hashsum version retrieved is incorrect"
-        mock.assert_called_once_with("--version")
-        mocker.patch.object(
-            hashsum,
-            "command_called",
-            (hashsum.COMMAND,) + ("-c", "--strict", hash_file),
-        )
-        expected_provenance = 'program="md5sum -c --strict metadata/checksum.md5"; version="md5sum (GNU coreutils) 8.28"'
-        provenance_output = hashsum.get_command_detail()
-        assert (
-            provenance_output == expected_provenance
-        ), f"Provenance output is incorrect: {provenance_output}"
-
-    def test_provenance_string_no_command(self):
-        """When nothing has happened, e.g. the checksums haven't been validated
-        then it should be practically impossible to write to the database and
-        generate some form of false-positive.
-        """
-        hash_file = "metadata/checksum.sha1"
-        hashsum = self.setup_hashsum(hash_file, Job("stub", "stub", ["", ""]))
-        try:
-            hashsum.get_command_detail()
-        except PREMISFailure:
-            pass
-
-    def test_compare_hashes_failed(self, mocker):
-        """Ensure we get consistent output when the checksum comparison fails."""
-        hash_file = "metadata/checksum.sha256"
-        job = Job("stub", "stub", ["", ""])
-        hashsum = self.setup_hashsum(hash_file, job)
-        toolname = "sha256sum"
-        objects_dir = "objects"
-        output_string = (
-            b"objects/file1.bin: OK\n"
-            b"objects/file2.bin: FAILED\n"
-            b"objects/nested/\xe3\x83\x95\xe3\x82\xa1\xe3\x82\xa4\xe3\x83\xab"
-            b"3.bin: FAILED\n"
-            b"objects/readonly.file: FAILED open or read"
-        )
-        exception_string = (
-            "sha256: comparison exited with status: 1. Please check the formatting of the checksums or integrity of the files.\n"
-            "sha256: objects/file2.bin: FAILED\n"
-            "sha256: objects/nested/ファイル3.bin: FAILED\n"
-            "sha256: objects/readonly.file: FAILED open or read"
-        )
-        mock = mocker.patch.object(hashsum, "_call", return_value=output_string)
-        mocker.patch.object(hashsum, "count_and_compare_lines", return_value=True)
-        mock.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd=toolname, output=output_string
-        )
-        ret = hashsum.compare_hashes("")
-        mock.assert_called_once_with(
-            "-c", "--strict", hash_file, transfer_dir=objects_dir
-        )
-        assert ret == 1, self.assert_return_value.format(ret)
-        assert (
-            job.get_stderr().strip() == exception_string
-        ), self.assert_exception_string
-
-    def test_compare_hashes_with_bad_files(self, mocker):
-        """Ensure that the formatting of errors is consistent if improperly
-        formatted files are provided to hashsum.
-        """
-        hash_file = "metadata/checksum.sha1"
-        job = Job("stub", "stub", ["", ""])
-        hashsum = self.setup_hashsum(hash_file, job)
-        toolname = "sha1sum"
-        objects_dir = "objects"
-        no_proper_output = (
-            b"sha1sum: metadata/checksum.sha1: no properly formatted SHA1 "
-            b"checksum lines found"
-        )
-        except_string_no_proper_out = (
-            "sha1: comparison exited with status: 1. Please check the formatting of the checksums or integrity of the files.\n"
-            "sha1: sha1sum: metadata/checksum.sha1: no properly formatted "
-            "SHA1 checksum lines found"
-        )
-        improper_formatting = b"sha1sum: WARNING: 1 line is improperly formatted"
-        except_string_improper_format = (
-            "sha1: comparison exited with status: 1. Please check the formatting of the checksums or integrity of the files.\n"
-            "sha1: sha1sum: WARNING: 1 line is improperly formatted"
+    def test_valid_initialisation(self, tmp_path, name, algorithm, ext):
+        checksum_file = _checksum_file(tmp_path, name, [])
+
+        assert checksum_file.algorithm == algorithm
+        assert checksum_file.ext == ext
+        assert checksum_file.get_event_detail() == (
+            f'program="python"; module="hashlib.{algorithm}()"'
         )
-        mock = mocker.patch.object(hashsum, "_call", return_value=no_proper_output)
-        mocker.patch.object(hashsum, "count_and_compare_lines", return_value=True)
-        mock.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd=toolname, output=no_proper_output
+
+    def test_parse_formats(self, tmp_path):
+        """The formats written by the hashsum utilities are all understood."""
+        checksum_file = _checksum_file(
+            tmp_path,
+            "checksum.md5",
+            [
+                f"{MD5_A}  file1.bin",
+                f"{MD5_B.upper()} *./nested/file2.bin",
+                f"MD5 (nested/ファイル3.bin) = {MD5_A}",
+                f"\\{MD5_B}  new\\nline\\\\.bin",
+            ],
         )
-        ret = hashsum.compare_hashes("")
-        mock.assert_called_once_with(
-            "-c", "--strict", hash_file, transfer_dir=objects_dir
+
+        assert checksum_file.improper_lines == []
+        assert checksum_file.checksums == {
+            "file1.bin": MD5_A,
+            "nested/file2.bin": MD5_B,
+            "nested/ファイル3.bin": MD5_A,
+            "new\nline\\.bin": MD5_B,
+        }
+
+    def test_parse_improper_lines(self, tmp_path):
+        checksum_file = _checksum_file(
+            tmp_path,
+            "checksum.md5",
+            [
+                f"{MD5_A}  file1.bin",
+                "",
+                f"{MD5_A[:-1]}  truncated.bin",
+                f"SHA1 (file2.bin) = {MD5_A}",
+                f"{MD5_A} file3.bin",
+                f"\\{MD5_A}  bad\\escape.bin",
+            ],
         )
-        assert (
-            job.get_stderr().strip() == except_string_no_proper_out
-        ), self.assert_exception_string
-        assert ret == 1, self.assert_return_value.format(ret)
-        # Flush job.error as it isn't flushed automatically.
-        job.error = ""
-        mock = mocker.patch.object(hashsum, "_call", return_value=improper_formatting)
-        mock.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd="sha1sum", output=improper_formatting
+
+        assert checksum_file.improper_lines == [2, 3, 4, 5, 6]
+        assert checksum_file.checksums == {"file1.bin": MD5_A}
+
+    def test_verify_reports_mismatches(self, tmp_path):
+        checksum_file = _checksum_file(
+            tmp_path,
+            "checksum.md5",
+            [
+                f"{MD5_A}  a.bin",
+                f"{MD5_A}  b.bin",
+                f"{MD5_A}  missing.bin",
+                f"{MD5_A}  unreadable.bin",
+            ],
         )
-        ret = hashsum.compare_hashes("")
-        assert (
-            job.get_stderr().strip() == except_string_improper_format
-        ), self.assert_exception_string
-        mock.assert_called_once_with(
-            "-c", "--strict", hash_file, transfer_dir=objects_dir
+        digests = _digests({"a.bin": b"a", "b.bin": b"b", "unlisted.bin": b"b"})
+        digests["unreadable.bin"] = PermissionError()
+
+        mismatches = checksum_file.verify(digests)
+
+        assert mismatches == [
+            Mismatch("b.bin", MD5_A, MD5_B),
+            Mismatch("missing.bin", MD5_A, None),
+            Mismatch("unlisted.bin", None, MD5_B),
+            Mismatch("unreadable.bin", MD5_A, None),
+        ]
+        assert [str(mismatch) for mismatch in mismatches] == [
+            f"objects/b.bin: FAILED (expected {MD5_A}, computed {MD5_B})",
+            "objects/missing.bin: FAILED open or read",
+            "objects/unlisted.bin: not listed in the checksum file",
+            "objects/unreadable.bin: FAILED open or read",
+        ]
+        assert checksum_file.verify(_digests({"a.bin": b"a"})) == [
+            Mismatch("b.bin", MD5_A, None),
+            Mismatch("missing.bin", MD5_A, None),
+            Mismatch("unreadable.bin", MD5_A, None),
+        ]
+
+
+@pytest.fixture
+def transfer_dir(tmp_path, db):
+    transfer = Transfer.objects.create(
+        uuid=uuid.uuid4(), currentlocation=r"%transferDirectory%"
+    )
+    (tmp_path / "objects" / "nested").mkdir(parents=True)
+    (tmp_path / "metadata").mkdir()
+    for name, content in [("a.bin", b"a"), ("nested/b.bin", b"b")]:
+        (tmp_path / "objects" / name).write_bytes(content)
+        File.objects.create(
+            uuid=uuid.uuid4(),
+            transfer=transfer,
+            currentlocation=f"%transferDirectory%objects/{name}",
         )
-        assert ret == 1, self.assert_return_value.format(ret)
+    return tmp_path, transfer
 
-    def test_line_comparison_fail(self, mocker):
-        """If the checksum line and object comparison function fails then
-        we want to return early and _call shouldn't be called.
-        """
-        hash_file = "metadata/checksum.sha1"
-        hashsum = self.setup_hashsum(hash_file, Job("stub", "stub", ["", ""]))
-        toolname = "sha1sum"
-        mock = mocker.patch.object(hashsum, "_call", return_value=None)
-        mocker.patch.object(hashsum, "count_and_compare_lines", return_value=False)
-        mock.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd=toolname, output=None
+
+def test_call_verifies_checksum_files(transfer_dir, mocker):
+    path, transfer = transfer_dir
+    (path / "metadata" / "checksum.md5").write_text(
+        f"{MD5_A}  a.bin\n{MD5_B}  nested/b.bin\n"
+    )
+    (path / "metadata" / "checksum.sha1").write_text(
+        "{}  a.bin\n{}  nested/b.bin\n".format(
+            hashlib.sha1(b"a").hexdigest(), hashlib.sha1(b"a").hexdigest()
         )
-        ret = hashsum.compare_hashes("")
-        mock.assert_not_called()
-        assert ret == 1, self.assert_return_value.format(ret)
+    )
+    hash_file = mocker.spy(hashing, "hash_file")
+    job = Job("stub", "stub", [f"{path}/", str(transfer.uuid)])
 
-    @pytest.mark.parametrize(
-        "fixture",
-        [
-            ("checksum.md5", "md5"),
-            ("checksum.sha1", "sha1"),
-            ("checksum.sha256", "sha256"),
-            ("checksum_md5", "checksum_md5"),
-            ("checksum_sha1", "checksum_sha1"),
-            ("checksum_sha256", "checksum_sha256"),
-        ],
+    verify_checksum.call([job])
+
+    # Every file is read once for both algorithms.
+    assert hash_file.call_count == 2
+    assert {frozenset(call.args[1]) for call in hash_file.call_args_list} == {
+        frozenset(["md5", "sha1"])
+    }
+    assert job.get_exit_code() == 1
+    assert job.get_stdout().strip() == "md5: Comparison was OK"
+    assert "sha1: objects/nested/b.bin: FAILED" in job.get_stderr()
+    events = Event.objects.filter(file_uuid__transfer=transfer)
+    assert {event.event_detail for event in events} == {
+        'program="python"; module="hashlib.md5()"'
+    }
+    assert len(events) == 2
+
+
+def test_call_reuses_stored_digests(transfer_dir, mocker):
+    path, transfer = transfer_dir
+    (path / "metadata" / "checksum.md5").write_text(
+        f"{MD5_A}  a.bin\n{MD5_B}  nested/b.bin\n"
+    )
+    hashing.digest_files(
+        {
+            file_obj.uuid: str(path / file_obj.currentlocation.split("%", 2)[2])
+            for file_obj in File.objects.filter(transfer=transfer)
+        },
+        ["md5", "sha256"],
     )
-    def test_get_ext(self, fixture):
-        """get_ext helps to format usefully."""
-        assert (
-            Hashsum.get_ext(fixture[0]) == fixture[1]
-        ), "Incorrect extension returned from Hashsum"
+    hash_file = mocker.spy(hashing, "hash_file")
+    job = Job("stub", "stub", [f"{path}/", str(transfer.uuid)])
 
-    @staticmethod
-    def test_decode_and_version_string():
-        """Test that we can separate the version and license information
-        correctly from {command} --version.
-        """
-        version_string = (
-            b"sha256sum (GNU coreutils) 8.28\n"
-            b"Copyright (C) 2017 Free Software Foundation, Inc."
-        )
-        assert Hashsum._decode(version_string)[
-            0
-        ], "Version string incorrectly decoded by Hashsum"
-        assert (
-            Hashsum._decode(version_string)[0] == "sha256sum (GNU coreutils) 8.28"
-        ), "Invalid version string decoded by Hashsum"
+    verify_checksum.call([job])
+
+    hash_file.assert_not_called()
+    assert job.get_exit_code() == 0
+
+
+class TestPREMISEvents:
+    """Tests of the PREMIS events written by the job."""
 
     @staticmethod
     @pytest.fixture(scope="class")
@@ -145,3 +145,59 @@ class TestDatabaseFunctions(TestCase):
         assert agents.count() == 2
         assert agents.get(id=1)
         assert agents.get(id=2)
+
+    # EventWriter
+
+    def test_event_writer_buffers_events(self):
+        writer = databaseFunctions.EventWriter()
+        writer.add(
+            fileUUID="88c8f115-80bc-4da4-a1e6-0158f5df13b9",
+            eventIdentifierUUID="1f2b4c1e-81ec-11ea-a1b3-5b4f1f4e2c6a",
+            eventType="validation",
+        )
+        writer.add(
+            fileUUID="88c8f115-80bc-4da4-a1e6-0158f5df13b9",
+            eventIdentifierUUID="2b9f8e3a-81ec-11ea-9d4a-4f0b7c1d8e2f",
+            agents=[1],
+        )
+        assert len(writer) == 2
+        assert Event.objects.filter(event_type="validation").count() == 0
+
+        writer.flush()
+
+        assert len(writer) == 0
+        event = Event.objects.get(event_id="1f2b4c1e-81ec-11ea-a1b3-5b4f1f4e2c6a")
+        assert event.event_type == "validation"
+        assert sorted(event.agents.values_list("pk", flat=True)) == [1, 2]
+        event = Event.objects.get(event_id="2b9f8e3a-81ec-11ea-9d4a-4f0b7c1d8e2f")
+        assert list(event.agents.values_list("pk", flat=True)) == [1]
+
+    def test_event_writer_flushes_when_full_and_on_exit(self):
+        with databaseFunctions.EventWriter(max_events=2) as writer:
+            for _ in range(3):
+                writer.add(
+                    fileUUID="88c8f115-80bc-4da4-a1e6-0158f5df13b9",
+                    eventType="message digest calculation",
+                )
+            assert len(writer) == 1
+            assert (
+                Event.objects.filter(event_type="message digest calculation").count()
+                == 2
+            )
+
+        events = Event.objects.filter(event_type="message digest calculation")
+        assert events.count() == 3
+        for event in events:
+            assert event.agents.count() == 2
+
+    def test_event_writer_resolves_agents_once_per_unit(self):
+        writer = databaseFunctions.EventWriter()
+        for _ in range(3):
+            writer.add(fileUUID="88c8f115-80bc-4da4-a1e6-0158f5df13b9")
+        writer.flush()
+        assert len(writer.unit_agents) == 1
+
+        writer.add(fileUUID="88c8f115-80bc-4da4-a1e6-0158f5df13b9")
+        # Files, events and their IDs, event agents and the savepoint.
+        with self.assertNumQueries(6):
+            writer.flush()
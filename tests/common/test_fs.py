@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from a3m import fs
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "objects" / "subdir" / "empty").mkdir(parents=True)
+    (tmp_path / "objects" / "file.txt").touch()
+    (tmp_path / "objects" / "subdir" / "nested.txt").touch()
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "log.txt").touch()
+    (tmp_path / "link").symlink_to(tmp_path / "logs")
+    return tmp_path
+
+
+@pytest.mark.parametrize("threads", [0, 4])
+@pytest.mark.parametrize("topdown", [True, False])
+def test_walk_matches_os_walk(tree, threads, topdown):
+    snapshot = fs.scan(str(tree), threads=threads)
+
+    assert list(snapshot.walk(topdown=topdown)) == list(
+        os.walk(str(tree), topdown=topdown)
+    )
+    assert list(snapshot.walk(str(tree / "objects"))) == list(
+        os.walk(str(tree / "objects"))
+    )
+
+
+def test_walk_can_be_pruned(tree):
+    snapshot = fs.scan(str(tree))
+
+    paths = []
+    for dirpath, dirnames, _ in snapshot.walk():
+        paths.append(dirpath)
+        if "objects" in dirnames:
+            dirnames.remove("objects")
+
+    assert paths == [str(tree), str(tree / "logs")]
+
+
+def test_snapshot_files_and_dirs(tree):
+    snapshot = fs.scan(tree, threads=0)
+
+    assert list(snapshot.files(str(tree / "objects"))) == [
+        str(tree / "objects" / "file.txt"),
+        str(tree / "objects" / "subdir" / "nested.txt"),
+    ]
+    assert list(snapshot.dirs(str(tree / "objects"))) == [
+        str(tree / "objects"),
+        str(tree / "objects" / "subdir"),
+        str(tree / "objects" / "subdir" / "empty"),
+    ]
+    assert snapshot.entry(tree / "objects" / "file.txt").is_file()
+    assert snapshot.entry(tree / "link").is_symlink()
+    assert snapshot.entry(tree / "missing") is None
+
+
+def test_snapshot_is_not_updated(tree):
+    snapshot = fs.scan(str(tree), threads=0)
+    (tree / "logs" / "new.txt").touch()
+
+    assert str(tree / "logs" / "new.txt") not in snapshot.files()
+
+
+def test_scan_missing_directory(tmp_path):
+    snapshot = fs.scan(str(tmp_path / "missing"), threads=0)
+
+    assert list(snapshot.walk()) == []
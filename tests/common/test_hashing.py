@@ -0,0 +1,87 @@
+import hashlib
+import os
+import uuid
+
+import pytest
+
+from a3m import hashing
+from a3m.main.models import File
+from a3m.main.models import FileDigest
+from a3m.main.models import Transfer
+
+
+@pytest.fixture
+def file_obj(db):
+    transfer = Transfer.objects.create(
+        uuid=uuid.uuid4(), currentlocation=r"%transferDirectory%"
+    )
+    return File.objects.create(
+        uuid=str(uuid.uuid4()),
+        transfer=transfer,
+        currentlocation="%transferDirectory%objects/file.txt",
+    )
+
+
+def test_hash_file_computes_every_digest(tmp_path, mocker):
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"a" * 3000000)
+    get_file_checksums = mocker.spy(hashing, "get_file_checksums")
+
+    result = hashing.hash_file(path, ["md5", "sha256"])
+
+    get_file_checksums.assert_called_once()
+    assert result.size == 3000000
+    assert result.mtime_ns == os.stat(path).st_mtime_ns
+    assert result.digests == {
+        "md5": hashlib.md5(b"a" * 3000000).hexdigest(),
+        "sha256": hashlib.sha256(b"a" * 3000000).hexdigest(),
+    }
+
+
+def test_checksum_file_algorithms(tmp_path):
+    (tmp_path / "metadata").mkdir()
+    (tmp_path / "metadata" / "checksum.sha1").touch()
+    (tmp_path / "metadata" / "checksum.md5").touch()
+
+    assert hashing.checksum_file_algorithms(tmp_path) == ["md5", "sha1"]
+    assert hashing.checksum_file_algorithms(tmp_path / "missing") == []
+
+
+def test_digest_files_reuses_stored_digests(tmp_path, file_obj, mocker):
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"abc")
+    hash_file = mocker.spy(hashing, "hash_file")
+
+    result = hashing.digest_files({file_obj.uuid: path}, ["sha256"])[file_obj.uuid]
+    assert result.digests == {"sha256": hashlib.sha256(b"abc").hexdigest()}
+    assert FileDigest.objects.filter(file=file_obj).count() == 1
+
+    # The file is unchanged.
+    assert hashing.digest_files({file_obj.uuid: path}, ["sha256"]) == {
+        file_obj.uuid: result
+    }
+    assert hash_file.call_count == 1
+
+    # A new algorithm is needed.
+    result = hashing.digest_files({file_obj.uuid: path}, ["md5"])[file_obj.uuid]
+    assert hash_file.call_args.args[1] == {"md5", "sha256"}
+    assert set(result.digests) == {"md5", "sha256"}
+    assert FileDigest.objects.filter(file=file_obj).count() == 2
+
+    # The file was modified.
+    path.write_bytes(b"abcd")
+    os.utime(path, ns=(0, 0))
+    result = hashing.digest_files({file_obj.uuid: path}, ["sha256"])[file_obj.uuid]
+    assert result.digests == {"sha256": hashlib.sha256(b"abcd").hexdigest()}
+    assert result.mtime_ns == 0
+    assert hash_file.call_count == 3
+    assert FileDigest.objects.filter(file=file_obj).count() == 1
+
+
+def test_digest_files_returns_errors(tmp_path, file_obj):
+    results = hashing.digest_files(
+        {file_obj.uuid: tmp_path / "missing"}, ["sha256"], threads=2
+    )
+
+    assert isinstance(results[file_obj.uuid], FileNotFoundError)
+    assert not FileDigest.objects.exists()
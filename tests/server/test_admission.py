@@ -0,0 +1,123 @@
+import queue
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from a3m.api.transferservice.v1beta1.request_response_pb2 import PACKAGE_PRIORITY_HIGH
+from a3m.api.transferservice.v1beta1.request_response_pb2 import PACKAGE_PRIORITY_LOW
+from a3m.api.transferservice.v1beta1.request_response_pb2 import ProcessingConfig
+from a3m.server.admission import create_admission_queue
+from a3m.server.admission import parse_submitter_weights
+from a3m.server.packages import Package
+
+
+def create_job(name, priority=0, submitter="", estimated_size=None):
+    package = SimpleNamespace(
+        uuid=name,
+        priority=priority,
+        submitter=submitter,
+        estimated_size=estimated_size,
+    )
+    return SimpleNamespace(name=name, package=package)
+
+
+def drain(admission_queue):
+    names = []
+    while True:
+        try:
+            names.append(admission_queue.get_nowait().name)
+        except queue.Empty:
+            return names
+
+
+def test_fifo_admission_honors_priority():
+    admission_queue = create_admission_queue("fifo")
+    admission_queue.put(create_job("a"))
+    admission_queue.put(create_job("b", priority=PACKAGE_PRIORITY_LOW))
+    admission_queue.put(create_job("c", priority=PACKAGE_PRIORITY_HIGH))
+    admission_queue.put(create_job("d"))
+
+    assert drain(admission_queue) == ["c", "a", "d", "b"]
+
+
+def test_admission_queue_admits_unknown_priorities(settings):
+    settings.PROMETHEUS_ENABLED = True
+    admission_queue = create_admission_queue("fifo")
+    admission_queue.put(create_job("a", priority=99))
+
+    assert drain(admission_queue) == ["a"]
+
+
+def test_admission_queue_is_bounded():
+    admission_queue = create_admission_queue("fifo", maxsize=1)
+    admission_queue.put_nowait(create_job("a"))
+
+    with pytest.raises(queue.Full):
+        admission_queue.put_nowait(create_job("b"))
+
+
+def test_fair_share_admission():
+    admission_queue = create_admission_queue(
+        "fair_share", submitter_weights="alice:2, bob:1"
+    )
+    for item in range(4):
+        admission_queue.put(create_job(f"alice-{item}", submitter="alice"))
+    for item in range(2):
+        admission_queue.put(create_job(f"bob-{item}", submitter="bob"))
+
+    assert drain(admission_queue) == [
+        "alice-0",
+        "alice-1",
+        "bob-0",
+        "alice-2",
+        "alice-3",
+        "bob-1",
+    ]
+
+
+def test_shortest_first_admission():
+    admission_queue = create_admission_queue("shortest_first")
+    admission_queue.put(create_job("large", estimated_size=200000))
+    admission_queue.put(create_job("unknown"))
+    admission_queue.put(create_job("small", estimated_size=10))
+    admission_queue.put(create_job("urgent", 3, estimated_size=200000))
+
+    assert drain(admission_queue) == ["urgent", "small", "large", "unknown"]
+
+
+def test_unknown_admission_policy():
+    with pytest.raises(ValueError):
+        create_admission_queue("random")
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("", {}),
+        ("alice:2, bob:0.5", {"alice": 2.0, "bob": 0.5}),
+        ("alice, bob:0, carol:x, dave:3", {"dave": 3.0}),
+    ],
+)
+def test_parse_submitter_weights(value, expected):
+    assert parse_submitter_weights(value) == expected
+
+
+def test_package_estimated_size(tmp_path):
+    def create_package(url):
+        unit = SimpleNamespace(pk="abc", currentlocation=None)
+        return Package("name", url, ProcessingConfig(), unit, unit)
+
+    directory = tmp_path / "transfer"
+    (directory / "subdir").mkdir(parents=True)
+    (directory / "one.txt").write_text("one")
+    (directory / "subdir" / "two.txt").write_text("two")
+    assert create_package(f"file://{directory}").estimated_size == 2
+
+    archive = tmp_path / "transfer.zip"
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        for item in range(3):
+            zip_file.writestr(f"{item}.txt", "contents")
+    assert create_package(f"file://{archive}").estimated_size == 3
+
+    assert create_package("https://example.com/transfer.zip").estimated_size is None
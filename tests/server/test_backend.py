@@ -1,9 +1,19 @@
+import asyncio
+import os
+import threading
+import uuid
+
 import pytest
 
+from a3m.api.tasks.v1beta1.batch_pb2 import TaskBatch
 from a3m.server.jobs import Job
+from a3m.server.jobs.client import CommandTemplate
 from a3m.server.tasks import get_task_backend
 from a3m.server.tasks import Task
 from a3m.server.tasks import TaskBackend
+from a3m.server.tasks.backends.pool_backend import PoolTaskBackend
+from a3m.server.tasks.backends.pool_backend import PoolTaskBatch
+from a3m.server.tasks.backends.process_pool_backend import WorkerPoolExecutor
 
 
 class MockJob(Job):
@@ -20,8 +30,7 @@ def simple_job(request, mocker):
     return MockJob(mocker.Mock(), mocker.Mock(), mocker.Mock(), name="test_v0.0")
 
 
-@pytest.fixture
-def simple_task(request):
+def create_task():
     return Task(
         "command",
         "a argument string",
@@ -32,6 +41,19 @@ def simple_task(request):
     )
 
 
+@pytest.fixture
+def simple_task(request):
+    return create_task()
+
+
+def task_ids(batch_payload):
+    batch = TaskBatch.FromString(batch_payload)
+    return [
+        str(uuid.UUID(bytes=batch.task_ids[offset : offset + 16]))
+        for offset in range(0, len(batch.task_ids), 16)
+    ]
+
+
 def format_result(task_results):
     """Accepts task results as a tuple of (uuid, result_dict)."""
     response = {"task_results": {}}
@@ -47,24 +69,25 @@ def format_result(task_results):
 # test_gearman_task_result_error
 
 
-def test_multiple_batches(simple_job, simple_task, mocker):
+def test_multiple_batches(simple_job, mocker):
     mocker.patch("a3m.server.tasks.backends.pool_backend.Task.bulk_log")
     mocker.patch("a3m.server.tasks.backends.pool_backend.Task.write_output")
     mocker.patch("a3m.server.tasks.backends.pool_backend.init_counter_labels")
     mocker.patch.object(TaskBackend, "TASK_BATCH_SIZE", 2)
 
-    def execute_command(task_name: str, batch_payload):
+    def execute_command(task_name: str, batch_payload, on_task_result=None):
         assert task_name == "test_v0.0"
-        return {
-            "task_results": {
-                task_id: {
-                    "exitCode": 0,
-                    "stdout": "stdout example",
-                    "stderr": "stderr example",
-                }
-                for task_id, task in batch_payload["tasks"].items()
+        results = {
+            task_id: {
+                "exitCode": 0,
+                "stdout": "stdout example",
+                "stderr": "stderr example",
             }
+            for task_id in task_ids(batch_payload)
         }
+        for task_id, task_result in results.items():
+            on_task_result(task_id, task_result)
+        return {"task_results": results}
 
     execute_command = mocker.patch(
         "a3m.server.tasks.backends.pool_backend.execute_command",
@@ -74,7 +97,7 @@ def test_multiple_batches(simple_job, simple_task, mocker):
     backend = get_task_backend()
 
     for item in range(3):
-        backend.submit_task(simple_job, simple_task)
+        backend.submit_task(simple_job, create_task())
 
     results = list(backend.wait_for_results(simple_job))
     assert execute_command.call_count == 2
@@ -85,3 +108,174 @@ def test_multiple_batches(simple_job, simple_task, mocker):
     assert results[1].exit_code == 0
     assert results[2].done is True
     assert results[2].exit_code == 0
+
+
+def test_worker_pool_executor_recycles_workers():
+    executor = WorkerPoolExecutor(max_workers=1, max_batches_per_worker=1)
+    try:
+        futures = [executor.submit(os.getpid) for item in range(3)]
+        pids = [future.result(timeout=60) for future in futures]
+    finally:
+        executor.shutdown(wait=True)
+
+    assert os.getpid() not in pids
+    assert len(set(pids)) == 3
+
+
+def test_task_results_are_streamed(simple_job, mocker):
+    mocker.patch("a3m.server.tasks.backends.pool_backend.Task.bulk_log")
+    mocker.patch("a3m.server.tasks.backends.pool_backend.Task.write_output")
+    mocker.patch("a3m.server.tasks.backends.pool_backend.init_counter_labels")
+    mocker.patch.object(TaskBackend, "TASK_BATCH_SIZE", 2)
+
+    backend = get_task_backend()
+    tasks = [create_task(), create_task()]
+    first_task_id = str(tasks[0].uuid)
+    first_task_received = threading.Event()
+
+    def execute_command(task_name: str, batch_payload, on_task_result=None):
+        on_task_result(first_task_id, {"exitCode": 0})
+        # Block the batch until the first result has been consumed.
+        assert first_task_received.wait(timeout=5)
+        return {
+            "task_results": {
+                task_id: {"exitCode": 0 if task_id == first_task_id else 1}
+                for task_id in task_ids(batch_payload)
+            }
+        }
+
+    mocker.patch(
+        "a3m.server.tasks.backends.pool_backend.execute_command",
+        side_effect=execute_command,
+    )
+
+    for task in tasks:
+        backend.submit_task(simple_job, task)
+
+    results = backend.wait_for_results(simple_job)
+    first_result = next(results)
+    first_task_received.set()
+    remaining_results = list(results)
+
+    assert first_result is tasks[0]
+    assert first_result.exit_code == 0
+    assert remaining_results == [tasks[1]]
+    assert remaining_results[0].exit_code == 1
+
+
+def test_task_results_are_reported_once(simple_job, mocker):
+    mocker.patch("a3m.server.tasks.backends.pool_backend.Task.bulk_log")
+    mocker.patch("a3m.server.tasks.backends.pool_backend.Task.write_output")
+    mocker.patch("a3m.server.tasks.backends.pool_backend.init_counter_labels")
+    mocker.patch.object(TaskBackend, "TASK_BATCH_SIZE", 2)
+
+    def execute_command(task_name: str, batch_payload, on_task_result=None):
+        ids = task_ids(batch_payload)
+        for task_id in ids:
+            on_task_result(task_id, {"exitCode": 0})
+        # The exit code of the first task changed after it was reported.
+        results = {task_id: {"exitCode": 0} for task_id in ids}
+        results[ids[0]] = {"exitCode": 1}
+        return {"task_results": results}
+
+    mocker.patch(
+        "a3m.server.tasks.backends.pool_backend.execute_command",
+        side_effect=execute_command,
+    )
+
+    backend = get_task_backend()
+    tasks = [create_task(), create_task()]
+    for task in tasks:
+        backend.submit_task(simple_job, task)
+
+    results = list(backend.wait_for_results(simple_job))
+
+    assert sorted(results, key=tasks.index) == tasks
+    assert [task.exit_code for task in tasks] == [1, 0]
+
+
+def test_task_results_are_delivered_to_event_loop(simple_job, mocker):
+    mocker.patch("a3m.server.tasks.backends.pool_backend.Task.bulk_log")
+    mocker.patch("a3m.server.tasks.backends.pool_backend.Task.write_output")
+    mocker.patch("a3m.server.tasks.backends.pool_backend.init_counter_labels")
+    mocker.patch.object(TaskBackend, "TASK_BATCH_SIZE", 2)
+
+    def execute_command(task_name: str, batch_payload, on_task_result=None):
+        results = {task_id: {"exitCode": 0} for task_id in task_ids(batch_payload)}
+        for task_id, task_result in results.items():
+            on_task_result(task_id, task_result)
+        return {"task_results": results}
+
+    mocker.patch(
+        "a3m.server.tasks.backends.pool_backend.execute_command",
+        side_effect=execute_command,
+    )
+
+    async def wait_for_results(backend):
+        backend.attach_event_loop(asyncio.get_running_loop())
+        tasks = [create_task() for item in range(3)]
+        for task in tasks:
+            backend.submit_task(simple_job, task)
+        results = [task async for task in backend.wait_for_results_async(simple_job)]
+        return tasks, results
+
+    backend = PoolTaskBackend()
+    try:
+        tasks, results = asyncio.run(wait_for_results(backend))
+    finally:
+        backend.shutdown()
+
+    assert sorted(results, key=tasks.index) == tasks
+    assert all(task.done and task.exit_code == 0 for task in results)
+
+
+def test_batch_is_serialized_in_columns():
+    template = CommandTemplate(
+        '"%relativeLocation%" "%fileUUID%" "%SIPUUID%" --date "%date%"',
+        {r"%relativeLocation%": "/sip/", r"%SIPUUID%": "sip-uuid"},
+    )
+    batch = PoolTaskBatch(max_size=2)
+    for file_uuid in ("file-1", "file-2"):
+        file_replacements = {
+            r"%relativeLocation%": f"/sip/objects/{file_uuid}",
+            r"%fileUUID%": file_uuid,
+        }
+        batch.add_task(
+            Task(
+                "command",
+                template.render(file_replacements),
+                None,
+                None,
+                file_replacements,
+                arguments_template=template,
+            )
+        )
+
+    payload = TaskBatch.FromString(batch.serialize())
+
+    assert task_ids(payload.SerializeToString()) == [
+        str(task.uuid) for task in batch.tasks
+    ]
+    assert not payload.command_lines
+    assert [list(argument.literals) for argument in payload.arguments] == [
+        ["", ""],
+        ["", ""],
+        ["sip-uuid"],
+        ["--date"],
+        ["", ""],
+    ]
+    assert [list(column.values) for column in payload.columns] == [
+        ["/sip/objects/file-1", "/sip/objects/file-2"],
+        ["file-1", "file-2"],
+    ]
+    assert payload.arguments[4].variables[0].name == "%date%"
+
+
+def test_batch_falls_back_to_command_lines(simple_task):
+    batch = PoolTaskBatch(max_size=1)
+    batch.add_task(simple_task)
+
+    payload = TaskBatch.FromString(batch.serialize())
+
+    assert list(payload.command_lines) == ["a argument string"]
+    assert not payload.arguments
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from a3m.server.tasks.backends.batching import BatchSizer
+
+
+def test_batch_sizer_uses_default_when_disabled():
+    sizer = BatchSizer(target_time=None)
+    sizer.observe("normalize_v1.0", 10, 100.0)
+
+    assert sizer.batch_size("normalize_v1.0", 128) == 128
+
+
+def test_batch_sizer_uses_default_for_unknown_scripts():
+    sizer = BatchSizer(target_time=10)
+
+    assert sizer.batch_size("normalize_v1.0", 128) == 128
+
+
+def test_batch_sizer_adapts_to_script_latency():
+    sizer = BatchSizer(target_time=10, max_batch_size=1000)
+    sizer.observe("normalize_v1.0", 10, 100.0)
+    sizer.observe("update_size_and_checksum_v0.0", 100, 0.1)
+
+    assert sizer.batch_size("normalize_v1.0", 128) == 1
+    assert sizer.batch_size("update_size_and_checksum_v0.0", 128) == 1000
+
+
+def test_batch_sizer_smooths_observations():
+    sizer = BatchSizer(target_time=10)
+    sizer.observe("identify_file_format_v0.0", 10, 10.0)
+    sizer.observe("identify_file_format_v0.0", 10, 20.0)
+
+    # 0.3 * 2.0 + 0.7 * 1.0 = 1.3 seconds per task.
+    assert sizer.batch_size("identify_file_format_v0.0", 128) == 7
+
+
+@pytest.mark.parametrize(
+    "min_task_time,max_task_time",
+    [(0.05, 0.15), (0.5, 1.5), (20.0, 40.0)],
+    ids=["cheap", "moderate", "expensive"],
+)
+def test_batch_sizer_converges_for_tasks_of_differing_cost(
+    min_task_time, max_task_time
+):
+    target_time = 10
+    overhead = 0.5
+    sizer = BatchSizer(target_time=target_time)
+    rng = random.Random(1)
+
+    durations = []
+    for _ in range(30):
+        size = sizer.batch_size("script", 128)
+        duration = overhead + sum(
+            rng.uniform(min_task_time, max_task_time) for _ in range(size)
+        )
+        sizer.observe("script", size, duration)
+        durations.append(duration)
+
+    # Batches take about the target time, unless a single task takes longer.
+    expected = max(target_time, overhead + max_task_time)
+    for duration in durations[-10:]:
+        assert duration <= expected * 1.3
+    if max_task_time < target_time:
+        assert sum(durations[-10:]) / 10 == pytest.approx(target_time, rel=0.15)
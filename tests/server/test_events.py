@@ -0,0 +1,93 @@
+import queue
+
+import pytest
+
+from a3m.api.transferservice.v1beta1.request_response_pb2 import Job
+from a3m.api.transferservice.v1beta1.request_response_pb2 import (
+    PACKAGE_STATUS_COMPLETE,
+)
+from a3m.api.transferservice.v1beta1.request_response_pb2 import (
+    PACKAGE_STATUS_PROCESSING,
+)
+from a3m.server.events import PACKAGE_DONE
+from a3m.server.events import PackageEvents
+from a3m.server.events import Subscription
+from a3m.server.packages import PackageStatus
+from a3m.server.transfer_service import TransferService
+
+
+class FakeContext:
+    def __init__(self, active=True):
+        self.active = active
+
+    def is_active(self):
+        return self.active
+
+    def abort(self, code, details):
+        raise Exception(details)
+
+
+def test_package_events():
+    events = PackageEvents()
+    subscription = events.subscribe("abc", Subscription())
+    other_subscription = events.subscribe("def", Subscription())
+
+    events.publish("abc", "job")
+    events.package_done("abc")
+    events.unsubscribe("abc", subscription)
+    events.publish("abc", "ignored")
+
+    assert subscription.get(timeout=0) == "job"
+    assert subscription.get(timeout=0) is PACKAGE_DONE
+    with pytest.raises(queue.Empty):
+        subscription.get(timeout=0)
+    with pytest.raises(queue.Empty):
+        other_subscription.get(timeout=0)
+    assert "abc" not in events.subscriptions
+
+
+def test_watch_streams_job_events(mocker):
+    events = PackageEvents()
+    mocker.patch("a3m.server.transfer_service.package_events", events)
+    jobs = [Job(id="1", name="Job 1"), Job(id="2", name="Job 2")]
+    calls = []
+
+    def get_package_status(package_queue, package_id):
+        calls.append(package_id)
+        if len(calls) > 1:
+            return PackageStatus(status=PACKAGE_STATUS_COMPLETE, jobs=jobs)
+        # The package makes progress once the client is subscribed.
+        for job in jobs:
+            events.publish(package_id, job)
+        events.package_done(package_id)
+        return PackageStatus(status=PACKAGE_STATUS_PROCESSING)
+
+    mocker.patch(
+        "a3m.server.transfer_service.get_package_status",
+        side_effect=get_package_status,
+    )
+    service = TransferService(None, None, None)
+
+    responses = list(service.Watch(mocker.Mock(id="abc"), FakeContext()))
+
+    assert [resp.status for resp in responses] == [
+        PACKAGE_STATUS_PROCESSING,
+        PACKAGE_STATUS_PROCESSING,
+        PACKAGE_STATUS_COMPLETE,
+    ]
+    assert [resp.job.id for resp in responses[:2]] == ["1", "2"]
+    assert list(responses[-1].jobs) == jobs
+    assert not events.subscriptions
+
+
+def test_watch_stops_when_client_leaves(mocker):
+    mocker.patch(
+        "a3m.server.transfer_service.get_package_status",
+        return_value=PackageStatus(status=PACKAGE_STATUS_PROCESSING),
+    )
+    service = TransferService(None, None, None)
+    service.WATCH_POLL_INTERVAL = 0
+
+    responses = list(service.Watch(mocker.Mock(id="abc"), FakeContext(False)))
+
+    assert responses == []
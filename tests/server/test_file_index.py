@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from a3m.server.file_index import FileIndex
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "objects" / "subdir").mkdir(parents=True)
+    (tmp_path / "objects" / "file.txt").touch()
+    (tmp_path / "objects" / "subdir" / "nested.txt").touch()
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "log.txt").touch()
+    (tmp_path / "link").symlink_to(tmp_path / "logs")
+    return tmp_path
+
+
+def _age(*paths):
+    """Backdate the modification time of directories so they're indexed."""
+    for path in paths:
+        os.utime(path, (1000000000, 1000000000))
+
+
+def _os_walk(top):
+    return [
+        os.path.join(basedir, file_name)
+        for basedir, _, files in os.walk(top)
+        for file_name in files
+    ]
+
+
+def test_walk_matches_os_walk(tree):
+    file_index = FileIndex()
+
+    assert file_index.walk(str(tree)) == _os_walk(str(tree))
+    assert file_index.walk(str(tree / "missing")) == []
+
+
+def test_walk_reuses_unchanged_listings(tree, mocker):
+    _age(tree, tree / "objects", tree / "objects" / "subdir", tree / "logs")
+    file_index = FileIndex()
+    paths = file_index.walk(str(tree))
+    scandir = mocker.spy(os, "scandir")
+
+    assert file_index.walk(str(tree)) == paths
+    assert scandir.call_count == 0
+
+    (tree / "objects" / "subdir" / "new.txt").touch()
+
+    assert str(tree / "objects" / "subdir" / "new.txt") in file_index.walk(str(tree))
+    assert scandir.call_count == 1
+
+
+def test_walk_skips_recently_modified_listings(tree):
+    file_index = FileIndex()
+    file_index.walk(str(tree))
+
+    assert str(tree) not in file_index.listings
+
+    _age(tree)
+    file_index.walk(str(tree))
+
+    assert str(tree) in file_index.listings
+
+
+def test_walk_forgets_removed_directories(tree):
+    _age(tree / "objects", tree / "objects" / "subdir")
+    file_index = FileIndex()
+    file_index.walk(str(tree / "objects"))
+    assert str(tree / "objects" / "subdir") in file_index.listings
+
+    (tree / "objects" / "subdir" / "nested.txt").unlink()
+    (tree / "objects" / "subdir").rmdir()
+
+    assert file_index.walk(str(tree / "objects")) == [
+        str(tree / "objects" / "file.txt")
+    ]
+    assert str(tree / "objects" / "subdir") not in file_index.listings
+
+
+def test_verify_detects_stale_listings(tree):
+    _age(tree / "logs")
+    file_index = FileIndex()
+    file_index.walk(str(tree / "logs"))
+    # Simulate a change that the modification time doesn't reflect.
+    (tree / "logs" / "new.txt").touch()
+    _age(tree / "logs")
+
+    paths = file_index.walk(str(tree / "logs"))
+    assert str(tree / "logs" / "new.txt") not in paths
+
+    paths = file_index.verify(str(tree / "logs"), paths)
+    assert str(tree / "logs" / "new.txt") in paths
+    assert not file_index.listings
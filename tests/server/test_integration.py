@@ -1,3 +1,4 @@
+import asyncio
 import concurrent.futures
 import os
 import threading
@@ -13,6 +14,7 @@ from a3m.server.jobs import FilesClientScriptJob
 from a3m.server.jobs import JobChain
 from a3m.server.jobs import NextLinkDecisionJob
 from a3m.server.packages import Package
+from a3m.server.queues import AsyncPackageQueue
 from a3m.server.queues import PackageQueue
 from a3m.server.tasks import TaskBackend
 from a3m.server.workflow import load as load_workflow
@@ -204,3 +206,50 @@ def test_workflow_integration(
 
     # Workflow is over; we're done
     assert package_queue.job_queue.qsize() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_workflow_integration_async(
+    mocker,
+    settings,
+    tmp_path,
+    workflow,
+    package,
+    dummy_file_replacements,
+):
+    echo_backend = EchoBackend()
+    settings.SHARED_DIRECTORY = str(tmp_path)
+    settings.PROCESSING_DIRECTORY = str(tmp_path / "processing")
+    mocker.patch.dict(
+        "a3m.server.packages.BASE_REPLACEMENTS",
+        {r"%processingDirectory%": settings.PROCESSING_DIRECTORY},
+    )
+    mocker.patch("a3m.server.jobs.client.get_task_backend", return_value=echo_backend)
+    mocker.patch.object(package, "files", return_value=dummy_file_replacements)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    package_queue = AsyncPackageQueue(executor, threading.Event(), debug=True)
+
+    initiator_link = workflow.get_initiator()
+    package_queue.schedule_job(next(JobChain(package, workflow, initiator_link)))
+
+    async def process_package():
+        work = asyncio.ensure_future(package_queue.work_async())
+        while package_queue.is_package_active(package.uuid):
+            await asyncio.sleep(0.05)
+        package_queue.stop()
+        await work
+
+    asyncio.run(asyncio.wait_for(process_package(), timeout=30))
+
+    # Every client script job of the chain ran and the package is done.
+    assert len(echo_backend.tasks) == 6
+    assert package_queue.job_queue.qsize() == 0
+    assert not package_queue.running_jobs
+    assert (
+        models.Job.objects.filter(
+            sipuuid=package.subid,
+            currentstep=models.Job.STATUS_EXECUTING_COMMANDS,
+        ).count()
+        == 0
+    )
@@ -0,0 +1,81 @@
+import pytest
+
+from a3m.server.jobs.client import ClientScriptJob
+from a3m.server.jobs.client import CommandTemplate
+
+
+REPLACEMENTS = {
+    r"%SIPDirectory%": "/var/sip/",
+    r"%SIPName%": 'my "sip"',
+    r"%config:aip_compression_level%": "1",
+    r"%relativeLocation%": "/var/sip/",
+}
+
+
+def test_command_template_renders_job_replacements():
+    template = CommandTemplate(
+        '"%SIPDirectory%%SIPName%" "%config:aip_compression_level%" "%taskUUID%"',
+        REPLACEMENTS,
+    )
+
+    assert template.render() == '"/var/sip/my \\"sip\\"" "1" "%taskUUID%"'
+
+
+def test_command_template_file_replacements_take_priority():
+    template = CommandTemplate('"%relativeLocation%" "%fileUUID%" 50%', REPLACEMENTS)
+
+    assert template.render({r"%fileUUID%": "abc"}) == '"/var/sip/" "abc" 50%'
+    assert (
+        template.render({r"%relativeLocation%": "/var/sip/`a`", r"%fileUUID%": "d"})
+        == '"/var/sip/\\`a\\`" "d" 50%'
+    )
+    # Rendering doesn't change the compiled template.
+    assert template.render() == '"/var/sip/" "%fileUUID%" 50%'
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        None,
+        "",
+        "no variables",
+        '"%SIPDirectory%metadata/" "%SIPName%" "%unknown%"',
+        "%SIPName%%SIPName%",
+    ],
+)
+def test_replace_values_matches_str_replace(command):
+    expected = command
+    if command is not None:
+        for key, replacement in REPLACEMENTS.items():
+            escaped = (
+                replacement.replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("`", r"\`")
+            )
+            expected = expected.replace(key, escaped)
+
+    assert ClientScriptJob.replace_values(command, REPLACEMENTS) == expected
+
+
+def test_command_template_scans_variables_from_left_to_right():
+    template = CommandTemplate(
+        '"%unknown%SIPName%" "%SIPName%%SIPUUID%" 50%SIPName%', REPLACEMENTS
+    )
+
+    # Unlike str.replace, the % shared with the unknown variable isn't reused.
+    assert template.render({r"%SIPUUID%": "abc"}) == (
+        '"%unknown%SIPName%" "my \\"sip\\"abc" 50my \\"sip\\"'
+    )
+
+
+def test_command_template_does_not_substitute_variables_in_values():
+    replacements = {
+        r"%SIPName%": "%fileUUID% %SIPDirectory%",
+        r"%SIPDirectory%": "/var/sip/",
+    }
+    template = CommandTemplate('"%SIPName%" "%fileUUID%"', replacements)
+
+    # str.replace substituted the variables of values replaced earlier.
+    assert template.render({r"%fileUUID%": "abc"}) == (
+        '"%fileUUID% %SIPDirectory%" "abc"'
+    )
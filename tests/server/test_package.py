@@ -5,11 +5,28 @@ import uuid
 from pathlib import Path
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
+from a3m.api.transferservice.v1beta1.request_response_pb2 import (
+    PACKAGE_STATUS_COMPLETE,
+)
+from a3m.api.transferservice.v1beta1.request_response_pb2 import (
+    PACKAGE_STATUS_FAILED,
+)
+from a3m.api.transferservice.v1beta1.request_response_pb2 import (
+    PACKAGE_STATUS_PROCESSING,
+)
 from a3m.api.transferservice.v1beta1.request_response_pb2 import ProcessingConfig
 from a3m.main import models
+from a3m.server.packages import get_package_status
+from a3m.server.packages import get_package_statuses
 from a3m.server.packages import Package
+from a3m.server.packages import PackageContext
 from a3m.server.queues import PackageQueue
+from a3m.server.queues import QueueFullError
+from a3m.server.tasks import Task
 from a3m.server.workflow import load as load_workflow
 
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
@@ -184,3 +201,284 @@ def test_package_files_with_non_ascii_names(tmp_path, package):
     assert result[0]["%fileUUID%"] == str(kwargs["uuid"])
     assert result[0]["%currentLocation%"] == kwargs["currentlocation"]
     assert result[0]["%fileGrpUse%"] == kwargs["filegrpuse"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_package_records_submission(package):
+    submission = models.PackageSubmission.objects.get(sipuuid=package.uuid)
+
+    assert submission.transferuuid == package.transfer.pk
+    assert submission.name == "name"
+    assert submission.startedtime is None
+
+    package.mark_started()
+
+    submission.refresh_from_db()
+    assert submission.startedtime is not None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_package_applies_backpressure(workflow):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    package_queue = PackageQueue(executor, threading.Event(), max_queued_packages=1)
+
+    def create_package():
+        return Package.create_package(
+            package_queue,
+            executor,
+            workflow,
+            "name",
+            "file:///tmp/foobar.gz",
+            ProcessingConfig(),
+        )
+
+    create_package()
+    with pytest.raises(QueueFullError) as excinfo:
+        create_package()
+
+    assert excinfo.value.retry_after == PackageQueue.DEFAULT_RETRY_AFTER
+    assert models.PackageSubmission.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_packages(workflow, django_assert_max_num_queries):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    package_queue = PackageQueue(executor, threading.Event(), max_queued_packages=3)
+    submissions = [
+        {
+            "name": f"name-{item}",
+            "url": "file:///tmp/foobar.gz",
+            "config": ProcessingConfig(),
+        }
+        for item in range(3)
+    ]
+
+    # The rows of all the packages are inserted in bulk.
+    with django_assert_max_num_queries(8):
+        packages = Package.create_packages(
+            package_queue, executor, workflow, submissions
+        )
+
+    assert [package.name for package in packages] == ["name-0", "name-1", "name-2"]
+    for package in packages:
+        assert package.sip.transfer_id == package.transfer.pk
+    assert models.PackageSubmission.objects.count() == 3
+
+    # Batches are accepted or rejected as a whole.
+    with pytest.raises(QueueFullError):
+        Package.create_packages(package_queue, executor, workflow, submissions[:1])
+    assert models.SIP.objects.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_package_statuses(package, package_queue, workflow, mocker):
+    # Packages processed by a different queue are inactive in ours.
+    inactive = Package.create_packages(
+        PackageQueue(package_queue.executor, threading.Event()),
+        package_queue.executor,
+        workflow,
+        [
+            {
+                "name": "inactive",
+                "url": "file:///tmp/foobar.gz",
+                "config": ProcessingConfig(),
+            }
+        ],
+    )[0]
+    package_queue.executor.submit(lambda: None).result()
+    failed_job = mocker.Mock(group="Failed transfer", description="Failed")
+    failed_job.link.id = str(uuid.uuid4())
+    inactive.advance(failed_job, {}, checkpoint=False)
+    inactive.mark_finished(failed_job)
+
+    with CaptureQueriesContext(connection) as queries:
+        statuses = get_package_statuses(
+            package_queue, [package.uuid, inactive.uuid, "unknown"]
+        )
+
+    assert statuses[package.uuid].status == PACKAGE_STATUS_PROCESSING
+    assert statuses[inactive.uuid].status == PACKAGE_STATUS_FAILED
+    assert statuses[inactive.uuid].job == "Failed transfer"
+    assert "unknown" not in statuses
+    # Inactive packages are resolved with a single query.
+    selects = [query for query in queries if query["sql"].startswith("SELECT")]
+    assert len(selects) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_package_run_follows_workflow(package, package_queue, workflow, mocker):
+    package_queue.executor.submit(lambda: None).result()
+    job = package_queue.job_queue.get_nowait()
+
+    run = models.PackageRun.objects.get(pk=package.uuid)
+    assert run.status == models.PackageRun.STATUS_PROCESSING
+    assert str(run.currentlink) == job.link.id
+    assert run.currentjob == job.description
+    assert run.jobcount == 1
+
+    package.job_finished(job, models.Job.STATUS_FAILED)
+    job.job_chain.next_link = next(
+        link for link in workflow.get_links().values() if not link.is_terminal
+    )
+    next_job = next(job.job_chain)
+
+    run.refresh_from_db()
+    assert str(run.currentlink) == next_job.link.id
+    assert run.jobcount == 2
+    assert run.failedjobcount == 1
+    submission = models.PackageSubmission.objects.get(sipuuid=package.uuid)
+    assert str(submission.checkpointlink) == next_job.link.id
+
+    package.mark_finished(mocker.Mock(group="Store AIP", description="a3m - Store AIP"))
+
+    run.refresh_from_db()
+    assert run.status == models.PackageRun.STATUS_COMPLETE
+    assert run.finishedtime is not None
+    package_queue.deactivate_package(package)
+    assert get_package_status(package_queue, package.uuid).status == (
+        PACKAGE_STATUS_COMPLETE
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_requeue_submissions(package, package_queue, workflow):
+    # Let the original submission reach the queue before simulating a restart.
+    package_queue.executor.submit(lambda: None).result()
+    restarted_queue = PackageQueue(
+        package_queue.executor, threading.Event(), debug=True
+    )
+
+    Package.requeue_submissions(restarted_queue, restarted_queue.executor, workflow)
+
+    assert package.uuid in restarted_queue.active_packages
+    job = restarted_queue.job_queue.get_nowait()
+    assert job.package.uuid == package.uuid
+    assert job.package.config == ProcessingConfig()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_trigger_workflow_error_fails_package(package, package_queue, workflow, mocker):
+    package_queue.executor.submit(lambda: None).result()
+    models.PackageSubmission.objects.filter(sipuuid=package.uuid).update(
+        startedtime=None
+    )
+    package_done = mocker.patch("a3m.server.events.package_events.package_done")
+    future = concurrent.futures.Future()
+    future.set_exception(ValueError("Workflow initiator not found"))
+
+    Package.trigger_workflow_done_callback(package, package_queue, future)
+
+    package_done.assert_called_once_with(package.uuid)
+    submission = models.PackageSubmission.objects.get(sipuuid=package.uuid)
+    assert submission.startedtime is not None
+    assert submission.finishedtime is not None
+    assert (
+        models.PackageRun.objects.get(sipuuid=package.uuid).status
+        == models.PackageRun.STATUS_FAILED
+    )
+    # The submission is released and isn't queued again after a restart.
+    package_queue.check_capacity(0)
+    restarted_queue = PackageQueue(
+        package_queue.executor, threading.Event(), debug=True
+    )
+    Package.requeue_submissions(restarted_queue, restarted_queue.executor, workflow)
+    assert restarted_queue.queue.empty()
+    assert restarted_queue.job_queue.empty()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_requeue_submissions_beyond_the_queue_limit(package_queue, workflow):
+    for item in range(3):
+        Package.create_package(
+            package_queue,
+            package_queue.executor,
+            workflow,
+            f"name-{item}",
+            "file:///tmp/foobar.gz",
+            ProcessingConfig(),
+        )
+    package_queue.executor.submit(lambda: None).result()
+    restarted_queue = PackageQueue(
+        package_queue.executor,
+        threading.Event(),
+        max_concurrent_packages=1,
+        max_queued_packages=1,
+    )
+
+    Package.requeue_submissions(restarted_queue, restarted_queue.executor, workflow)
+
+    assert len(restarted_queue.active_packages) == 1
+    assert restarted_queue.queue.qsize() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_resume_interrupted(package, package_queue, workflow):
+    package_queue.executor.submit(lambda: None).result()
+    link = next(link for link in workflow.get_links().values() if not link.is_terminal)
+    package.mark_started()
+    package.checkpoint(link.id, PackageContext(("%foo%", "bar")))
+    job = models.Job.objects.create(
+        sipuuid=package.subid,
+        createdtime=timezone.now(),
+        microservicechainlink=link.id,
+    )
+    for file_uuid, exit_code in (("a", 0), ("b", 1), ("c", None)):
+        models.Task.objects.create(
+            taskuuid=str(uuid.uuid4()),
+            job=job,
+            fileuuid=file_uuid,
+            createdtime=timezone.now(),
+            exitcode=exit_code,
+        )
+    Task.cleanup_old_db_entries()
+    restarted_queue = PackageQueue(
+        package_queue.executor, threading.Event(), debug=True
+    )
+
+    Package.resume_interrupted(restarted_queue, workflow)
+
+    resumed_job = restarted_queue.job_queue.get_nowait()
+    assert resumed_job.package.uuid == package.uuid
+    assert resumed_job.link.id == link.id
+    assert dict(resumed_job.job_chain.context) == {"%foo%": "bar"}
+    assert resumed_job.interrupted_job_id == job.jobuuid
+    assert Task.completed_exit_codes(job.jobuuid) == {"a": 0, "b": 1}
+
+    package.mark_finished()
+    Package.resume_interrupted(restarted_queue, workflow)
+    assert restarted_queue.job_queue.empty()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_resume_interrupted_with_invalid_checkpoint_context(
+    package, package_queue, workflow
+):
+    package_queue.executor.submit(lambda: None).result()
+    link = next(link for link in workflow.get_links().values() if not link.is_terminal)
+    package.mark_started()
+    models.PackageSubmission.objects.filter(sipuuid=package.uuid).update(
+        checkpointlink=link.id, checkpointcontext="{'%foo%': 'bar'}"
+    )
+    restarted_queue = PackageQueue(
+        package_queue.executor, threading.Event(), debug=True
+    )
+
+    Package.resume_interrupted(restarted_queue, workflow)
+
+    assert restarted_queue.job_queue.empty()
+    assert (
+        models.PackageRun.objects.get(sipuuid=package.uuid).status
+        == models.PackageRun.STATUS_FAILED
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_package_status_of_active_package(
+    package, package_queue, django_assert_num_queries
+):
+    package_queue.executor.submit(lambda: None).result()
+
+    with django_assert_num_queries(0):
+        package_status = get_package_status(package_queue, package.uuid)
+
+    assert package_status.status == PACKAGE_STATUS_PROCESSING
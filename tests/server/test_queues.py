@@ -1,3 +1,4 @@
+import asyncio
 import concurrent.futures
 import os
 import queue
@@ -9,6 +10,8 @@ import pytest
 from a3m.api.transferservice.v1beta1.request_response_pb2 import ProcessingConfig
 from a3m.server.jobs import Job
 from a3m.server.packages import Package
+from a3m.server.queues import ActivePackages
+from a3m.server.queues import AsyncPackageQueue
 from a3m.server.queues import PackageQueue
 from a3m.server.workflow import Link
 
@@ -155,3 +158,88 @@ def test_queue_next_job_raises_full(
 
     with pytest.raises(queue.Full):
         package_queue.queue_next_job()
+
+
+def test_active_packages_snapshots(package, package_2):
+    active_packages = ActivePackages()
+    assert active_packages.add(package)
+    assert not active_packages.add(package)
+    active_packages.add(package_2)
+
+    snapshot = active_packages.values()
+    assert active_packages.remove(package)
+    assert not active_packages.remove(package)
+
+    assert list(snapshot) == [package, package_2]
+    assert list(active_packages.values()) == [package_2]
+    assert active_packages.get("jkl") is package_2
+
+
+def test_package_state(package, workflow_link, mocker):
+    test_job = MockJob(mocker.Mock(), workflow_link, package)
+    previous_state = package.state
+
+    package.job_started(test_job)
+    package.task_submitted()
+    package.task_submitted()
+    package.task_completed(0)
+    package.task_completed(1)
+
+    assert previous_state.job_id is None
+    assert package.state.link_id == workflow_link.id
+    assert package.state.job_id == test_job.uuid
+    assert package.state.job_name == "A Test link"
+    assert package.state.started_at == test_job.created_at
+    assert package.state.tasks_submitted == 2
+    assert package.state.tasks_completed == 2
+    assert package.state.tasks_failed == 1
+
+
+class FailingJob(MockJob):
+    def run(self, *args, **kwargs):
+        super().run(*args, **kwargs)
+        raise RuntimeError("Job failed")
+
+    async def run_async(self, *args, **kwargs):
+        self.run(*args, **kwargs)
+
+
+def test_job_error_fails_package(
+    package_queue, package, package_2, workflow_link, mocker
+):
+    mark_failed = mocker.patch.object(Package, "mark_failed")
+    package_done = mocker.patch("a3m.server.events.package_events.package_done")
+    package_queue.schedule_job(FailingJob(mocker.Mock(), workflow_link, package))
+    package_queue.schedule_job(MockJob(mocker.Mock(), workflow_link, package_2))
+
+    with pytest.raises(RuntimeError):
+        package_queue.process_one_job(timeout=0.1).result()
+    # Wait for the callbacks, they run in the worker thread.
+    package_queue.executor.submit(lambda: None).result()
+
+    mark_failed.assert_called_once_with()
+    package_done.assert_called_once_with(package.uuid)
+    assert package.uuid not in package_queue.active_packages
+    assert package_2.uuid in package_queue.active_packages
+
+
+def test_job_error_fails_package_async(
+    simple_executor, package, package_2, workflow_link, mocker
+):
+    package_queue = AsyncPackageQueue(
+        simple_executor, max_concurrent_packages=1, max_queued_packages=1
+    )
+    mark_failed = mocker.patch.object(Package, "mark_failed")
+    package_done = mocker.patch("a3m.server.events.package_events.package_done")
+    package_queue.schedule_job(FailingJob(mocker.Mock(), workflow_link, package))
+    package_queue.schedule_job(MockJob(mocker.Mock(), workflow_link, package_2))
+
+    async def process_one_job():
+        await package_queue.process_job_async(package_queue.job_queue.get_nowait())
+
+    asyncio.run(process_one_job())
+
+    mark_failed.assert_called_once_with()
+    package_done.assert_called_once_with(package.uuid)
+    assert package.uuid not in package_queue.active_packages
+    assert package_2.uuid in package_queue.active_packages
@@ -0,0 +1,78 @@
+import concurrent.futures
+
+import pytest
+
+from a3m.server.tasks.backends.scheduling import TaskScheduler
+
+
+class ManualExecutor:
+    """Executor that runs functions only when told to."""
+
+    def __init__(self):
+        self.submitted = []  # (future, fn, args)
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        self.submitted.append((future, fn, args))
+        return future
+
+    def labels(self):
+        return [args[0] for future, fn, args in self.submitted]
+
+    def complete(self, index=0):
+        future, fn, args = self.submitted[index]
+        try:
+            future.set_result(fn(*args))
+        except Exception as err:
+            future.set_exception(err)
+
+
+def test_scheduler_interleaves_packages():
+    executor = ManualExecutor()
+    scheduler = TaskScheduler(executor, slots=1)
+    futures = [scheduler.submit("big", str, f"big-{item}") for item in range(3)]
+    futures.append(scheduler.submit("small", str, "small-0"))
+
+    assert executor.labels() == ["big-0"]
+    assert scheduler.pending_count() == 3
+
+    for index in range(4):
+        executor.complete(index)
+
+    assert executor.labels() == ["big-0", "small-0", "big-1", "big-2"]
+    assert [future.result() for future in futures] == [
+        "big-0",
+        "big-1",
+        "big-2",
+        "small-0",
+    ]
+    assert scheduler.running_count() == 0
+
+
+def test_scheduler_enforces_package_quota():
+    executor = ManualExecutor()
+    scheduler = TaskScheduler(executor, slots=4, package_quota=2)
+    for item in range(4):
+        scheduler.submit("a", str, f"a-{item}")
+    scheduler.submit("b", str, "b-0")
+
+    assert executor.labels() == ["a-0", "a-1", "b-0"]
+    assert scheduler.running_count() == 3
+
+    executor.complete(0)
+
+    assert executor.labels() == ["a-0", "a-1", "b-0", "a-2"]
+
+
+def test_scheduler_propagates_errors():
+    executor = ManualExecutor()
+    scheduler = TaskScheduler(executor, slots=1)
+    future = scheduler.submit("a", int, "not a number")
+    next_future = scheduler.submit("a", str, "next")
+
+    executor.complete(0)
+    executor.complete(1)
+
+    with pytest.raises(ValueError):
+        future.result()
+    assert next_future.result() == "next"
@@ -0,0 +1,123 @@
+import uuid
+
+import pytest
+from django.utils import timezone
+from google.protobuf import field_mask_pb2
+
+from a3m.api.transferservice.v1beta1.request_response_pb2 import BatchSubmitRequest
+from a3m.api.transferservice.v1beta1.request_response_pb2 import ListTasksRequest
+from a3m.api.transferservice.v1beta1.request_response_pb2 import SubmitRequest
+from a3m.main import models
+from a3m.server.transfer_service import TransferService
+
+
+class FakeContext:
+    def abort(self, code, details):
+        raise Exception(details)
+
+
+@pytest.fixture
+def job(db):
+    job = models.Job.objects.create(
+        sipuuid=str(uuid.uuid4()), createdtime=timezone.now()
+    )
+    for index in range(5):
+        models.Task.objects.create(
+            taskuuid=f"{index}-{uuid.uuid4()}",
+            job=job,
+            fileuuid=str(uuid.uuid4()),
+            createdtime=timezone.now(),
+            starttime=timezone.now(),
+            exitcode=index,
+            stdout="x" * 1024,
+        )
+    return job
+
+
+def test_submit_rejects_unknown_priorities(mocker):
+    create_package = mocker.patch("a3m.server.packages.Package.create_package")
+    service = TransferService(None, None, None)
+    request = SubmitRequest(name="name", url="file:///tmp/foobar.gz", priority=99)
+
+    with pytest.raises(Exception, match="Unknown priority"):
+        service.Submit(request, FakeContext())
+
+    create_package.assert_not_called()
+
+
+def test_batch_submit_rejects_unknown_priorities(mocker):
+    create_packages = mocker.patch("a3m.server.packages.Package.create_packages")
+    service = TransferService(None, None, None)
+    request = BatchSubmitRequest(
+        packages=[
+            SubmitRequest(name="a", url="file:///tmp/foobar.gz"),
+            SubmitRequest(name="b", url="file:///tmp/foobar.gz", priority=99),
+        ]
+    )
+
+    with pytest.raises(Exception, match="Unknown priority"):
+        service.BatchSubmit(request, FakeContext())
+
+    create_packages.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_list_tasks_paginates(job):
+    service = TransferService(None, None, None)
+    request = ListTasksRequest(job_id=str(job.jobuuid), page_size=2)
+    exit_codes = []
+
+    while True:
+        resp = service.ListTasks(request, FakeContext())
+        assert len(resp.tasks) <= 2
+        exit_codes.extend(task.exit_code for task in resp.tasks)
+        if not resp.next_page_token:
+            break
+        request.page_token = resp.next_page_token
+
+    assert exit_codes == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.django_db
+def test_list_tasks_applies_read_mask(job, django_assert_num_queries):
+    service = TransferService(None, None, None)
+    request = ListTasksRequest(
+        job_id=str(job.jobuuid),
+        read_mask=field_mask_pb2.FieldMask(paths=["id", "exit_code"]),
+    )
+
+    with django_assert_num_queries(1) as captured:
+        resp = service.ListTasks(request, FakeContext())
+
+    assert "stdOut" not in captured.captured_queries[0]["sql"]
+    assert len(resp.tasks) == 5
+    assert resp.tasks[0].id.startswith("0-")
+    assert not resp.tasks[0].stdout
+    assert not resp.tasks[0].HasField("start_time")
+    assert resp.next_page_token == ""
+
+
+@pytest.mark.django_db
+def test_list_tasks_rejects_unknown_fields(job):
+    service = TransferService(None, None, None)
+    request = ListTasksRequest(
+        job_id=str(job.jobuuid),
+        read_mask=field_mask_pb2.FieldMask(paths=["stdout", "foobar"]),
+    )
+
+    with pytest.raises(Exception, match="foobar"):
+        service.ListTasks(request, FakeContext())
+
+
+@pytest.mark.django_db
+def test_stream_tasks(job):
+    service = TransferService(None, None, None)
+    request = ListTasksRequest(job_id=str(job.jobuuid), page_size=2)
+
+    pages = list(service.StreamTasks(request, FakeContext()))
+
+    assert [len(page.tasks) for page in pages] == [2, 2, 1]
+    assert [task.exit_code for page in pages for task in page.tasks] == [0, 1, 2, 3, 4]
+    assert pages[0].tasks[0].stdout == "x" * 1024
+    assert pages[0].tasks[0].HasField("start_time")
+    assert not pages[-1].next_page_token